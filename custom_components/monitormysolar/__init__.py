@@ -1,9 +1,10 @@
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant, callback
 import asyncio
-from homeassistant.components import mqtt
 from homeassistant.helpers import service
 from .const import LOGGER, PLATFORMS
 from .coordinator import MonitorMySolar, MonitorMySolarEntry
+from .warm_start import WarmStartCache
 from .migration import (
     async_migrate_entity_ids,
     async_cleanup_orphan_devices,
@@ -24,6 +25,15 @@ async def async_setup_entry(hass: HomeAssistant, entry: MonitorMySolarEntry):
     coordinator = MonitorMySolar(hass, entry)
     entry.runtime_data = coordinator
     
+    # Step 1.5: Rehydrate the last-known state saved before the restart, so
+    # entities seed instantly instead of waiting for the snapshot round-trip.
+    try:
+        await coordinator.async_restore_warm_start()
+    except Exception as e:
+        error_msg = f"Error restoring warm-start cache: {e}"
+        LOGGER.error(error_msg)
+        coordinator._setup_errors.append(error_msg)
+
     # Step 2: Request firmware codes for all dongles and wait for them
     # Initialize the coordinator but don't wait for data refresh
     try:
@@ -33,32 +43,11 @@ async def async_setup_entry(hass: HomeAssistant, entry: MonitorMySolarEntry):
         LOGGER.error(error_msg)
         coordinator._setup_errors.append(error_msg)
     
-    # Wait for all firmware codes to be received (or timeout)
+    # Wait for all firmware codes to be received (or timeout). Codes saved in
+    # the config entry are already resolved, so a known install doesn't wait.
     LOGGER.debug("Waiting for firmware codes to be received for all dongles...")
     try:
-        # Wait up to 20 seconds for firmware codes
-        for attempt in range(20):
-            if not coordinator._pending_dongles:
-                LOGGER.debug("All firmware codes received successfully")
-                break
-            
-            # If we're halfway through the timeout and still have pending dongles, try requesting again
-            if attempt == 10 and coordinator._pending_dongles:
-                error_msg = f"Still waiting for firmware codes from: {coordinator._pending_dongles}, sending request again"
-                LOGGER.debug(error_msg)
-                # Try requesting firmware codes again for the pending dongles
-                for dongle_id in coordinator._pending_dongles:
-                    try:
-                        await mqtt.async_publish(
-                            hass, f"{dongle_id}/firmwarecode/request", ""
-                        )
-                        LOGGER.debug(f"Resent firmware code request to {dongle_id}/firmwarecode/request")
-                    except Exception as e:
-                        error_msg = f"Error sending firmware request to {dongle_id}: {e}"
-                        LOGGER.error(error_msg)
-                        coordinator._setup_errors.append(error_msg)
-            
-            await asyncio.sleep(1)
+        await coordinator.async_wait_for_firmware_codes()
     except asyncio.CancelledError:
         # Handle if the setup is cancelled
         error_msg = "Setup was cancelled while waiting for firmware codes"
@@ -145,6 +134,16 @@ async def async_setup_entry(hass: HomeAssistant, entry: MonitorMySolarEntry):
     # Only do this once to avoid duplicate subscriptions
     await coordinator.start_mqtt_subscription()
 
+    # Flush throttled entity states on HA shutdown so the recorder gets the
+    # latest values rather than whatever was last written up to an interval ago.
+    @callback
+    def _flush_state_writes(_event):
+        coordinator.async_flush_state_writes()
+
+    entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _flush_state_writes)
+    )
+
     # Step 7: Prune orphaned devices (e.g. empty device-grouping sub-devices left
     # behind after the user turned grouping off). Deferred until HA has started and
     # entity registration has settled, so we never remove a device whose entities
@@ -175,6 +174,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: MonitorMySolarEntry) ->
     if coordinator:
         # First stop MQTT subscription to prevent new data coming in
         await coordinator.stop_mqtt_subscription()
+        # Write out any state still held back by the update_interval throttle
+        coordinator.async_flush_state_writes()
         
         # Use the correct unload method
         try:
@@ -186,3 +187,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: MonitorMySolarEntry) ->
             return False
     
     return True
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: MonitorMySolarEntry) -> None:
+    """Delete the warm-start cache when the config entry is removed."""
+    await WarmStartCache(hass, entry.entry_id).async_remove()
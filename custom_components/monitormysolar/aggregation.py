@@ -0,0 +1,86 @@
+"""Running aggregates over per-dongle store values, for the Combined* entities.
+
+CombinedParallelSensor, CombinedSwitch and CombinedNumber used to follow their
+sources through HA state-change events: parse new_state.state back to a float,
+then schedule a task that re-summed the whole list. Every combined value lagged
+one state-machine hop and one task behind the dongles, and the parsing saw
+the sources' display form rather than the register values.
+
+An Aggregate is registered with the coordinator (async_add_aggregate) over the
+source store keys. Each store write updates its running sum/count/min/max in
+O(1); min/max are only recomputed when the value being replaced was the
+extreme. The coordinator calls the entity back once per dispatch flush, however
+many of its sources changed in it.
+"""
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, Optional
+
+# (store key, raw value) -> float, or None for "no value". ValueError and
+# TypeError also count as no value.
+Parser = Callable[[str, object], Optional[float]]
+
+
+def parse_number(key: str, raw) -> Optional[float]:
+    """Default parser: the raw value as a float (bools and "1.00" strings included)."""
+    return float(raw)
+
+
+def switch_parser(normalize: Callable) -> Parser:
+    """Parser for switch sources: 1.0/0.0, read the way the sync index reads them.
+
+    `normalize` is the coordinator's normalize_setting_value. /setting/updated
+    sends "1.00"-style strings; anything that isn't on or off is no value.
+    """
+    def parse(key: str, raw) -> Optional[float]:
+        value = normalize("switch", None, raw)
+        return float(value) if value in (0, 1) else None
+
+    return parse
+
+
+class Aggregate:
+    """Running sum/count/min/max over a fixed set of store keys."""
+
+    def __init__(self, keys: Iterable[str], parse: Parser = parse_number) -> None:
+        self.keys = tuple(keys)
+        self._parse = parse
+        # key -> parsed value, None until the key has a usable value
+        self.values: Dict[str, Optional[float]] = dict.fromkeys(self.keys)
+        self.sum = 0.0
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def update(self, key: str, raw) -> bool:
+        """Account for `raw` written to `key`; True if the aggregate changed."""
+        try:
+            value = None if raw is None else self._parse(key, raw)
+        except (TypeError, ValueError):
+            value = None
+        old = self.values[key]
+        if old == value and (old is None) == (value is None):
+            return False
+        self.values[key] = value
+
+        if old is not None:
+            self.sum -= old
+            self.count -= 1
+        if value is not None:
+            self.sum += value
+            self.count += 1
+        if not self.count:
+            self.sum = 0.0  # don't carry float residue into the next value
+
+        if old is not None and (old == self.min or old == self.max):
+            known = [v for v in self.values.values() if v is not None]
+            self.min = min(known) if known else None
+            self.max = max(known) if known else None
+        elif value is not None:
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+        return True
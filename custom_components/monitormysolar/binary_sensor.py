@@ -94,6 +94,10 @@ class BatteryStatusBinarySensor(MonitorMySolarEntity, BinarySensorEntity):
     def device_info(self):
         return self.get_device_info(self._dongle_id, self._manufacturer, self.sensor_info.get("device_group"))
 
+    def _coordinator_keys(self) -> tuple[str, ...]:
+        """The parent battery status sensor this flag is decoded from."""
+        return (self.coordinator.build_entity_id("sensor", self._dongle_id, self._parent_sensor),)
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Update sensor with latest data from coordinator."""
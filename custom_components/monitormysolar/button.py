@@ -7,6 +7,7 @@ from homeassistant.helpers.event import (
 from .const import DOMAIN, ENTITIES, FIRMWARE_CODES, LOGGER
 from .coordinator import MonitorMySolarEntry
 from .entity import MonitorMySolarEntity
+from .mqttHandeler import LANE_ADMIN
 
 async def async_setup_entry(hass, entry: MonitorMySolarEntry, async_add_entities):
     coordinator = entry.runtime_data
@@ -100,7 +101,9 @@ class FirmwareUpdateButton(MonitorMySolarEntity, ButtonEntity):
         if sw_version < latest_firmware_version:
             # Firmware update is needed
             LOGGER.info(f"Firmware update button pressed for {formatted_dongle_id}")
-            await self.coordinator.mqtt_handler.send_update(self._dongle_id, "firmware_update", "updatedongle", self)
+            await self.coordinator.mqtt_handler.send_update(
+                self._dongle_id, "firmware_update", "updatedongle", self, lane=LANE_ADMIN
+            )
         else:
             # No update needed
             LOGGER.info(f"No firmware update needed for {formatted_dongle_id}. SW_VERSION: {sw_version}, LatestFirmwareVersion: {latest_firmware_version}")
@@ -147,4 +150,5 @@ class RestartButton(MonitorMySolarEntity, ButtonEntity):
                 self._button_type,
                 value,
                 self,
+                lane=LANE_ADMIN,
             )
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""Compiled lookup index over the ENTITIES catalog.
+
+Every key of every /input and /hold payload has to be resolved to its catalog
+entry (platform, metadata, bank). Walking ENTITIES[brand] platform by platform
+and lowercasing each unique_id on every comparison costs ~650 string compares
+per key — a full snapshot is hundreds of keys. Instead we compile the catalog
+ONCE per brand into a frozen `suffix -> CatalogHit` map and every lookup is a
+single dict hit. The coordinator and the MQTT handler share the same index.
+
+Resolution order matches the historical linear scan: platforms are checked in
+RESOLUTION_ORDER and the FIRST entry for a suffix wins (some unique_ids appear
+more than once, e.g. firmware-group variants of the same register).
+"""
+from __future__ import annotations
+
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional
+
+from .const import ENTITIES
+
+# Platform scan order used to resolve a payload key to its entity type.
+# "time_hhmm" is a legacy alias that resolves to the "time" platform.
+RESOLUTION_ORDER = ("sensor", "switch", "number", "time", "time_hhmm", "button", "select")
+
+
+class CatalogHit(NamedTuple):
+    """Everything the hot paths need to know about one catalog unique_id."""
+
+    platform: str  # resolved entity platform ("time_hhmm" already folded to "time")
+    entry: Dict[str, Any]  # the catalog dict itself (options, scaling, ...)
+    bank: str  # the bank the entry is declared under
+    source: str  # entry["source"], falling back to the bank name
+    gridboss_bank: Optional[str]  # e.g. "holdbank1" for gridboss_holdbank1, else None
+
+
+_EMPTY: Mapping[str, CatalogHit] = MappingProxyType({})
+_INDEX_CACHE: Dict[str, Mapping[str, CatalogHit]] = {}
+
+
+def _compile(brand_entities: Dict[str, Any]) -> Mapping[str, CatalogHit]:
+    """Build the frozen suffix index for one brand's catalog."""
+    # GridBoss bank membership is decided across ALL dict-shaped platforms (the
+    # MQTT handler routes a write to gridboss_<bank> if ANY declaration of the
+    # unique_id lives in a GridBoss bank).
+    gridboss_banks: Dict[str, str] = {}
+    for banks in brand_entities.values():
+        if not isinstance(banks, dict):
+            continue
+        for bank_name, entries in banks.items():
+            for entry in entries:
+                source = entry.get("source", bank_name)
+                if source.startswith("gridboss_"):
+                    gridboss_banks.setdefault(
+                        entry["unique_id"].lower(), source.replace("gridboss_", "")
+                    )
+
+    index: Dict[str, CatalogHit] = {}
+    for platform in RESOLUTION_ORDER:
+        banks = brand_entities.get(platform)
+        # Flat-list brand shapes (Solis "sensors": [...]) were never resolved by
+        # the linear scan either; skip them the same way.
+        if not isinstance(banks, dict):
+            continue
+        resolved = "time" if platform == "time_hhmm" else platform
+        for bank_name, entries in banks.items():
+            for entry in entries:
+                suffix = entry["unique_id"].lower()
+                if suffix in index:
+                    continue  # first declaration wins
+                index[suffix] = CatalogHit(
+                    platform=resolved,
+                    entry=entry,
+                    bank=bank_name,
+                    source=entry.get("source", bank_name),
+                    gridboss_bank=gridboss_banks.get(suffix),
+                )
+    return MappingProxyType(index)
+
+
+def get_catalog_index(brand: str) -> Mapping[str, CatalogHit]:
+    """Return the compiled (and cached) suffix index for `brand`.
+
+    Unknown brands get an empty mapping. Keys are lowercase unique_ids.
+    """
+    index = _INDEX_CACHE.get(brand)
+    if index is None:
+        brand_entities = ENTITIES.get(brand)
+        index = _compile(brand_entities) if brand_entities else _EMPTY
+        _INDEX_CACHE[brand] = index
+    return index
+
+
+def lookup(brand: str, suffix: str) -> Optional[CatalogHit]:
+    """Resolve a payload key / setting name to its CatalogHit, or None."""
+    return get_catalog_index(brand).get(suffix.lower())
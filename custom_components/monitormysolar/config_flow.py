@@ -6,7 +6,12 @@ from homeassistant.core import callback
 from homeassistant.components import mqtt
 from homeassistant.helpers import config_validation as cv
 import asyncio
-from .const import DOMAIN, CONF_ENABLE_DEVICE_GROUPING, DEFAULT_ENABLE_DEVICE_GROUPING, CONF_USE_INPUT_BOX, DEFAULT_USE_INPUT_BOX, CONF_DROP_DONGLE_ID, CONF_USE_BETA, DEFAULT_USE_BETA
+from .const import (
+    DOMAIN, CONF_ENABLE_DEVICE_GROUPING, DEFAULT_ENABLE_DEVICE_GROUPING, CONF_USE_INPUT_BOX,
+    DEFAULT_USE_INPUT_BOX, CONF_DROP_DONGLE_ID, CONF_USE_BETA, DEFAULT_USE_BETA,
+    CONF_DISPATCH_WINDOW, DEFAULT_DISPATCH_WINDOW, CONF_BANK_UPDATE_INTERVAL,
+    DEFAULT_BANK_UPDATE_INTERVAL, CONF_DEADBAND_HEARTBEAT, DEFAULT_DEADBAND_HEARTBEAT,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -908,6 +913,11 @@ class InverterMQTTOptionsFlowHandler(config_entries.OptionsFlow):
             if CONF_USE_BETA in user_input:
                 new_data[CONF_USE_BETA] = user_input[CONF_USE_BETA]
 
+            # Update tuning (dispatch window, bank signal rate, deadband heartbeat)
+            for key in (CONF_DISPATCH_WINDOW, CONF_BANK_UPDATE_INTERVAL, CONF_DEADBAND_HEARTBEAT):
+                if key in user_input:
+                    new_data[key] = user_input[key]
+
             self.hass.config_entries.async_update_entry(
                 self.config_entry, data=new_data
             )
@@ -927,6 +937,15 @@ class InverterMQTTOptionsFlowHandler(config_entries.OptionsFlow):
         )
         current_drop_dongle_id = self.config_entry.data.get(CONF_DROP_DONGLE_ID, False)
         current_use_beta = self.config_entry.data.get(CONF_USE_BETA, DEFAULT_USE_BETA)
+        current_dispatch_window = self.config_entry.data.get(
+            CONF_DISPATCH_WINDOW, DEFAULT_DISPATCH_WINDOW
+        )
+        current_bank_update_interval = self.config_entry.data.get(
+            CONF_BANK_UPDATE_INTERVAL, DEFAULT_BANK_UPDATE_INTERVAL
+        )
+        current_deadband_heartbeat = self.config_entry.data.get(
+            CONF_DEADBAND_HEARTBEAT, DEFAULT_DEADBAND_HEARTBEAT
+        )
 
         # Dropping the dongle id is only meaningful for single-dongle installs;
         # multi-dongle needs the dongle id to disambiguate entity_ids.
@@ -941,6 +960,15 @@ class InverterMQTTOptionsFlowHandler(config_entries.OptionsFlow):
             vol.Optional(CONF_ENABLE_DEVICE_GROUPING, default=current_device_grouping): bool,
             vol.Optional(CONF_USE_INPUT_BOX, default=current_use_input_box): bool,
             vol.Optional(CONF_USE_BETA, default=current_use_beta): bool,
+            vol.Optional(CONF_DISPATCH_WINDOW, default=current_dispatch_window): vol.All(
+                vol.Coerce(float), vol.Range(min=0, max=1)
+            ),
+            vol.Optional(CONF_BANK_UPDATE_INTERVAL, default=current_bank_update_interval): vol.All(
+                vol.Coerce(float), vol.Range(min=0, max=60)
+            ),
+            vol.Optional(CONF_DEADBAND_HEARTBEAT, default=current_deadband_heartbeat): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=60)
+            ),
         }
         if is_single_dongle:
             schema_dict[
@@ -47,6 +47,54 @@ DEFAULT_USE_BETA = False
 # history (anchored to unique_id) is preserved.
 CONF_DROP_DONGLE_ID = "drop_dongle_id"
 
+# Coordinator dispatch coalescing: entity notifications for everything written
+# in one event-loop iteration are flushed together. A non-zero window (seconds)
+# widens that into a micro-batch so a burst of retained messages / snapshot
+# replies collapses into a single notification pass.
+CONF_DISPATCH_WINDOW = "dispatch_window"
+DEFAULT_DISPATCH_WINDOW = 0.0
+
+# Entity state writes are throttled to at most one per update_interval seconds
+# (the latest value is written at the end of the interval). update_intervals
+# optionally overrides it per device_class or platform, e.g.
+# {"energy": 300, "binary_sensor": 5}. Settings platforms are never throttled.
+# update_intervals is advanced-only: the options flow doesn't edit it, so set
+# it in the config entry data directly.
+CONF_UPDATE_INTERVAL = "update_interval"
+CONF_UPDATE_INTERVALS = "update_intervals"
+DEFAULT_UPDATE_INTERVAL = 60
+
+# Significant-change filter for noisy measurement sensors. A catalog entry may
+# carry "deadband" (absolute, in the sensor's unit) and/or "deadband_rel"
+# (fraction of the last written value); entries without either fall back to
+# the default for their device_class. A value inside the band isn't written,
+# except as a heartbeat every CONF_DEADBAND_HEARTBEAT minutes so history stays
+# continuous. Relative for voltage so grid (230 V) and cell (3.3 V) readings
+# both get a sensible band.
+DEFAULT_DEADBANDS = {
+    SensorDeviceClass.VOLTAGE: {"deadband_rel": 0.001},
+    SensorDeviceClass.FREQUENCY: {"deadband": 0.02},
+    SensorDeviceClass.TEMPERATURE: {"deadband": 0.5},
+}
+CONF_DEADBAND_HEARTBEAT = "deadband_heartbeat"
+DEFAULT_DEADBAND_HEARTBEAT = 10
+
+# Per-dongle dispatcher signal carrying the name of the bank/topic that just
+# delivered data, consumed by that dongle's BankUpdateSensor. Format with the
+# dongle id. Each bank is signalled at most once per CONF_BANK_UPDATE_INTERVAL
+# seconds.
+SIGNAL_BANK_UPDATED = f"{DOMAIN}_bank_updated_{{}}"
+CONF_BANK_UPDATE_INTERVAL = "bank_update_interval"
+DEFAULT_BANK_UPDATE_INTERVAL = 1.0
+
+# Per-dongle dispatcher signal sent after each write ack (or ack timeout),
+# consumed by that dongle's WriteLatencySensor. Format with the dongle id.
+SIGNAL_WRITE_LATENCY = f"{DOMAIN}_write_latency_{{}}"
+
+# Per-entry dispatcher signal sent when the set of settings that differ across
+# dongles changes, consumed by SyncStatusSensor. Format with the entry id.
+SIGNAL_SYNC_STATUS = f"{DOMAIN}_sync_status_{{}}"
+
 PLATFORMS = [
     Platform.SENSOR,
     Platform.BINARY_SENSOR,
@@ -325,6 +373,10 @@ STATUS_DIAGNOSTIC_SENSORS = [
     {"name": "SD Write Failures", "type": "sensor", "unique_id": "sd_write_failures", "status_field": "sd.write_failures", "state_class": SensorStateClass.TOTAL_INCREASING, "sensor_class": "status_field", "device_group": "Diagnostics", "require_field": True, "entity_registry_enabled_default": False},
 ]
 
+# Write-ack round-trip latency measured by the MQTT handler (not from /status):
+# state is p95 in ms, attributes carry p50/p99 and the adaptive ack timeout.
+WRITE_LATENCY_SENSOR = {"name": "Write Ack Latency", "type": "sensor", "unique_id": "write_ack_latency", "state_class": SensorStateClass.MEASUREMENT, "device_class": SensorDeviceClass.DURATION, "unit_of_measurement": "ms", "device_group": "Diagnostics"}
+
 
 
 ENTITIES = {
@@ -1,7 +1,9 @@
 from __future__ import annotations
+import asyncio
 import json
+import sys
 import time
-from typing import Any, cast, Set, List, Dict
+from typing import Any, Callable, FrozenSet, Iterable, cast, Set, List, Dict
 from propcache import cached_property
 
 from homeassistant.components import mqtt
@@ -10,17 +12,43 @@ from homeassistant.core import (
     HomeAssistant,
     callback,
 )
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.event import (
     async_call_later,
 )
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from .mqttHandeler import MQTTHandler
+from .catalog import get_catalog_index, lookup as catalog_lookup
+from .firmware_versions import FirmwareVersionCache
+from .subscription_planner import plan_topics
+from .topic_router import (
+    ROUTE_AVAILABILITY,
+    ROUTE_BATTERIES,
+    ROUTE_DATA,
+    ROUTE_DEBUG,
+    ROUTE_FIRMWARE_CODE,
+    ROUTE_RESPONSE,
+    ROUTE_SETTING_UPDATED,
+    ROUTE_SNAPSHOT,
+    ROUTE_STATUS,
+    Route,
+    TopicRouter,
+)
+from .warm_start import WarmStartCache
+from .settings_sync import SyncIndex
+from .aggregation import Aggregate
 
 from .const import (
+    CONF_BANK_UPDATE_INTERVAL,
+    CONF_DISPATCH_WINDOW,
+    DEFAULT_BANK_UPDATE_INTERVAL,
+    DEFAULT_DISPATCH_WINDOW,
     DOMAIN,
     ENTITIES,
     LOGGER,
     PLATFORMS,
+    SIGNAL_BANK_UPDATED,
+    SIGNAL_SYNC_STATUS,
 )
 
 # Forward reference type definition
@@ -74,9 +102,21 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
         self.current_fw_versions: Dict[str, str] = {dongle_id: "" for dongle_id in self._dongle_ids}
         # self.current_ui_versions: Dict[str, str] = {dongle_id: "" for dongle_id in self._dongle_ids}  # Commented out - UI update entity removed
         self._mqtt_unsubscribe_callbacks: Dict[str, Any] = {}
+        # dongle_id -> topics currently subscribed for it (see subscription_planner).
+        self._subscription_plans: Dict[str, FrozenSet[str]] = {}
+        # dongle_id -> lock serializing its plan applies; present once the
+        # dongle's first apply has started (see _apply_subscription_plan).
+        self._subscription_locks: Dict[str, asyncio.Lock] = {}
+        # dongle_id -> True for FW >= 4.3.0, False for older; absent until /status.
+        self._dongle_unified: Dict[str, bool] = {}
         self._ignored_entity_suffixes: Set[str] = set()  # To track entities we've already logged about
         self._pending_dongles: List[str] = self._dongle_ids.copy()  # Track dongles still needing setup
-        self.server_versions = {}
+        # Set once a dongle's firmware code is known (cached, received, or given
+        # up on); setup waits on these instead of polling _pending_dongles.
+        self._firmware_code_events: Dict[str, asyncio.Event] = {
+            dongle_id: asyncio.Event() for dongle_id in self._dongle_ids
+        }
+        self.firmware_versions = FirmwareVersionCache(hass)  # Update server's published versions
         self._sync_settings_enabled = False  # Track sync settings state
         self._setting_history = {}  # Track setting changes with timestamps
         self._max_history_entries = 100  # Limit history size per setting
@@ -127,6 +167,54 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
         self._discharge_control_settings = {}  # Track ubBatDischgControl for each dongle
         self._charge_type_settings = {}  # Track ACChargeType for each dongle
 
+        # Topic routing: concrete topics are precompiled per dongle when we
+        # subscribe (start_mqtt_subscription), so routing a message is one lookup.
+        self._topic_router = TopicRouter()
+        self._route_handlers = self._build_route_handlers()
+
+        # Memoized entity_id construction. build_entity_id runs for every key of
+        # every message; per-dongle prefixes and finished entity_ids are cached
+        # here and rebuilt only when dongle_data changes (see
+        # invalidate_entity_id_cache).
+        self._entity_prefix_cache: Dict[str, str] = {}
+        self._entity_id_cache: Dict[tuple, str] = {}
+        self._payload_entity_id_cache: Dict[tuple, str] = {}
+        self._entity_id_cache_source = None
+        # Settings that differ across dongles, maintained on every store write
+        # once the sync status sensor asks for it (see sync_index).
+        self._sync_index: SyncIndex | None = None
+        self.invalidate_entity_id_cache()
+
+        # Key-targeted dispatch. Data messages only touch a handful of keys, so
+        # instead of fanning every message out to every entity we note which
+        # coordinator keys (entity_ids) were written and wake only the entities
+        # listening on those keys. Structural changes (firmware code, entity
+        # availability) still use the full async_set_updated_data fan-out.
+        self._key_listeners: Dict[str, Set[Callable[[], None]]] = {}
+        self._changed_keys: Set[str] = set()
+        self._unconfirmed_keys: Set[str] = set()  # optimistic writes awaiting their echo
+        # Running aggregates for the Combined* entities (see aggregation.py):
+        # store key -> aggregates over it, each aggregate's entity callback,
+        # and the aggregates changed since the last flush.
+        self._aggregates: Dict[str, List[Aggregate]] = {}
+        self._aggregate_listeners: Dict[Aggregate, Callable[[], None]] = {}
+        self._dirty_aggregates: Dict[Aggregate, None] = {}
+        # Dispatch coalescing: writes only mark the store dirty; one flush per
+        # loop iteration (or per micro-batch window) notifies the entities.
+        self._dispatch_window: float = entry.data.get(CONF_DISPATCH_WINDOW, DEFAULT_DISPATCH_WINDOW)
+        self._dispatch_handle = None  # pending loop callback, if a flush is scheduled
+        self._dispatch_full = False  # a structural change needs the full fan-out
+        # Bank-update timestamps go to each dongle's BankUpdateSensor over a
+        # per-dongle dispatcher signal, at most once per bank per interval.
+        self._bank_update_interval: float = entry.data.get(
+            CONF_BANK_UPDATE_INTERVAL, DEFAULT_BANK_UPDATE_INTERVAL
+        )
+        self._bank_update_last: Dict[tuple, float] = {}  # (dongle_id, bank) -> monotonic
+        # Entities holding a throttled (deferred) state write; flushed on unload/stop.
+        self._pending_state_writes: Set[Any] = set()
+        # Last-known state persisted across restarts (see warm_start.py).
+        self._warm_start = WarmStartCache(hass, entry.entry_id)
+
         super().__init__(
             hass,
             LOGGER,
@@ -267,8 +355,37 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
                 dongle_id, f"data resumed after {int(now - previous)}s gap"
             )
 
+    def invalidate_entity_id_cache(self) -> None:
+        """Drop memoized prefixes/entity_ids and precompute the per-dongle prefixes.
+
+        Call after changing _dongle_data in place. Replacing the list is picked
+        up automatically (the cache remembers which list it was built from).
+        """
+        self._entity_prefix_cache = {}
+        self._entity_id_cache = {}
+        self._payload_entity_id_cache = {}
+        self._entity_id_cache_source = self._dongle_data
+        for dongle_id in self._dongle_ids:
+            self._entity_prefix_cache[dongle_id] = self._compute_entity_prefix(dongle_id)
+        if self._sync_index is not None:
+            # It's keyed by entity_id; re-key it under the new prefixes.
+            self._sync_index = SyncIndex.build(self, self._dongle_ids, self._sync_index.listeners)
+
+    def _check_entity_id_cache(self) -> None:
+        """Reset the caches if _dongle_data was swapped out since they were built."""
+        if self._entity_id_cache_source is not self._dongle_data:
+            self.invalidate_entity_id_cache()
+
     def get_entity_prefix(self, dongle_id: str) -> str:
-        """Return the per-dongle entity_id prefix, or "" for none.
+        """Return the per-dongle entity_id prefix, or "" for none (memoized)."""
+        self._check_entity_id_cache()
+        prefix = self._entity_prefix_cache.get(dongle_id)
+        if prefix is None:
+            prefix = self._entity_prefix_cache[dongle_id] = self._compute_entity_prefix(dongle_id)
+        return prefix
+
+    def _compute_entity_prefix(self, dongle_id: str) -> str:
+        """Work out the per-dongle entity_id prefix, or "" for none.
 
         Sourced from the dongle's `entity_prefix` in dongle_data (set during setup:
         empty on single-dongle installs, mandatory dongle-id-or-custom on
@@ -294,14 +411,296 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
 
         prefix set -> "<platform>.<prefix>_<suffix>"; empty -> "<platform>.<suffix>".
         The unique_id is separate and always dongle-scoped, so history follows across
-        any entity_id naming change.
+        any entity_id naming change. Results are memoized per (platform, dongle, key).
         """
-        suffix = type_suffix.lower()
-        prefix = self.get_entity_prefix(dongle_id)
-        if prefix:
-            return f"{platform}.{prefix}_{suffix}"
-        return f"{platform}.{suffix}"
-    
+        key = (platform, dongle_id, type_suffix)
+        self._check_entity_id_cache()
+        entity_id = self._entity_id_cache.get(key)
+        if entity_id is None:
+            suffix = type_suffix.lower()
+            prefix = self.get_entity_prefix(dongle_id)
+            if prefix:
+                entity_id = f"{platform}.{prefix}_{suffix}"
+            else:
+                entity_id = f"{platform}.{suffix}"
+            entity_id = self._entity_id_cache[key] = sys.intern(entity_id)
+        return entity_id
+
+    def _payload_entity_id(self, dongle_id: str, raw_key: str) -> str:
+        """Map a raw payload key to its entity_id (formatting + platform, memoized)."""
+        key = (dongle_id, raw_key)
+        self._check_entity_id_cache()
+        entity_id = self._payload_entity_id_cache.get(key)
+        if entity_id is None:
+            formatted_suffix = raw_key.lower().replace("-", "_").replace(":", "_")
+            entity_type = self.determine_entity_type(formatted_suffix)
+            entity_id = self.build_entity_id(entity_type, dongle_id, formatted_suffix)
+            self._payload_entity_id_cache[key] = entity_id
+        return entity_id
+
+    def set_entity_value(self, entity_id: str, value: Any) -> bool:
+        """Write a value into the store; mark its key for dispatch only if it changed.
+
+        Full snapshots and legacy per-bank polls re-announce hundreds of values
+        that haven't moved. Comparing on write means those keys produce no
+        entity callbacks and no state writes at all. Returns True if the key
+        was marked changed.
+
+        A key an entity wrote optimistically (set_optimistic_value) is always
+        dispatched on its next incoming value, even an equal one: that echo is
+        what clears the entity's user-initiated guard.
+        """
+        entities = self.entities
+        if entity_id in self._unconfirmed_keys:
+            self._unconfirmed_keys.discard(entity_id)
+        elif entity_id in entities and entities[entity_id] == value:
+            return False
+        entities[entity_id] = value
+        self._changed_keys.add(entity_id)
+        if self._sync_index is not None:
+            self._sync_index.observe(entity_id, value)
+        if entity_id in self._aggregates:
+            self._update_aggregates(entity_id, value)
+        return True
+
+    def set_optimistic_value(self, entity_id: str, value: Any) -> None:
+        """Mirror a value HA itself just wrote (or is writing) into the store.
+
+        Used by settings entities for their optimistic / confirmed state. Not
+        dispatched (the entity already shows it), but the key is flagged so the
+        dongle's confirming echo reaches the entity even though it carries the
+        same value.
+        """
+        self.entities[entity_id] = value
+        self._unconfirmed_keys.add(entity_id)
+        if self._sync_index is not None:
+            self._sync_index.observe(entity_id, value)
+        if entity_id in self._aggregates and self._update_aggregates(entity_id, value):
+            # Nothing else dispatches an optimistic write; flush the aggregate.
+            self.async_schedule_dispatch()
+
+    def _update_aggregates(self, key: str, value: Any) -> bool:
+        """Feed a store write to the aggregates over `key`; True if any changed."""
+        changed = False
+        for aggregate in self._aggregates[key]:
+            if aggregate.update(key, value):
+                self._dirty_aggregates[aggregate] = None
+                changed = True
+        return changed
+
+    @callback
+    def async_add_aggregate(
+        self, aggregate: Aggregate, update_callback: Callable[[], None]
+    ) -> Callable[[], None]:
+        """Keep `aggregate` current from store writes to its keys.
+
+        It's seeded from the store at once; after that `update_callback` is
+        called once per dispatch flush in which it changed. Returns a remover.
+        """
+        for key in aggregate.keys:
+            if key in self.entities:
+                aggregate.update(key, self.entities[key])
+            self._aggregates.setdefault(key, []).append(aggregate)
+        self._aggregate_listeners[aggregate] = update_callback
+
+        @callback
+        def remove_aggregate() -> None:
+            self._aggregate_listeners.pop(aggregate, None)
+            self._dirty_aggregates.pop(aggregate, None)
+            for key in aggregate.keys:
+                aggregates = self._aggregates.get(key)
+                if aggregates is None or aggregate not in aggregates:
+                    continue
+                aggregates.remove(aggregate)
+                if not aggregates:
+                    del self._aggregates[key]
+
+        return remove_aggregate
+
+    @property
+    def sync_index(self) -> SyncIndex:
+        """Out-of-sync index over every dongle's synced settings (built on first use).
+
+        Updated from set_entity_value / set_optimistic_value; a change to the
+        drifted set is announced on SIGNAL_SYNC_STATUS with the next dispatch.
+        """
+        if self._sync_index is None:
+            self._sync_index = SyncIndex.build(self, self._dongle_ids)
+        return self._sync_index
+
+    @callback
+    def async_add_setting_listener(self, listener: Callable[..., None]) -> Callable[[], None]:
+        """Call listener(setting, dongle_id, value) whenever a synced setting changes.
+
+        `setting` is a settings_sync.SyncedSetting and `value` the normalized
+        register value, straight from the store write. Returns a remover.
+        """
+        self.sync_index.listeners.append(listener)
+
+        @callback
+        def remove_listener() -> None:
+            # Whichever index is current: re-keying rebuilds it.
+            listeners = self.sync_index.listeners
+            if listener in listeners:
+                listeners.remove(listener)
+
+        return remove_listener
+
+    @callback
+    def async_add_key_listener(
+        self, update_callback: Callable[[], None], keys: Iterable[str]
+    ) -> Callable[[], None]:
+        """Call `update_callback` whenever one of `keys` is written.
+
+        Returns a function that removes the listener again.
+        """
+        keys = tuple(keys)
+        for key in keys:
+            self._key_listeners.setdefault(key, set()).add(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            for key in keys:
+                listeners = self._key_listeners.get(key)
+                if listeners is None:
+                    continue
+                listeners.discard(update_callback)
+                if not listeners:
+                    del self._key_listeners[key]
+
+        return remove_listener
+
+    @callback
+    def async_dispatch_changed(self) -> None:
+        """Notify only the entities listening on keys written since the last dispatch."""
+        if not self._changed_keys:
+            return
+        changed, self._changed_keys = self._changed_keys, set()
+        # An entity may listen on several of the changed keys (e.g. a
+        # PowerFlowSensor on both of its sources) — call it once.
+        callbacks: Dict[Callable[[], None], None] = {}
+        for key in changed:
+            for update_callback in self._key_listeners.get(key, ()):
+                callbacks[update_callback] = None
+        for update_callback in callbacks:
+            update_callback()
+
+    @callback
+    def async_schedule_dispatch(self, full: bool = False) -> None:
+        """Mark the store dirty and flush entity notifications once per loop tick.
+
+        A single MQTT message used to notify entities two or three times
+        (process_message, the MQTT callback, the /setting/updated branch), and
+        a burst of retained messages notified them once per message. Every
+        caller now just marks the store dirty; the first mark schedules one
+        flush, which runs after everything queued in this loop iteration (or
+        after the configured micro-batch window). `full` requests the
+        all-entities fan-out for structural changes (firmware code, entity
+        availability) instead of the key-targeted one.
+        """
+        if full:
+            self._dispatch_full = True
+        if self._dispatch_handle is not None:
+            return
+        if self._dispatch_window > 0:
+            self._dispatch_handle = self.hass.loop.call_later(
+                self._dispatch_window, self._async_flush_dispatch
+            )
+        else:
+            self._dispatch_handle = self.hass.loop.call_soon(self._async_flush_dispatch)
+
+    @callback
+    def _async_flush_dispatch(self) -> None:
+        """Run the coalesced notification pass scheduled by async_schedule_dispatch."""
+        self._dispatch_handle = None
+        self._warm_start.async_schedule_save(self._warm_start_data)
+        index = self._sync_index
+        if index is not None and index.changed:
+            index.changed = False
+            async_dispatcher_send(self.hass, SIGNAL_SYNC_STATUS.format(self.entry.entry_id))
+        if self._dirty_aggregates:
+            dirty, self._dirty_aggregates = self._dirty_aggregates, {}
+            for aggregate in dirty:
+                self._aggregate_listeners[aggregate]()
+        if self._dispatch_full:
+            # The full fan-out reaches every entity, key listeners included.
+            self._dispatch_full = False
+            self._changed_keys.clear()
+            self.async_set_updated_data(self.entities)
+            return
+        self.async_dispatch_changed()
+
+    def _warm_start_data(self) -> Dict[str, Any]:
+        """Per-dongle snapshot of the last-known state for the warm-start cache."""
+        # Bucket each key under the dongle whose entity_id prefix it starts
+        # with, longest prefix first so "inverter" doesn't claim
+        # "inverter_b_soc". An empty prefix (single dongle) takes the rest.
+        owners = sorted(
+            ((self.get_entity_prefix(dongle_id), dongle_id) for dongle_id in self._dongle_ids),
+            key=lambda owner: len(owner[0]),
+            reverse=True,
+        )
+        buckets: Dict[str, Dict[str, Any]] = {dongle_id: {} for dongle_id in self._dongle_ids}
+        for entity_id, value in self.entities.items():
+            # Optimistic values still awaiting their echo aren't known-good.
+            if value is None or entity_id in self._unconfirmed_keys:
+                continue
+            object_id = entity_id.partition(".")[2]
+            for prefix, dongle_id in owners:
+                if not prefix or object_id.startswith(f"{prefix}_"):
+                    buckets[dongle_id][entity_id] = value
+                    break
+
+        dongles: Dict[str, Any] = {}
+        for dongle_id in self._dongle_ids:
+            dongles[dongle_id] = {
+                "entities": buckets[dongle_id],
+                "boot_count": self._dongle_boot_count.get(dongle_id),
+                "fw_version": self.current_fw_versions.get(dongle_id, ""),
+                "unified": self._dongle_unified.get(dongle_id),
+                "smart_soc_volt_bits": self._smart_soc_volt_bits.get(dongle_id),
+                "smartload_bits": self._smartload_bits.get(dongle_id),
+                "port_modes": self._port_modes.get(dongle_id),
+                "charge_control": self._charge_control_settings.get(dongle_id),
+                "discharge_control": self._discharge_control_settings.get(dongle_id),
+                "charge_type": self._charge_type_settings.get(dongle_id),
+            }
+        return {"dongles": dongles}
+
+    async def async_restore_warm_start(self) -> None:
+        """Seed the store from the warm-start cache. Call before platforms load.
+
+        Only fills what nothing live has provided yet, and doesn't notify
+        anyone: entities pick the values up when they're added.
+        """
+        data = await self._warm_start.async_load()
+        if not data:
+            return
+        restored = 0
+        for dongle_id, saved in (data.get("dongles") or {}).items():
+            if dongle_id not in self._dongle_ids or not isinstance(saved, dict):
+                continue
+            for entity_id, value in (saved.get("entities") or {}).items():
+                if self.entities.get(entity_id) is None:
+                    self.entities[entity_id] = value
+                    restored += 1
+            if saved.get("boot_count") is not None:
+                self._dongle_boot_count.setdefault(dongle_id, saved["boot_count"])
+            if saved.get("fw_version") and not self.current_fw_versions.get(dongle_id):
+                self.current_fw_versions[dongle_id] = saved["fw_version"]
+            if saved.get("unified") is not None:
+                self._dongle_unified.setdefault(dongle_id, saved["unified"])
+            for key, store in (
+                ("smart_soc_volt_bits", self._smart_soc_volt_bits),
+                ("smartload_bits", self._smartload_bits),
+                ("port_modes", self._port_modes),
+                ("charge_control", self._charge_control_settings),
+                ("discharge_control", self._discharge_control_settings),
+                ("charge_type", self._charge_type_settings),
+            ):
+                if saved.get(key) is not None:
+                    store.setdefault(dongle_id, saved[key])
+        LOGGER.debug(f"Warm start restored {restored} values for {len(self._dongle_ids)} dongles")
 
     @property
     def inverter_brand(self) -> str:
@@ -393,7 +792,7 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
         try:
             # Simply trigger a single coordinator update to refresh entity availability
             # The entities will check their availability in their available() property
-            self.async_set_updated_data(self.entities)
+            self.async_schedule_dispatch(full=True)
             # LOGGER.debug(f"Triggered entity availability update for {dongle_id}")
         except Exception as e:
             LOGGER.error(f"Error updating entity availability for {dongle_id}: {e}")
@@ -879,6 +1278,8 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
         """Save firmware code to config entry data."""
         if self._firmware_codes.get(dongle_id) != firmware_code:
             self._firmware_codes[dongle_id] = firmware_code
+            # The code decides GridBoss vs inverter banks.
+            self._replan_subscription(dongle_id)
             
             # Update config entry data
             current_data = self.entry.data.copy()
@@ -1236,75 +1637,76 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
         
         return values_by_dongle
 
+    def _build_route_handlers(self) -> Dict[str, Any]:
+        """Map each topic route kind to its handler (None = drop the message).
+
+        `always` handlers run even during the startup window: firmware codes,
+        /status, /availability, batteries and the snapshot reply all drive the
+        connect-time bootstrap (FW >= 4.3.0 streams change-data only). Data
+        topics wait for startup to complete. /response acks go straight to the
+        MQTT handler, which matches them to in-flight writes; /setting/updated
+        is the FW >= 4.3.0 write ack, so it can't wait either.
+        """
+        return {
+            ROUTE_FIRMWARE_CODE: (True, self._route_firmware_code),
+            ROUTE_DEBUG: (True, None),
+            ROUTE_BATTERIES: (True, self._route_batteries),
+            ROUTE_STATUS: (True, self._route_status),
+            ROUTE_AVAILABILITY: (True, self._route_process_message),
+            ROUTE_SNAPSHOT: (True, self._route_process_message),
+            ROUTE_RESPONSE: (True, self._route_response),
+            ROUTE_SETTING_UPDATED: (True, self._route_process_message),
+            ROUTE_DATA: (False, self._route_process_message),
+        }
+
+    async def _route_firmware_code(self, route: Route, msg) -> None:
+        await self._handle_firmware_code_response(route.dongle_id, msg)
+
+    async def _route_batteries(self, route: Route, msg) -> None:
+        await self._handle_battery_data(route.dongle_id, msg.payload)
+
+    async def _route_status(self, route: Route, msg) -> None:
+        await self.process_status_message(route.dongle_id, msg.payload)
+
+    async def _route_response(self, route: Route, msg) -> None:
+        if isinstance(self.mqtt_handler, MQTTHandler):
+            await self.mqtt_handler.response_received(msg)
+
+    async def _route_process_message(self, route: Route, msg) -> None:
+        await self.process_message(route.dongle_id, msg.topic, msg.payload)
+
     @callback
     async def _async_handle_mqtt_message(self, msg) -> None:
         """Handle all MQTT messages."""
-        topic = msg.topic
-        
-        # Extract dongle ID from the topic
         try:
-            dongle_id = topic.split('/')[0]
-            #LOGGER.debug(f"Received MQTT message on topic {topic} from dongle {dongle_id}")
+            # One dict hit: the router pre-parses dongle id, bank and route kind.
+            route = self._topic_router.route(msg.topic)
 
             # Record liveness and recover from a silent gap. The snapshot reply
             # topics are excluded so the recovery snapshot doesn't re-arm itself
             # from its own reply.
-            if not topic.endswith("/snap/input") and not topic.endswith("/snap/hold"):
-                await self.mark_dongle_seen(dongle_id)
-
-            # Always process firmware code responses as they're needed for setup
-            if topic.endswith("/firmwarecode/response"):
-                await self._handle_firmware_code_response(dongle_id, msg)
-            # Skip debug topics - we don't need to process them
-            elif "/debug/" in topic:
-                # Ignore debug topics like debug/bits, debug/bitfield, etc.
-                return
-            # Handle battery extended data topic
-            elif topic.endswith("/batteries"):
-                await self._handle_battery_data(dongle_id, msg.payload)
-            # Always process /status and /availability, even during startup: they
-            # carry the firmware version and connection state that drive the
-            # full-snapshot bootstrap (FW >= 4.3.0 streams change-data only).
-            elif topic.endswith("/status"):
-                await self.process_status_message(dongle_id, msg.payload)
-            elif topic.endswith("/availability"):
-                await self.process_message(dongle_id, topic, msg.payload)
-            # Always process the snapshot reply, even during startup. The snapshot
-            # IS the connect-time bootstrap: it arrives within ~1s of the request
-            # we send in start_mqtt_subscription, which is well inside the ~30s
-            # startup window. If we dropped it (as the generic pre-startup branch
-            # below would), entities would stay empty until the next change-data —
-            # which on FW >= 4.3.0 (change-data only) may be a long time. The
-            # firmware publishes it on <dongle>/snap/input and <dongle>/snap/hold.
-            elif topic.endswith("/snap/input") or topic.endswith("/snap/hold"):
-                await self.process_message(dongle_id, topic, msg.payload)
-                self.async_set_updated_data(self.entities)
-            # Skip other message processing during startup to prevent excessive updates
-            elif not self._hass_startup_complete:
-                # Just store the message for later processing if needed
-                pass
-            else:
-                # Process messages normally after startup is complete
-                if topic.endswith("/response"):
-                    # /response is owned by the dedicated subscription created in
-                    # MQTTHandler._process_command for the in-flight write (it
-                    # drives the send lock, revert-on-failure and confirm). The
-                    # wildcard {dongle}/# sub also delivers it here — calling
-                    # response_received again would double-process the same ack.
-                    # Skip it; when no write is in flight there's nothing to do
-                    # anyway (current_entity is None -> early return).
-                    pass
-                elif topic.endswith("/status"):
-                    await self.process_status_message(dongle_id, msg.payload)
-                else:
-                    await self.process_message(dongle_id, topic, msg.payload)
+            if route.kind != ROUTE_SNAPSHOT:
+                await self.mark_dongle_seen(route.dongle_id)
 
-                self.async_set_updated_data(self.entities)
+            always, handler = self._route_handlers[route.kind]
+            if handler is None:
+                return
+            # Skip data processing during startup to prevent excessive updates.
+            # The snapshot reply is exempt (always=True): it IS the connect-time
+            # bootstrap and arrives well inside the ~30s startup window — dropping
+            # it would leave entities empty until the next change-data, which on
+            # FW >= 4.3.0 may be a long time.
+            if not always and not self._hass_startup_complete:
+                return
+            await handler(route, msg)
+            # No dispatch here: the handlers above already marked the store dirty
+            # and the coalesced flush notifies entities once for this loop tick.
         except Exception as e:
             LOGGER.error(f"Error processing MQTT message on topic {msg.topic}: {e}")
             # Only update data after startup is complete
             if self._hass_startup_complete:
-                self.async_set_updated_data(self.entities)
+                # Still flush whatever was written before the error.
+                self.async_schedule_dispatch()
 
     async def _handle_firmware_code_response(self, dongle_id: str, msg) -> None:
         """Handle firmware code response."""
@@ -1344,11 +1746,9 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
                 await self._create_entities_for_dongle(dongle_id)
                 
                 # Check if this completes our setup for all dongles
-                if dongle_id in self._pending_dongles:
-                    self._pending_dongles.remove(dongle_id)
-                    LOGGER.debug(f"Removed {dongle_id} from pending dongles. Remaining: {len(self._pending_dongles)} - {self._pending_dongles}")
-                else:
-                    LOGGER.warning(f"Received firmware code for {dongle_id} but it wasn't in the pending list")
+                if dongle_id not in self._pending_dongles:
+                    LOGGER.debug(f"Received firmware code for {dongle_id} but it wasn't in the pending list")
+                self._resolve_firmware_code(dongle_id)
                     
                 # Note: We don't automatically start MQTT subscription here anymore
                 # That's handled in __init__.py after all setup steps
@@ -1362,7 +1762,7 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
             LOGGER.error(f"Unexpected error handling firmware code response for {dongle_id}: {str(e)}")
         
         # Update coordinator data to trigger any listeners
-        self.async_set_updated_data(self.entities)
+        self.async_schedule_dispatch(full=True)
     
     async def _handle_battery_data(self, dongle_id: str, payload) -> None:
         """Handle battery extended data from dongleid/batteries topic."""
@@ -1401,7 +1801,7 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
                 entity_id = self.build_entity_id(
                     "sensor", dongle_id, f"battery_{position}_{key}"
                 )
-                self.entities[entity_id] = value
+                self.set_entity_value(entity_id, value)
 
         # Fire the creation event whenever we see more batteries than we've already
         # built entities for (the count can grow, and the firmware's batIndex can't
@@ -1421,7 +1821,7 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
                 {"dongle_id": dongle_id, "battery_count": len(batteries)}
             )
 
-        self.async_set_updated_data(self.entities)
+        self.async_schedule_dispatch()
 
     def get_battery_data(self, dongle_id: str) -> Dict:
         """Get battery extended data for a dongle."""
@@ -1467,10 +1867,7 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
             if entity_id_suffix in ("SW_VERSION", "UI_VERSION"):
                 continue
                 
-            formatted_entity_id_suffix = entity_id_suffix.lower().replace("-", "_").replace(":", "_")
-            entity_type = self.determine_entity_type(formatted_entity_id_suffix)
-            entity_id = self.build_entity_id(entity_type, dongle_id, formatted_entity_id_suffix)
-            self.entities[entity_id] = state
+            self.set_entity_value(self._payload_entity_id(dongle_id, entity_id_suffix), state)
 
     async def _create_entities_for_dongle(self, dongle_id: str):
         """Create entities for a specific dongle after firmware code is received."""
@@ -1508,13 +1905,14 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
                         continue
                         
                     entity_id: str = self.build_entity_id(entityTypeName, dongle_id, entity['unique_id'])
-                    self.entities[entity_id] = None
+                    # Keep any value already restored from the warm-start cache.
+                    self.entities.setdefault(entity_id, None)
                     entities_created += 1
         
         LOGGER.info(f"Created {entities_created} entities for dongle {dongle_id} (GridBoss: {is_gridboss}, Firmware: {self.get_firmware_code(dongle_id)})")
         
         # Update coordinator data
-        self.async_set_updated_data(self.entities)
+        self.async_schedule_dispatch(full=True)
 
     @callback
     async def async_setup(self):
@@ -1558,43 +1956,60 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
         """Store the async_add_entities callback for battery sensors."""
         self._battery_async_add_entities = async_add_entities
 
-    async def request_firmware_codes(self):
-        """Request firmware codes for dongles that don't have them saved."""
-        dongles_needing_firmware = [dongle_id for dongle_id in self._dongle_ids if not self._firmware_codes.get(dongle_id)]
-        
-        if not dongles_needing_firmware:
-            LOGGER.info("All firmware codes already saved, proceeding with entity creation")
-            await self._create_entities_for_all_dongles()
-            return
-        
-        LOGGER.debug(f"Requesting firmware codes for {len(dongles_needing_firmware)} dongles (already have {len(self._dongle_ids) - len(dongles_needing_firmware)})")
-        
-        # Request firmware codes only for dongles that don't have them
-        for dongle_id in dongles_needing_firmware:
-            LOGGER.debug(f"Requesting firmware code for dongle {dongle_id}...")
-            firmware_topic = f"{dongle_id}/firmwarecode/response"
-            
-            try:
-                # Subscribe to firmware code response for this dongle
-                unsubscribe_callback = await mqtt.async_subscribe(
+    def _resolve_firmware_code(self, dongle_id: str) -> None:
+        """Mark a dongle's firmware code as settled and wake anyone waiting on it."""
+        if dongle_id in self._pending_dongles:
+            self._pending_dongles.remove(dongle_id)
+            LOGGER.debug(f"Removed {dongle_id} from pending dongles. Remaining: {len(self._pending_dongles)} - {self._pending_dongles}")
+        event = self._firmware_code_events.get(dongle_id)
+        if event is not None:
+            event.set()
+        # A code that settles after subscribing (late handshake, warm start)
+        # may only now reveal a GridBoss dongle.
+        self._replan_subscription(dongle_id)
+
+    async def _request_firmware_code(self, dongle_id: str) -> None:
+        """Subscribe to a dongle's firmware code response and ask for the code."""
+        LOGGER.debug(f"Requesting firmware code for dongle {dongle_id}...")
+        firmware_topic = f"{dongle_id}/firmwarecode/response"
+        try:
+            if f"{dongle_id}_firmware" not in self._mqtt_unsubscribe_callbacks:
+                self._mqtt_unsubscribe_callbacks[f"{dongle_id}_firmware"] = await mqtt.async_subscribe(
                     self.hass, firmware_topic, self._async_handle_mqtt_message
                 )
-                
-                self._mqtt_unsubscribe_callbacks[f"{dongle_id}_firmware"] = unsubscribe_callback
                 LOGGER.debug(f"Successfully subscribed to {firmware_topic}")
-                
-                # Publish request for firmware code
-                await mqtt.async_publish(
-                    self.hass, f"{dongle_id}/firmwarecode/request", ""
-                )
-                LOGGER.debug(f"Published firmware code request to {dongle_id}/firmwarecode/request")
-            except Exception as e:
-                LOGGER.error(f"Error setting up MQTT for dongle {dongle_id}: {e}")
-        
-        # Log which dongles already have firmware codes
+
+            await mqtt.async_publish(
+                self.hass, f"{dongle_id}/firmwarecode/request", ""
+            )
+            LOGGER.debug(f"Published firmware code request to {dongle_id}/firmwarecode/request")
+        except Exception as e:
+            error_msg = f"Error requesting firmware code from {dongle_id}: {e}"
+            LOGGER.error(error_msg)
+            self._setup_errors.append(error_msg)
+
+    async def request_firmware_codes(self):
+        """Request firmware codes for dongles that don't have them saved.
+
+        Dongles with a code saved in the config entry are resolved straight
+        away; the others are asked concurrently and resolve as each
+        /firmwarecode/response arrives.
+        """
+        dongles_needing_firmware = []
         for dongle_id in self._dongle_ids:
             if self._firmware_codes.get(dongle_id):
                 LOGGER.debug(f"Firmware code already saved for dongle {dongle_id}: {self._firmware_codes[dongle_id]}")
+                await self._create_entities_for_dongle(dongle_id)
+                self._resolve_firmware_code(dongle_id)
+            else:
+                dongles_needing_firmware.append(dongle_id)
+
+        if not dongles_needing_firmware:
+            LOGGER.info("All firmware codes already saved, proceeding with entity creation")
+            return
+
+        LOGGER.debug(f"Requesting firmware codes for {len(dongles_needing_firmware)} dongles (already have {len(self._dongle_ids) - len(dongles_needing_firmware)})")
+        await asyncio.gather(*(self._request_firmware_code(d) for d in dongles_needing_firmware))
 
         # Log all active subscriptions to verify
         LOGGER.debug(f"Active MQTT subscriptions: {list(self._mqtt_unsubscribe_callbacks.keys())}")
@@ -1607,14 +2022,36 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
                 LOGGER.debug(f"Current active MQTT subscriptions: {list(self._mqtt_unsubscribe_callbacks.keys())}")
                 
                 # Create default entities for dongles that didn't respond (assume regular inverter)
-                for dongle_id in self._pending_dongles:
+                for dongle_id in list(self._pending_dongles):
                     LOGGER.warning(f"Creating default entities for dongle {dongle_id} (no firmware code received)")
                     await self._create_entities_for_dongle(dongle_id)
-                
-                # Clear pending dongles
-                self._pending_dongles.clear()
+                    self._resolve_firmware_code(dongle_id)
                 
         async_call_later(self.hass, 15, firmware_timeout)
+
+    async def _wait_for_firmware_code_events(self, dongle_ids: List[str], timeout: float) -> List[str]:
+        """Wait up to `timeout` for these dongles' codes; return the ones still missing."""
+        try:
+            async with asyncio.timeout(timeout):
+                await asyncio.gather(*(self._firmware_code_events[d].wait() for d in dongle_ids))
+        except TimeoutError:
+            pass
+        return [d for d in dongle_ids if not self._firmware_code_events[d].is_set()]
+
+    async def async_wait_for_firmware_codes(self, timeout: float = 20, resend_after: float = 10) -> None:
+        """Wait until every dongle's firmware code is settled, or `timeout` passes.
+
+        Returns immediately when every code was cached. Dongles still silent
+        after `resend_after` seconds are asked again.
+        """
+        pending = [d for d in self._dongle_ids if not self._firmware_code_events[d].is_set()]
+        if not pending:
+            return
+        missing = await self._wait_for_firmware_code_events(pending, resend_after)
+        if missing:
+            LOGGER.debug(f"Still waiting for firmware codes from: {missing}, sending request again")
+            await asyncio.gather(*(self._request_firmware_code(d) for d in missing))
+            await self._wait_for_firmware_code_events(missing, timeout - resend_after)
         
     async def start_mqtt_subscription(self):
         """Start listening to all MQTT topics for all dongles."""
@@ -1642,35 +2079,15 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
         for dongle_id in self._dongle_ids:
             try:
                 # Check if we already have a subscription for this dongle
-                if dongle_id in self._mqtt_unsubscribe_callbacks:
+                if dongle_id in self._subscription_plans:
                     LOGGER.debug(f"Already subscribed to MQTT topics for {dongle_id}")
                     continue
-                    
-                topic_pattern = f"{dongle_id}/#"
-                self._mqtt_unsubscribe_callbacks[dongle_id] = await mqtt.async_subscribe(
-                    self.hass, topic_pattern, self._async_handle_mqtt_message
-                )
-                LOGGER.debug(f"Subscribed to all MQTT topics for {dongle_id} with pattern {topic_pattern}")
-                
-                # If this is a GridBoss dongle, subscribe to GridBoss specific topics
-                if self.is_gridboss_dongle(dongle_id):
-                    gridboss_topics = [
-                        f"{dongle_id}/gridboss_inputbank1",
-                        f"{dongle_id}/gridboss_inputbank2",
-                        f"{dongle_id}/gridboss_holdbank1",
-                        f"{dongle_id}/gridboss_holdbank2",
-                        f"{dongle_id}/gridboss_holdbank3"
-                    ]
-                    
-                    for topic in gridboss_topics:
-                        try:
-                            unsubscribe_callback = await mqtt.async_subscribe(
-                                self.hass, topic, self._async_handle_mqtt_message
-                            )
-                            self._mqtt_unsubscribe_callbacks[f"{dongle_id}_gridboss_{topic.split('/')[-1]}"] = unsubscribe_callback
-                            LOGGER.debug(f"Subscribed to GridBoss topic: {topic}")
-                        except Exception as e:
-                            LOGGER.error(f"Failed to subscribe to GridBoss topic {topic}: {e}")
+
+                # Precompile this dongle's topics so routing is one lookup.
+                self._topic_router.add_dongle(dongle_id)
+
+                if not await self._apply_subscription_plan(dongle_id):
+                    subscription_success = False
             except Exception as e:
                 LOGGER.error(f"Failed to subscribe to MQTT topics for {dongle_id}: {e}")
                 subscription_success = False
@@ -1726,6 +2143,68 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
         
         async_call_later(self.hass, 120, log_ignored_entities)  # Log after 2 minutes
         
+    @callback
+    def _replan_subscription(self, dongle_id: str) -> None:
+        """Schedule _apply_subscription_plan if the dongle's role no longer matches its plan."""
+        if dongle_id not in self._subscription_locks:
+            return  # not subscribed yet: the first apply reads the current role
+        desired = plan_topics(
+            dongle_id,
+            self.is_gridboss_dongle(dongle_id),
+            self._dongle_unified.get(dongle_id),
+        )
+        if desired != self._subscription_plans.get(dongle_id):
+            self.hass.async_create_task(self._apply_subscription_plan(dongle_id))
+
+    async def _apply_subscription_plan(self, dongle_id: str) -> bool:
+        """Bring this dongle's MQTT subscriptions in line with its topic plan.
+
+        Subscribes to planned topics we don't have yet and drops the ones the
+        plan no longer contains (e.g. legacy banks once /status reports 4.3.0+).
+        Applies for one dongle run one at a time, each planning from the role
+        and generation current when it starts, so a /status or firmware code
+        that lands mid-apply is picked up by the apply it triggers. Returns
+        False if any subscribe failed; that topic is retried next call.
+        """
+        lock = self._subscription_locks.setdefault(dongle_id, asyncio.Lock())
+        async with lock:
+            return await self._apply_subscription_plan_locked(dongle_id)
+
+    async def _apply_subscription_plan_locked(self, dongle_id: str) -> bool:
+        desired = plan_topics(
+            dongle_id,
+            self.is_gridboss_dongle(dongle_id),
+            self._dongle_unified.get(dongle_id),
+        )
+        current = self._subscription_plans.get(dongle_id, frozenset())
+        if desired == current and dongle_id in self._subscription_plans:
+            return True
+
+        subscribed = set(current)
+        for topic in current - desired:
+            unsubscribe = self._mqtt_unsubscribe_callbacks.pop(topic, None)
+            if unsubscribe is not None:
+                try:
+                    unsubscribe()
+                except Exception as e:
+                    LOGGER.error(f"Error unsubscribing from {topic}: {e}")
+            subscribed.discard(topic)
+
+        success = True
+        for topic in desired - current:
+            try:
+                self._mqtt_unsubscribe_callbacks[topic] = await mqtt.async_subscribe(
+                    self.hass, topic, self._async_handle_mqtt_message
+                )
+                subscribed.add(topic)
+            except Exception as e:
+                LOGGER.error(f"Failed to subscribe to {topic}: {e}")
+                success = False
+
+        self._subscription_plans[dongle_id] = frozenset(subscribed)
+        LOGGER.debug(f"Subscribed to {len(subscribed)} MQTT topics for {dongle_id}")
+        return success
+
     async def stop_mqtt_subscription(self):
         """Stop all MQTT subscriptions."""
         LOGGER.debug(f"Stopping MQTT subscriptions for all dongles")
@@ -1736,6 +2215,50 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
                 LOGGER.debug(f"Successfully unsubscribed from MQTT topics for {key}")
             except Exception as e:
                 LOGGER.error(f"Error unsubscribing from MQTT for {key}: {e}")
+        self._subscription_plans.clear()
+        self._subscription_locks.clear()
+        # Stop the per-dongle command workers; queued writes resolve as failed.
+        if isinstance(self.mqtt_handler, MQTTHandler):
+            await self.mqtt_handler.async_stop()
+        # Drop any notification pass still queued for entities being unloaded.
+        if self._dispatch_handle is not None:
+            self._dispatch_handle.cancel()
+            self._dispatch_handle = None
+
+    def register_pending_state_write(self, entity) -> None:
+        """Track an entity whose throttled state write is deferred."""
+        self._pending_state_writes.add(entity)
+
+    def unregister_pending_state_write(self, entity) -> None:
+        self._pending_state_writes.discard(entity)
+
+    @callback
+    def async_flush_state_writes(self) -> None:
+        """Write every deferred entity state now (shutdown / unload)."""
+        pending = list(self._pending_state_writes)
+        if pending:
+            LOGGER.debug(f"Flushing {len(pending)} deferred entity state writes")
+        for entity in pending:
+            try:
+                entity._async_throttled_write()
+            except Exception as e:
+                LOGGER.error(f"Error flushing state for {entity.entity_id}: {e}")
+        self._pending_state_writes.clear()
+
+    @callback
+    def _signal_bank_update(self, dongle_id: str, bank: str) -> None:
+        """Tell this dongle's BankUpdateSensor that `bank` just delivered data.
+
+        Rate-limited per (dongle, bank): a timestamp with sub-interval
+        resolution isn't worth a state write per message.
+        """
+        key = (dongle_id, bank)
+        now = time.monotonic()
+        last = self._bank_update_last.get(key)
+        if last is not None and now - last < self._bank_update_interval:
+            return
+        self._bank_update_last[key] = now
+        async_dispatcher_send(self.hass, SIGNAL_BANK_UPDATED.format(dongle_id), bank)
 
     async def _async_update_data(self) -> None:
         """Update data."""
@@ -1768,7 +2291,7 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
             status_data = data  # Old format
 
         entity_id = self.build_entity_id("sensor", dongle_id, "uptime")
-        self.entities[entity_id] = status_data
+        self.set_entity_value(entity_id, status_data)
 
         # The /status payload carries the real dongle firmware version (e.g.
         # "4.3.0.111S3"). Record it and, on the first status seen this session,
@@ -1783,6 +2306,16 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
                 boot_count = boot.get("count")
         if version:
             self.current_fw_versions[dongle_id] = version
+            # Now that the firmware generation is known, narrow the subscription
+            # to the topics this generation actually publishes.
+            if self.parse_fw_version(version) is not None:
+                unified = self._needs_snapshot(version)
+                if self._dongle_unified.get(dongle_id) != unified:
+                    self._dongle_unified[dongle_id] = unified
+                    # Also while the first apply is still subscribing: this
+                    # one waits for it, then narrows the plan.
+                    if dongle_id in self._subscription_locks:
+                        await self._apply_subscription_plan(dongle_id)
 
         # Detect a silent reboot: if boot.count changed since we last saw it (and
         # this isn't the first sighting), the dongle restarted without dropping its
@@ -1808,21 +2341,21 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
             await self.request_snapshot(dongle_id, version)
 
         # Push the update so status-derived sensors (uptime + the /status
-        # diagnostic sensors) refresh. /status arrives ~every 30s — far less often
-        # than the /input + /hold change-data that already drives this same push —
-        # so the extra fan-out is marginal. Not gated on _hass_startup_complete so
-        # the diagnostic sensors populate on the very first status, rather than
-        # waiting up to a full heartbeat after startup finishes.
-        self.async_set_updated_data(self.entities)
+        # diagnostic sensors, which all listen on the uptime key) refresh. Not
+        # gated on _hass_startup_complete so the diagnostic sensors populate on
+        # the very first status, rather than waiting up to a full heartbeat after
+        # startup finishes.
+        self.async_schedule_dispatch()
 
     async def process_message(self, dongle_id: str, topic, payload):
         """Process incoming MQTT message and update entity states."""
         if payload is None or len(payload.strip()) == 0:
             return
+        route = self._topic_router.route(topic)
 
         # LWT/birth on <dongle>/availability is a plain "online"/"offline"
         # string, not JSON. Track it and skip the JSON decoder.
-        if topic.endswith("/availability"):
+        if route.kind == ROUTE_AVAILABILITY:
             state = payload.strip().lower()
             was_online = self._dongle_availability.get(dongle_id)
             is_online = (state == "online")
@@ -1841,8 +2374,8 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
 
         try:
             data = json.loads(payload)
-            bank_name = topic.split('/')[-1]  # Gets 'inputbank1', 'holdbank2', etc.
-            self.hass.bus.async_fire(f"{DOMAIN}_bank_updated", {"bank_name": bank_name, "dongle_id": dongle_id})
+            # route.bank is 'inputbank1', 'holdbank2', etc.
+            self._signal_bank_update(dongle_id, route.bank)
         except ValueError:
             LOGGER.error(f"Invalid JSON payload received from {dongle_id} on topic {topic}: {payload}")
             return
@@ -1855,7 +2388,7 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
         # converges within ~1 ms instead of waiting for the next /hold
         # cycle. `from` lets us self-dedup if we just wrote it ourselves
         # (avoids overwriting an optimistic in-flight write).
-        if topic.endswith("/setting/updated") and isinstance(data, dict):
+        if route.kind == ROUTE_SETTING_UPDATED and isinstance(data, dict):
             setting = data.get("setting")
             value = data.get("value")
             from_who = data.get("from") or ""
@@ -1872,19 +2405,33 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
                 normalized = self.normalize_setting_value(entity_type, entry, value)
                 entity_id = self.build_entity_id(entity_type, dongle_id, formatted_suffix)
 
-                # Dedup the dual FW >= 4.3.0 confirmation: if HA itself just
-                # wrote this same value, /response already applied it (and drove
-                # the optimistic state). Skip the redundant refresh here so we
-                # don't process the same write twice. Echoes for writes we didn't
-                # make have no ledger entry and fall through normally.
+                # The echo of a write HA is waiting on IS its confirmation: the
+                # MQTT handler settles the write. Settling only commits a
+                # single-dongle entity's optimistic state; fan-out and sync
+                # parts (and entities without one) commit nothing, so the echo
+                # still lands in the store. If the store already holds it, the
+                # optimistic value is simply confirmed (nothing to dispatch).
+                if isinstance(self.mqtt_handler, MQTTHandler) and self.mqtt_handler.confirm_from_echo(
+                    dongle_id, setting, normalized
+                ):
+                    if entity_id in self.entities and self.entities[entity_id] == normalized:
+                        self._unconfirmed_keys.discard(entity_id)
+                    elif self.set_entity_value(entity_id, normalized):
+                        self.async_schedule_dispatch()
+                    return
+
+                # Dedup the dual confirmation while the generation is unknown:
+                # if /response already settled HA's own write of this value,
+                # skip the redundant refresh. Echoes for writes we didn't make
+                # have no ledger entry and fall through normally.
                 if self._is_own_recent_write(dongle_id, formatted_suffix, normalized):
                     LOGGER.debug(
                         f"setting/updated deduped (own write): {entity_id}={normalized!r}"
                     )
                     return
 
-                self.entities[entity_id] = normalized
-                self.async_set_updated_data(self.entities)
+                self.set_entity_value(entity_id, normalized)
+                self.async_schedule_dispatch()
                 LOGGER.debug(
                     f"setting/updated routed: {entity_id}={normalized!r} "
                     f"(raw={value!r}, type={entity_type}, from={from_who})"
@@ -1919,7 +2466,7 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
             self.current_fw_versions[dongle_id] = fw_version
             # Set entity value
             entity_id = self.build_entity_id("update", dongle_id, "firmware_update")
-            self.entities[entity_id] = fw_version
+            self.set_entity_value(entity_id, fw_version)
 
         # Inverter FWCode fallback path. v4.3+ dongles no longer publish
         # `holdbank1` so the legacy /firmwarecode/request → /response
@@ -1939,8 +2486,8 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
                 # If this dongle was waiting for the legacy handshake,
                 # clear it from the pending set so the 15s timeout
                 # doesn't fire the "default entities" warning.
-                if hasattr(self, "_pending_dongles") and dongle_id in self._pending_dongles:
-                    self._pending_dongles.discard(dongle_id)
+                if dongle_id in self._pending_dongles:
+                    self._resolve_firmware_code(dongle_id)
                     LOGGER.debug(
                         f"FWCode {fw_code!r} resolved for {dongle_id} via /hold payload — pending cleared"
                     )
@@ -1968,19 +2515,19 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
                 entity_id = self.build_entity_id("sensor", dongle_id, "fault_status")
 
                 if fault_value == 0:
-                    self.entities[entity_id] = {
+                    self.set_entity_value(entity_id, {
                         "value": 0,
                         "description": None  # This will trigger "No Fault" state
-                    }
+                    })
                 else:
                     descriptions = fault_data.get("descriptions", ["Unknown Fault"])
                     timestamp = fault_data.get("timestamp", "Unknown")
-                    self.entities[entity_id] = {
+                    self.set_entity_value(entity_id, {
                         "value": fault_value,
                         "description": ", ".join(descriptions),
                         "start_time": timestamp,
                         "end_time": "Ongoing"
-                    }
+                    })
 
         # Process warning data
         if warning_data:
@@ -1996,19 +2543,19 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
                 entity_id = self.build_entity_id("sensor", dongle_id, "warning_status")
 
                 if warning_value == 0:
-                    self.entities[entity_id] = {
+                    self.set_entity_value(entity_id, {
                         "value": 0,
                         "description": None  # This will trigger "No Warning" state
-                    }
+                    })
                 else:
                     descriptions = warning_data.get("descriptions", ["Unknown Warning"])
                     timestamp = warning_data.get("timestamp", "Unknown")
-                    self.entities[entity_id] = {
+                    self.set_entity_value(entity_id, {
                         "value": warning_value,
                         "description": ", ".join(descriptions),
                         "start_time": timestamp,
                         "end_time": "Ongoing"
-                    }
+                    })
                 
         # Process main sensor data - now with more efficient entity type determination
         # For GridBoss, we need to handle the nested structure properly
@@ -2031,10 +2578,7 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
                     LOGGER.debug(f"Processing ACChargeType from MQTT: {state}")
                     self.update_charge_type_setting(dongle_id, state)
                     
-                formatted_entity_id_suffix = entity_id_suffix.lower().replace("-", "_").replace(":", "_")
-                entity_type = self.determine_entity_type(formatted_entity_id_suffix)
-                entity_id = self.build_entity_id(entity_type, dongle_id, formatted_entity_id_suffix)
-                self.entities[entity_id] = state
+                self.set_entity_value(self._payload_entity_id(dongle_id, entity_id_suffix), state)
 
         # Process events data if present (new format)
         if events_data:
@@ -2045,10 +2589,11 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
 
                 formatted_event_id = event_id.lower().replace("-", "_").replace(":", "_")
                 entity_id = self.build_entity_id("binary_sensor", dongle_id, formatted_event_id)
-                self.entities[entity_id] = event_state
+                self.set_entity_value(entity_id, event_state)
         
-        # Update coordinator data after processing all entities
-        self.async_set_updated_data(self.entities)
+        # Wake only the entities listening on the keys this message wrote
+        # (coalesced: flushed once for everything written this loop tick)
+        self.async_schedule_dispatch()
     
 
     def find_catalog_entry(self, entity_id_suffix):
@@ -2059,18 +2604,10 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
         raw value can be normalized to the entity's native representation before
         it lands in the coordinator.
         """
-        suffix_lower = entity_id_suffix.lower()
-        brand_entities = ENTITIES.get(self.inverter_brand, {})
-        if not brand_entities:
+        hit = catalog_lookup(self.inverter_brand, entity_id_suffix)
+        if hit is None:
             return None, None
-        for entity_type in ["sensor", "switch", "number", "time", "time_hhmm", "button", "select"]:
-            if entity_type in brand_entities:
-                for _bank, entries in brand_entities[entity_type].items():
-                    for entry in entries:
-                        if entry["unique_id"].lower() == suffix_lower:
-                            resolved = "time" if entity_type == "time_hhmm" else entity_type
-                            return resolved, entry
-        return None, None
+        return hit.platform, hit.entry
 
     def normalize_setting_value(self, entity_type, entry, value):
         """Coerce a /setting/updated raw value to the entity's native type.
@@ -2121,17 +2658,30 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
         # time / sensor / anything else: pass through untouched.
         return value
 
-    def record_self_write(self, dongle_id: str, setting: str, value) -> None:
-        """Note a value HA just wrote, so its /setting/updated echo can be deduped.
+    def confirms_writes_by_echo(self, dongle_id: str) -> bool:
+        """True once /status shows FW >= 4.3.0: /setting/updated confirms writes.
 
-        `setting` is normalized to the same suffix form used when routing the
-        echo. Called from the MQTT handler right after publishing a write.
+        Their /response only settles admin commands, which have no echo.
         """
+        return self._dongle_unified.get(dongle_id) is True
+
+    def normalize_written_value(self, setting: str, value):
+        """`value` as written to `setting`, in the form a /setting/updated echo normalizes to."""
         suffix = setting.lower().replace("-", "_").replace(":", "_")
         entity_type, entry = self.find_catalog_entry(suffix)
         if entity_type is None:
             entity_type = self.determine_entity_type(suffix)
-        normalized = self.normalize_setting_value(entity_type, entry, value)
+        return self.normalize_setting_value(entity_type, entry, value)
+
+    def record_self_write(self, dongle_id: str, setting: str, value) -> None:
+        """Note a value HA just wrote, so its /setting/updated echo can be deduped.
+
+        Only needed while a dongle's firmware generation is unknown and both
+        /response and /setting/updated may confirm the same write. `setting` is
+        normalized to the same suffix form used when routing the echo.
+        """
+        suffix = setting.lower().replace("-", "_").replace(":", "_")
+        normalized = self.normalize_written_value(setting, value)
         if not hasattr(self, "_self_write_ledger"):
             self._self_write_ledger = {}
         self._self_write_ledger[(dongle_id, suffix)] = (normalized, time.monotonic())
@@ -2164,24 +2714,16 @@ class MonitorMySolar(DataUpdateCoordinator[None]):
         if entity_id_suffix_lower in self._ignored_entity_suffixes:
             return "sensor"  # Default to sensor without logging
         
-        brand_entities = ENTITIES.get(self.inverter_brand, {})
-        if not brand_entities:
+        hit = get_catalog_index(self.inverter_brand).get(entity_id_suffix_lower)
+        if hit is not None:
+            return hit.platform
+        if not ENTITIES.get(self.inverter_brand):
             # Only log this once per brand
             if self.inverter_brand not in self._ignored_entity_suffixes:
                 #LOGGER.debug(f"No entities defined for inverter brand: {self.inverter_brand}. Defaulting to 'sensor'.")
                 self._ignored_entity_suffixes.add(self.inverter_brand)
             return "sensor"
 
-        for entity_type in ["sensor", "switch", "number", "time", "time_hhmm", "button", "select"]:
-            if entity_type in brand_entities:
-                for bank_name, entities in brand_entities[entity_type].items():
-                    for entity in entities:
-                        unique_id_lower = entity["unique_id"].lower()
-                        if unique_id_lower == entity_id_suffix_lower:
-                            if entity_type == "time_hhmm":
-                                return "time"
-                            return entity_type
-
         # If we get here, we couldn't match the entity suffix
         # Log it once and add to ignore list
         #LOGGER.debug(f"Could not match entity_id_suffix '{entity_id_suffix_lower}'. Defaulting to 'sensor'.")
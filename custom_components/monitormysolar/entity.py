@@ -3,12 +3,29 @@ from __future__ import annotations
 
 import time
 from datetime import datetime, timedelta
+from typing import Any, Awaitable
 from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.helpers import recorder as recorder_helper
 
 from .coordinator import MonitorMySolar
-from .const import DOMAIN, LOGGER, CONF_ENABLE_DEVICE_GROUPING, DEFAULT_ENABLE_DEVICE_GROUPING
+from .const import (
+    CONF_DEADBAND_HEARTBEAT,
+    CONF_UPDATE_INTERVAL,
+    CONF_UPDATE_INTERVALS,
+    DEFAULT_DEADBAND_HEARTBEAT,
+    DEFAULT_DEADBANDS,
+    DEFAULT_UPDATE_INTERVAL,
+    DOMAIN,
+    LOGGER,
+    CONF_ENABLE_DEVICE_GROUPING,
+    DEFAULT_ENABLE_DEVICE_GROUPING,
+)
+
+# Platforms whose entities are user-facing settings. Their state is what the
+# user just set (or the dongle's confirmation of it), so it's never delayed.
+UNTHROTTLED_PLATFORMS = frozenset({"number", "switch", "select", "time", "button", "update"})
 
 class MonitorMySolarEntity(CoordinatorEntity[MonitorMySolar]):
     """Base MonitorMySolar entity."""
@@ -31,8 +48,16 @@ class MonitorMySolarEntity(CoordinatorEntity[MonitorMySolar]):
             self._attr_entity_registry_enabled_default = True
             
         # Initialize throttling variables
-        self._last_state_change = 0
+        self._last_state_change = None  # monotonic time of the last state write
         self._update_interval = None
+        self._throttle_cancel = None  # pending deferred write, if any
+        # Deadband filter state (see _passes_deadband)
+        self._deadband = None  # (absolute, relative), resolved on first use
+        self._deadband_value = None  # last value let through
+        self._deadband_written = None  # monotonic time it was let through
+        # Settings writes (see _async_track_write)
+        self._writes_in_flight = 0
+        self._revert_value = None  # what a failed write reverts to
 
     @property
     def available(self) -> bool:
@@ -41,18 +66,118 @@ class MonitorMySolarEntity(CoordinatorEntity[MonitorMySolar]):
         
     @property
     def update_interval(self) -> int:
-        """Get the update interval from config entry."""
+        """Minimum seconds between state writes for this entity.
+
+        `update_intervals` in the config entry may override the global
+        `update_interval` per device_class or per platform (device_class wins).
+        Settings platforms are never throttled.
+        """
         if self._update_interval is None:
-            # Get from config entry, default to 60 seconds if not set
-            self._update_interval = self.coordinator.entry.data.get("update_interval", 60)
+            platform = self.entity_id.split(".", 1)[0] if self.entity_id else None
+            if platform in UNTHROTTLED_PLATFORMS:
+                self._update_interval = 0
+            else:
+                data = self.coordinator.entry.data
+                overrides = data.get(CONF_UPDATE_INTERVALS) or {}
+                interval = overrides.get(str(getattr(self, "device_class", None) or ""))
+                if interval is None:
+                    interval = overrides.get(platform)
+                if interval is None:
+                    interval = data.get(CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL)
+                self._update_interval = interval
         return self._update_interval
-    
+
     def throttled_async_write_ha_state(self) -> None:
-        """Write HA state immediately - entities update in real-time."""
-        # For MonitorMySolar, we always write state immediately for real-time updates
-        # Call the parent class method directly to avoid recursion
+        """Write HA state at most once per update_interval.
+
+        Writes inside the interval are deferred, not dropped: one write is
+        scheduled for the end of the interval and carries whatever the entity
+        holds by then (the latest value).
+        """
+        interval = self.update_interval
+        now = time.monotonic()
+        if (
+            not interval
+            or self.hass is None
+            or self._last_state_change is None
+            or now - self._last_state_change >= interval
+        ):
+            self._cancel_throttled_write()
+            self._last_state_change = now
+            # Call the parent class method directly to avoid recursion
+            super().async_write_ha_state()
+            return
+        if self._throttle_cancel is None:
+            self._throttle_cancel = async_call_later(
+                self.hass, interval - (now - self._last_state_change), self._async_throttled_write
+            )
+            self.coordinator.register_pending_state_write(self)
+
+    @callback
+    def _async_throttled_write(self, _now=None) -> None:
+        """Perform the deferred write (end of interval, or a flush on shutdown)."""
+        self._cancel_throttled_write()
+        self._last_state_change = time.monotonic()
         super().async_write_ha_state()
-        
+
+    def _cancel_throttled_write(self) -> None:
+        if self._throttle_cancel is not None:
+            self._throttle_cancel()
+            self._throttle_cancel = None
+            self.coordinator.unregister_pending_state_write(self)
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Drop any deferred write; the coordinator flushes them before unload."""
+        self._cancel_throttled_write()
+        await super().async_will_remove_from_hass()
+
+    async def _async_track_write(self, previous: Any, value: Any, write: Awaitable[bool]) -> bool:
+        """Await a settings write, keeping _revert_value pointed at a confirmed value.
+
+        The MQTT handler coalesces queued writes to one setting, so the value
+        a caller replaced may itself have been replaced and never sent. The
+        revert target is the value from before the first outstanding write,
+        moved forward by each write that succeeds.
+        """
+        if not self._writes_in_flight:
+            self._revert_value = previous
+        self._writes_in_flight += 1
+        try:
+            success = await write
+        finally:
+            self._writes_in_flight -= 1
+        if success:
+            self._revert_value = value
+        return success
+
+    def _passes_deadband(self, value, sensor_info: dict) -> bool:
+        """Whether a new value moved far enough from the last one to be written.
+
+        Non-numeric values, and sensors without a band, always pass. Inside
+        the band the value is still let through once per heartbeat.
+        """
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return True
+        if self._deadband is None:
+            band = sensor_info
+            if "deadband" not in band and "deadband_rel" not in band:
+                band = DEFAULT_DEADBANDS.get(sensor_info.get("device_class"), {})
+            self._deadband = (band.get("deadband", 0), band.get("deadband_rel", 0))
+        absolute, relative = self._deadband
+        now = time.monotonic()
+        last = self._deadband_value
+        if (
+            last is None
+            or not (absolute or relative)
+            or abs(value - last) > max(absolute, relative * abs(last))
+            or now - self._deadband_written >= self.coordinator.entry.data.get(
+                CONF_DEADBAND_HEARTBEAT, DEFAULT_DEADBAND_HEARTBEAT) * 60
+        ):
+            self._deadband_value = value
+            self._deadband_written = now
+            return True
+        return False
+
     @property 
     def should_poll(self) -> bool:
         """No polling needed."""
@@ -191,11 +316,27 @@ class MonitorMySolarEntity(CoordinatorEntity[MonitorMySolar]):
         would sit empty forever. So pull whatever is already stored, right now.
         """
         await super().async_added_to_hass()
+        # Data messages are dispatched per key: subscribe to the coordinator keys
+        # this entity reads so we're only woken when one of them is written.
+        keys = self._coordinator_keys()
+        if keys:
+            self.async_on_remove(
+                self.coordinator.async_add_key_listener(self._handle_coordinator_update, keys)
+            )
         # Every subclass's _handle_coordinator_update guards internally (it no-ops
         # if there's nothing stored for this entity), so calling it unconditionally
         # is safe and seeds whatever the snapshot already delivered.
         self._handle_coordinator_update()
 
+    def _coordinator_keys(self) -> tuple[str, ...]:
+        """Coordinator store keys this entity derives its state from.
+
+        Defaults to its own entity_id. Entities computed from other keys (power
+        flow, calculated, status-field sensors) override this; virtual entities
+        that don't read the store return ().
+        """
+        return (self.entity_id,)
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Update sensor with latest data from coordinator."""
@@ -0,0 +1,162 @@
+"""Shared cache of the update server's published firmware versions.
+
+The update platform used to await an HTTP GET (10 s timeout) before creating
+any update entity, holding HA startup hostage to an external endpoint, and
+every DongleFirmwareUpdate ran its own 6-hourly timer against the same URL.
+
+FirmwareVersionCache is owned by the coordinator. It loads the last response
+from storage at once, then refreshes in the background with a conditional
+request (If-None-Match / If-Modified-Since), so an unchanged version file
+costs a 304. Update entities subscribe to it instead of fetching.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional, Set
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, LOGGER
+
+UPDATE_URL = "https://monitoring.monitormy.solar/version"
+UPDATE_CHECK_INTERVAL = timedelta(hours=6)
+FETCH_TIMEOUT = 10  # seconds
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.firmware_versions"
+
+
+class FirmwareVersionCache:
+    """Latest firmware versions from the update server, fetched once and shared."""
+
+    def __init__(self, hass: HomeAssistant, url: str = UPDATE_URL) -> None:
+        self.hass = hass
+        self.url = url
+        self.versions: Dict[str, Any] = {}
+        self.fetched_at: Optional[float] = None  # wall clock of the last 200/304
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._store: Store[Dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._listeners: Set[Callable[[], None]] = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._unsub_interval = None
+
+    @callback
+    def async_add_listener(self, update_callback: Callable[[], None]) -> Callable[[], None]:
+        """Call `update_callback` whenever the versions change. Returns a remover."""
+        self._listeners.add(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.discard(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_start(self) -> None:
+        """Load the stored versions and refresh in the background; never blocks."""
+        self.hass.async_create_background_task(self._async_start(), f"{DOMAIN} firmware versions")
+        self._unsub_interval = async_track_time_interval(
+            self.hass, self._async_periodic_refresh, UPDATE_CHECK_INTERVAL
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        if self._unsub_interval is not None:
+            self._unsub_interval()
+            self._unsub_interval = None
+
+    async def _async_start(self) -> None:
+        await self.async_load()
+        await self.async_refresh(max_age=UPDATE_CHECK_INTERVAL.total_seconds())
+
+    async def _async_periodic_refresh(self, _now=None) -> None:
+        await self.async_refresh()
+
+    async def async_load(self) -> None:
+        """Restore the last response saved to storage."""
+        try:
+            data = await self._store.async_load()
+        except Exception as e:
+            LOGGER.warning(f"Could not load cached firmware versions: {e}")
+            return
+        if not isinstance(data, dict) or self.fetched_at is not None:
+            return
+        self.versions = data.get("versions") or {}
+        self.fetched_at = data.get("fetched_at")
+        self._etag = data.get("etag")
+        self._last_modified = data.get("last_modified")
+        if self.versions:
+            self._notify()
+
+    async def async_refresh(self, max_age: float = 0) -> None:
+        """Fetch the versions unless the cached copy is younger than `max_age`.
+
+        Concurrent callers share one request.
+        """
+        if max_age and self.fetched_at is not None and time.time() - self.fetched_at < max_age:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = self.hass.async_create_task(self._async_fetch())
+        await asyncio.shield(self._refresh_task)
+
+    async def _async_fetch(self) -> None:
+        headers = {}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    self.url, headers=headers, timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT)
+                ) as response:
+                    if response.status == 304:
+                        LOGGER.debug("Server versions unchanged (304)")
+                        self.fetched_at = time.time()
+                        self._save()
+                        return
+                    if response.status != 200:
+                        LOGGER.warning(f"Failed to fetch server versions: HTTP {response.status}")
+                        return
+                    server_data = await response.json(content_type=None)
+                    if not isinstance(server_data, dict):
+                        LOGGER.warning(f"Unexpected server versions payload: {server_data!r}")
+                        return
+                    self._etag = response.headers.get("ETag")
+                    self._last_modified = response.headers.get("Last-Modified")
+        except asyncio.TimeoutError:
+            LOGGER.warning("Timeout fetching server versions")
+            return
+        except Exception as e:
+            LOGGER.error(f"Failed to fetch server versions: {e}")
+            return
+
+        self.fetched_at = time.time()
+        changed = server_data != self.versions
+        self.versions = server_data
+        self._save()
+        LOGGER.debug(f"Server versions updated: {server_data}")
+        if changed:
+            self._notify()
+
+    def _save(self) -> None:
+        self._store.async_delay_save(
+            lambda: {
+                "versions": self.versions,
+                "fetched_at": self.fetched_at,
+                "etag": self._etag,
+                "last_modified": self._last_modified,
+            },
+            1,
+        )
+
+    def _notify(self) -> None:
+        for update_callback in list(self._listeners):
+            update_callback()
@@ -1,286 +1,607 @@
 import asyncio
+from collections import deque
 from datetime import datetime
 import json
+from typing import Dict, List, NamedTuple, Optional, Tuple
 from homeassistant.core import HomeAssistant
 from homeassistant.components.mqtt import async_publish
 from homeassistant.components import mqtt
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .const import DOMAIN, LOGGER, SIGNAL_WRITE_LATENCY
+from .catalog import lookup as catalog_lookup
+from .write_latency import AckLatency
+
+RESPONSE_TIMEOUT = 15  # seconds to wait for <dongle>/response until latency is measured
+# Writes to one dongle issued within this window (a scene, an automation
+# setting several registers) go out as one {"settings": [...]} payload.
+BATCH_WINDOW = 0.03  # seconds
+MAX_BATCH_SETTINGS = 20
+
+# Write priority lanes, highest first. A dongle's worker always takes the
+# highest non-empty lane, so a user's write overtakes a queued sync sweep; a
+# write may be overtaken at most STARVATION_LIMIT times before it goes next.
+# Admin writes (restart, firmware update) go last, after pending settings land.
+LANE_INTERACTIVE = 0
+LANE_AUTOMATION = 1
+LANE_SYNC = 2
+LANE_ADMIN = 3
+LANE_NAMES = ("interactive", "automation", "sync", "admin")
+STARVATION_LIMIT = 8
+
+
+# Per-dongle outcome of a fan-out write.
+WRITE_OK = "ok"
+WRITE_FAILED = "failed"  # the dongle answered with a non-success status
+WRITE_TIMEOUT = "timeout"
+
+
+class DongleWriteResult(NamedTuple):
+    dongle_id: str
+    status: str  # WRITE_OK / WRITE_FAILED / WRITE_TIMEOUT
+    latency: Optional[float]  # seconds from publish to ack; None without an ack
+
+
+class FanOutResult(dict):
+    """dongle_id -> DongleWriteResult for one multi-dongle write.
+
+    Truthy only if every dongle acked with success, so callers that just need
+    "did it work" can keep using it as a bool.
+    """
+
+    def __bool__(self) -> bool:
+        return all(result.status == WRITE_OK for result in self.values())
+
+    @property
+    def failed(self) -> List[str]:
+        """Dongles that didn't confirm the write (failed or timed out)."""
+        return [dongle_id for dongle_id, result in self.items() if result.status != WRITE_OK]
+
+
+def topic_dongle_id(dongle_id: str) -> str:
+    """The dongle id as it appears in MQTT topics ("dongle-AB:CD:..")."""
+    parts = dongle_id.replace("_", "-").split("-")
+    parts[1] = parts[1].upper()
+    return "-".join(parts)
+
+
+class QueuedCommand:
+    """One write waiting in (or running from) a dongle's command queue.
+
+    `future` resolves to True once the dongle acked with a `success` status,
+    and False on a failure status (the entity is reverted, as before) or a
+    timeout; `status` tells the two apart.
+    """
+
+    def __init__(self, dongle_id, payload: dict, entity, topic_suffix: str = "update",
+                 confirm: bool = True, lane: int = LANE_INTERACTIVE):
+        self.dongle_id = dongle_id
+        self.lane = lane
+        self.topic_id = topic_dongle_id(dongle_id)
+        self.payload = payload  # {"setting", "value"} or {"settings": [...]}
+        self.entity = entity
+        self.topic_suffix = topic_suffix
+        # Single-dongle writes commit/revert the entity from the response;
+        # parts of a multi-dongle write only report their status.
+        self.confirm = confirm
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.response_event = asyncio.Event()
+        self.status = None
+        # Settings already confirmed by their FW >= 4.3.0 /setting/updated echo.
+        self.echoed: set = set()
+        self.sent_at: Optional[float] = None  # loop time of the publish
+        self.confirmed_at: Optional[float] = None  # loop time of the ack
+        # (topic dongle id, setting) while this write is queued and may still
+        # absorb newer values for the same setting; None once sent.
+        self.coalesce_key: Optional[Tuple[str, str]] = None
+        # Every write sent in the same payload, this one included; the single
+        # ack settles them all.
+        self.batch: List["QueuedCommand"] = [self]
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Seconds from publish to ack, None if it wasn't acked."""
+        if self.sent_at is None or self.confirmed_at is None:
+            return None
+        return self.confirmed_at - self.sent_at
+
+    @property
+    def settings(self) -> List[dict]:
+        """This write as {"setting", "value"} items."""
+        if "settings" in self.payload:
+            return self.payload["settings"]
+        return [self.payload]
+
+    @property
+    def setting_names(self) -> List[str]:
+        """Settings this write carries, for matching the dongle's ack."""
+        return [item["setting"] for item in self.settings]
+
+    @property
+    def batchable(self) -> bool:
+        # GridBoss bank writes from the multi-dongle path use their own topic;
+        # admin commands (restart, firmware update) always go out alone.
+        return self.topic_suffix == "update" and self.lane != LANE_ADMIN
+
+    @property
+    def has_echo(self) -> bool:
+        """FW >= 4.3.0 echoes setting writes on /setting/updated; admin commands aren't."""
+        return self.lane != LANE_ADMIN
+
+
+class CommandQueue:
+    """One dongle's pending writes, in priority lanes (FIFO within a lane)."""
+
+    def __init__(self) -> None:
+        self._lanes = [deque() for _ in LANE_NAMES]
+        # Per lane: how many times a higher lane was served while it waited.
+        self._skipped = [0] * len(LANE_NAMES)
+        self._ready = asyncio.Event()
+
+    def put_nowait(self, command: QueuedCommand) -> None:
+        self._lanes[command.lane].append(command)
+        self._ready.set()
+
+    def promote(self, command: QueuedCommand, lane: int) -> None:
+        """Move a queued write up to `lane` (no-op if it's already as high)."""
+        if lane >= command.lane:
+            return
+        try:
+            self._lanes[command.lane].remove(command)
+        except ValueError:
+            command.lane = lane  # already taken off the queue
+            return
+        command.lane = lane
+        self._lanes[lane].append(command)
+
+    def _next_lane(self) -> int:
+        waiting = [lane for lane, commands in enumerate(self._lanes) if commands]
+        if not waiting:
+            raise asyncio.QueueEmpty
+        starved = [lane for lane in waiting if self._skipped[lane] >= STARVATION_LIMIT]
+        return starved[0] if starved else waiting[0]
+
+    def _pop(self, lane: int) -> QueuedCommand:
+        command = self._lanes[lane].popleft()
+        if not self._lanes[lane]:
+            self._skipped[lane] = 0
+        if self.empty():
+            self._ready.clear()
+        return command
+
+    def get_nowait(self) -> QueuedCommand:
+        """Take the next write to send; every other waiting lane counts a skip."""
+        pick = self._next_lane()
+        for lane, commands in enumerate(self._lanes):
+            if commands:
+                self._skipped[lane] = 0 if lane == pick else self._skipped[lane] + 1
+        return self._pop(pick)
+
+    def peek(self) -> QueuedCommand:
+        """The write get_nowait would return, left on the queue."""
+        return self._lanes[self._next_lane()][0]
+
+    def take_nowait(self) -> QueuedCommand:
+        """Take the peeked write into the current batch, without counting skips.
+
+        Only the write that starts a send counts as serving its lane, so
+        batch-filling can't reset a starved lane's count.
+        """
+        return self._pop(self._next_lane())
+
+    async def get(self) -> QueuedCommand:
+        while self.empty():
+            await self._ready.wait()
+        return self.get_nowait()
+
+    def empty(self) -> bool:
+        return not any(self._lanes)
+
+    def qsize(self) -> int:
+        return sum(len(commands) for commands in self._lanes)
+
+    def depths(self) -> Dict[str, int]:
+        return {name: len(commands) for name, commands in zip(LANE_NAMES, self._lanes)}
 
-from .const import DOMAIN, LOGGER, ENTITIES
 
 class MQTTHandler:
     def __init__(self, hass: HomeAssistant):
         self.hass = hass
-        self.last_time_update = None
-        self.response_received_event = asyncio.Event()
-        self._processing = False  # To track if a command is currently being processed
-        self._lock = asyncio.Lock()  # A lock to ensure only one command is processed at a time
-        self.current_entity = None  # Store the current entity
-        self._unsubscribe_response = None
-        self._pending_dongles = set()  # Track which dongles we're waiting for responses from
-        self._dongle_responses = {}  # Store responses from each dongle
-
-    async def send_update(self, dongle_id, unique_id, value, entity):
-        now = datetime.now()
-        LOGGER.info(f"Sending update for {entity.entity_id} with value {value}")
-
-        # Rate limiting logic: only allow one update per 1 second per entity
-        if self.last_time_update and (now - self.last_time_update).total_seconds() < 1:
-            LOGGER.info(f"Rate limit hit for {entity.entity_id}. Dropping update.")
-            return
-
-        async with self._lock:  # Ensure only one command is processed at a time
-            if self._processing:
-                LOGGER.info(f"Already processing an update for {entity.entity_id}.")
-                return
-
-            self._processing = True
-            self.last_time_update = now
-            self.current_entity = entity  # Store the entity to be used later in the response handling
-
+        # Writes are queued per dongle (in priority lanes) and sent by one
+        # worker each, so a dongle only ever has one write awaiting its
+        # /response while different dongles proceed concurrently. Nothing is
+        # dropped: every write gets a future with its result.
+        self._queues: Dict[str, CommandQueue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        # Correlation table for acks: topic dongle id -> {setting: in-flight
+        # write}. /response arrives through the coordinator's planned
+        # subscription, so writes don't subscribe/unsubscribe per command.
+        self._in_flight: Dict[str, Dict[str, QueuedCommand]] = {}
+        # Latest-value-wins: (topic dongle id, setting) -> the queued, not yet
+        # sent write for it. A newer value replaces the queued one, so a slider
+        # drag puts at most the in-flight value and the final value on the wire.
+        self._pending_writes: Dict[Tuple[str, str], QueuedCommand] = {}
+        # Measured ack latency per topic dongle id; drives each write's timeout.
+        self._latency: Dict[str, AckLatency] = {}
+
+    def enqueue(self, command: QueuedCommand) -> asyncio.Future:
+        """Queue a write behind any earlier ones for the same dongle."""
+        key = command.topic_id
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = CommandQueue()
+        worker = self._workers.get(key)
+        if worker is None or worker.done():
+            self._workers[key] = self.hass.async_create_background_task(
+                self._worker(key, queue), f"{DOMAIN} command queue {key}"
+            )
+        depth = queue.qsize()
+        if depth:
+            LOGGER.debug(f"Queued write for {key} behind {depth} pending")
+        queue.put_nowait(command)
+        self._signal_diagnostics(command.dongle_id)
+        return command.future
+
+    def _signal_diagnostics(self, dongle_id: str) -> None:
+        async_dispatcher_send(self.hass, SIGNAL_WRITE_LATENCY.format(dongle_id))
+
+    @staticmethod
+    def _lane_for(entity) -> int:
+        """Interactive for a user's action, automation for a write with no user.
+
+        HA stamps the service call's context on the entity; automations and
+        scripts run without a user_id.
+        """
+        context = getattr(entity, "_context", None)
+        if context is not None and getattr(context, "user_id", None) is None:
+            return LANE_AUTOMATION
+        return LANE_INTERACTIVE
+
+    def ack_timeout(self, dongle_id: str) -> float:
+        """Seconds the next write to this dongle waits for its ack."""
+        latency = self._latency.get(topic_dongle_id(dongle_id))
+        return latency.timeout(RESPONSE_TIMEOUT) if latency else RESPONSE_TIMEOUT
+
+    def latency_stats(self, dongle_id: str) -> Dict[str, Optional[float]]:
+        """Ack latency p50/p95/p99 and the current timeout (ms) for a dongle."""
+        latency = self._latency.get(topic_dongle_id(dongle_id)) or AckLatency()
+        return latency.stats(RESPONSE_TIMEOUT)
+
+    def queue_depth(self, dongle_id: str) -> int:
+        """Writes waiting (not yet sent) for a dongle."""
+        queue = self._queues.get(topic_dongle_id(dongle_id))
+        return queue.qsize() if queue is not None else 0
+
+    def lane_depths(self, dongle_id: str) -> Dict[str, int]:
+        """Writes waiting for a dongle, per priority lane."""
+        queue = self._queues.get(topic_dongle_id(dongle_id)) or CommandQueue()
+        return queue.depths()
+
+    async def _worker(self, key: str, queue: CommandQueue) -> None:
+        while True:
+            command = await queue.get()
+            batch = [command]
             try:
-                success = await self._process_command(dongle_id, unique_id, value, entity)
-                return success
-            finally:
-                # Clear variables after processing the command
-                self._processing = False
-                self.response_received_event.clear()
-                self.current_entity = None  # Clear entity after processing
-
-    async def _process_command(self, dongle_id, unique_id, value, entity):
-        modified_dongle_id = dongle_id.replace("_", "-").split("-")
-        modified_dongle_id[1] = modified_dongle_id[1].upper()
-        modified_dongle_id = "-".join(modified_dongle_id)
-
+                if command.batchable:
+                    # Let writes issued together catch up, then send them as one.
+                    await asyncio.sleep(BATCH_WINDOW)
+                    self._fill_batch(batch, queue)
+                for queued in batch:
+                    if queued.coalesce_key is not None:
+                        self._pending_writes.pop(queued.coalesce_key, None)
+                        queued.coalesce_key = None
+                # Skip writes whose caller gave up (cancelled) while queued.
+                batch = [queued for queued in batch if not queued.future.done()]
+                if not batch:
+                    continue
+                results = await self._execute(batch)
+                for queued, result in zip(batch, results):
+                    if not queued.future.done():
+                        queued.future.set_result(result)
+            except asyncio.CancelledError:
+                for queued in batch:
+                    if not queued.future.done():
+                        queued.future.set_result(False)
+                raise
+            except Exception as e:
+                LOGGER.error(f"Error sending write to {command.dongle_id}: {e}")
+                for queued in batch:
+                    if not queued.future.done():
+                        queued.future.set_exception(e)
+
+    @staticmethod
+    def _fill_batch(batch: List[QueuedCommand], queue: CommandQueue) -> None:
+        """Move queued writes that can share batch[0]'s payload into `batch`.
+
+        Writes are taken in the order the queue would serve them. A write that
+        can't join (not batchable, a repeated setting, a full payload) stays
+        queued and starts the next batch, so writes to one setting still land
+        in order.
+        """
+        names = set(batch[0].setting_names)
+        while not queue.empty():
+            nxt = queue.peek()
+            if (
+                not nxt.batchable
+                or names.intersection(nxt.setting_names)
+                or len(names) + len(nxt.setting_names) > MAX_BATCH_SETTINGS
+            ):
+                return
+            batch.append(queue.take_nowait())
+            names.update(nxt.setting_names)
+
+    async def async_stop(self) -> None:
+        """Stop the workers; writes still queued resolve as failed, with a log."""
+        for key, queue in self._queues.items():
+            while not queue.empty():
+                command = queue.get_nowait()
+                LOGGER.warning(f"Discarding queued write for {key} on shutdown: {command.payload}")
+                if not command.future.done():
+                    command.future.set_result(False)
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+        self._in_flight.clear()
+        self._pending_writes.clear()
+
+    def _track(self, command: QueuedCommand) -> None:
+        table = self._in_flight.setdefault(command.topic_id, {})
+        for setting in command.setting_names:
+            table[setting] = command
+
+    def _release(self, command: QueuedCommand) -> None:
+        table = self._in_flight.get(command.topic_id)
+        if not table:
+            return
+        for setting in command.setting_names:
+            if table.get(setting) is command:
+                del table[setting]
+
+    def _match_response(self, topic_id: str, response) -> Optional[QueuedCommand]:
+        """Find the in-flight write an ack belongs to.
+
+        The ack names the setting for single writes; otherwise (multi-setting
+        payloads, malformed acks) it belongs to the oldest write in flight.
+        """
+        table = self._in_flight.get(topic_id)
+        if not table:
+            return None
+        setting = response.get("setting") if isinstance(response, dict) else None
+        if setting in table:
+            return table[setting]
+        return next(iter(table.values()))
+
+    async def send_update(self, dongle_id, unique_id, value, entity, lane: Optional[int] = None):
+        """Write one setting; resolves with the result of the value finally sent.
+
+        If a write to the same setting is still queued behind an in-flight one,
+        `value` replaces it instead of queueing another write, and every caller
+        waiting on that setting gets the result of the last value. `lane`
+        defaults to interactive or automation from the entity's context.
+        """
+        LOGGER.info(f"Sending update for {entity.entity_id} with value {value}")
+        if lane is None:
+            lane = self._lane_for(entity)
+        key = (topic_dongle_id(dongle_id), unique_id)
+        pending = self._pending_writes.get(key)
+        if pending is not None and not pending.future.done():
+            LOGGER.debug(
+                f"Coalescing write for {entity.entity_id}: {pending.payload['value']} -> {value}"
+            )
+            pending.payload["value"] = value
+            pending.entity = entity
+            self._queues[key[0]].promote(pending, lane)
+            # Shielded: one impatient caller must not cancel everyone's write.
+            return await asyncio.shield(pending.future)
+
+        command = QueuedCommand(dongle_id, {"setting": unique_id, "value": value}, entity, lane=lane)
+        command.coalesce_key = key
+        self._pending_writes[key] = command
+        return await self.enqueue(command)
+
+    async def _execute(self, batch: List[QueuedCommand]) -> List[bool]:
+        """Send queued writes as one payload and wait until each is confirmed.
+
+        A write is confirmed by the dongle's /response (one ack for the whole
+        payload) or, on FW >= 4.3.0, by the /setting/updated echo of each of
+        its settings, whichever arrives first. Returns one result per write.
+        """
+        command = batch[0]
+        key = command.topic_id
         # All settings (including GridBoss settings) should be sent to the /update topic
         # GridBoss bank topics are only for reading data, not for sending updates
-        topic = f"{modified_dongle_id}/update"
-        
-        # Updated payload with setting, value, and from: homeassistant
-        payload = json.dumps({
-            "setting": unique_id, 
-            "value": value, 
-            "from": "homeassistant"
-        })
-        
-        LOGGER.info(f"Sending MQTT update: {topic} - {payload} at {datetime.now()}")
-        await mqtt.async_publish(self.hass, topic, payload)
-
-        # Record this write so the FW >= 4.3.0 /setting/updated echo of the same
-        # value can be deduped (we already apply it via /response). Guard for
-        # older coordinators that predate the ledger.
-        if hasattr(self.coordinator, "record_self_write"):
-            self.coordinator.record_self_write(dongle_id, unique_id, value)
-
-        self.response_received_event.clear()  # Reset the event before sending the update
-
-        # Clean up any existing subscription
-        if self._unsubscribe_response:
-            self._unsubscribe_response()
-            self._unsubscribe_response = None
-
-        response_topic = f"{modified_dongle_id}/response"
-        # Create a single subscription and store the unsubscribe function
-        self._unsubscribe_response = await mqtt.async_subscribe(
-            self.hass, 
-            response_topic, 
-            self.response_received
-        )
-
+        topic = f"{key}/{command.topic_suffix}"
+        if len(batch) == 1:
+            body = command.payload
+        else:
+            body = {"settings": [item for queued in batch for item in queued.settings]}
+            LOGGER.debug(f"Batching {len(batch)} writes for {key} into one payload")
+        payload = json.dumps({**body, "from": "homeassistant"})
+
+        # Register before publishing so a fast ack can't be missed.
+        for queued in batch:
+            queued.batch = batch
+            self._track(queued)
         try:
-            await asyncio.wait_for(self.response_received_event.wait(), timeout=15)
-            LOGGER.debug(f"Response received or timeout for {entity.entity_id} at {datetime.now()}")
-            return True
-        except asyncio.TimeoutError:
-            LOGGER.error(f"No response received for {entity.entity_id} within the timeout period.")
-            self.hass.loop.call_soon_threadsafe(entity.revert_state)
-            return False
+            LOGGER.info(f"Sending MQTT update: {topic} - {payload} at {datetime.now()}")
+            await mqtt.async_publish(self.hass, topic, payload)
+
+            # FW >= 4.3.0 dongles confirm through the echo itself (see
+            # confirm_from_echo). Only while the generation is still unknown can
+            # both confirmations arrive, so only then record the write for the
+            # coordinator to dedupe a late echo. Fan-out and sync parts commit
+            # nothing on their ack, so their echo must always apply. Guard for
+            # older coordinators that predate the ledger.
+            if (
+                hasattr(self.coordinator, "record_self_write")
+                and not self.coordinator.confirms_writes_by_echo(command.dongle_id)
+            ):
+                for queued in batch:
+                    if queued.confirm and "setting" in queued.payload:
+                        self.coordinator.record_self_write(
+                            queued.dongle_id, queued.payload["setting"], queued.payload["value"]
+                        )
+
+            latency = self._latency.setdefault(key, AckLatency())
+            timeout = latency.timeout(RESPONSE_TIMEOUT)
+            started = self.hass.loop.time()
+            for queued in batch:
+                queued.sent_at = started
+            self._signal_diagnostics(command.dongle_id)
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(queued.response_event.wait() for queued in batch)),
+                    timeout=timeout,
+                )
+                elapsed = self.hass.loop.time() - started
+                latency.record(elapsed)
+                self._signal_diagnostics(command.dongle_id)
+                LOGGER.debug(f"Response received for {topic} in {elapsed * 1000:.0f} ms")
+                return [queued.status == 'success' for queued in batch]
+            except asyncio.TimeoutError:
+                latency.record_timeout(timeout)
+                self._signal_diagnostics(command.dongle_id)
+                LOGGER.warning(f"No response from {key} within {timeout:.1f} s")
+                results = []
+                for queued in batch:
+                    confirmed = queued.response_event.is_set()
+                    results.append(confirmed and queued.status == 'success')
+                    if confirmed:
+                        continue
+                    LOGGER.error(f"No response received for {queued.entity.entity_id} within the timeout period.")
+                    if queued.confirm:
+                        self._revert(queued.entity)
+                return results
         finally:
-            # Unsubscribe from the response topic
-            if self._unsubscribe_response:
-                self._unsubscribe_response()
-                self._unsubscribe_response = None
-
-    async def send_update_to_multiple_dongles(self, dongle_ids, unique_id, value, entity):
-        """Send the same update to multiple dongles and wait for all responses."""
-        now = datetime.now()
+            for queued in batch:
+                self._release(queued)
+
+    async def send_update_to_multiple_dongles(self, dongle_ids, unique_id, value, entity,
+                                              lane: Optional[int] = None) -> FanOutResult:
+        """Send the same update to multiple dongles and wait for all responses.
+
+        Each dongle's part goes through that dongle's queue, so the parts are
+        published and acked concurrently (the write takes as long as the
+        slowest dongle, not the sum) and never jump ahead of writes already
+        queued there. Returns the per-dongle outcome; falsy if any dongle
+        didn't confirm, in which case the entity is reverted once.
+        """
         LOGGER.info(f"Sending update to multiple dongles for {entity.entity_id} with value {value}")
-        
-        # Rate limiting logic
-        if self.last_time_update and (now - self.last_time_update).total_seconds() < 1:
-            LOGGER.info(f"Rate limit hit for {entity.entity_id}. Dropping update.")
-            return False
-            
-        async with self._lock:
-            if self._processing:
-                LOGGER.info(f"Already processing an update for {entity.entity_id}.")
-                return False
-                
-            self._processing = True
-            self.last_time_update = now
-            self.current_entity = entity
-            
-            try:
-                # Store original dongle IDs for response matching
-                self._pending_dongles = set(dongle_ids)
-                self._dongle_responses = {}
-                success = True
-                
-                LOGGER.info(f"Expecting responses from {len(dongle_ids)} dongles: {dongle_ids}")
-                
-                # Set up subscriptions for all dongles first
-                unsubscribe_functions = []
-                for dongle_id in dongle_ids:
-                    modified_dongle_id = dongle_id.replace("_", "-").split("-")
-                    modified_dongle_id[1] = modified_dongle_id[1].upper()
-                    modified_dongle_id = "-".join(modified_dongle_id)
-                    
-                    response_topic = f"{modified_dongle_id}/response"
-                    unsubscribe = await mqtt.async_subscribe(
-                        self.hass,
-                        response_topic,
-                        self.response_received_multi_dongle
-                    )
-                    unsubscribe_functions.append(unsubscribe)
-                
-                # Now send updates to all dongles
-                for dongle_id in dongle_ids:
-                    modified_dongle_id = dongle_id.replace("_", "-").split("-")
-                    modified_dongle_id[1] = modified_dongle_id[1].upper()
-                    modified_dongle_id = "-".join(modified_dongle_id)
-                    
-                    # Check if this is a GridBoss setting
-                    is_gridboss_setting = self._is_gridboss_setting(unique_id)
-                    
-                    if is_gridboss_setting:
-                        # For GridBoss settings, we need to determine the correct bank
-                        bank = self._get_gridboss_bank(unique_id)
-                        topic = f"{modified_dongle_id}/gridboss_{bank}"
-                    else:
-                        topic = f"{modified_dongle_id}/update"
-                    
-                    payload = json.dumps({
-                        "setting": unique_id,
-                        "value": value,
-                        "from": "homeassistant"
-                    })
-                    
-                    LOGGER.info(f"Sending MQTT update to dongle {dongle_id}: {topic} - {payload}")
-                    await mqtt.async_publish(self.hass, topic, payload)
-                
-                # Wait for all responses or timeout
-                try:
-                    # We'll wait for all dongles to respond or for a timeout
-                    await asyncio.wait_for(self._wait_for_all_responses(), timeout=15)
-                    LOGGER.info(f"Received responses from all dongles for {entity.entity_id}")
-                    
-                    # Check if any dongle reported failure
-                    for dongle_id, status in self._dongle_responses.items():
-                        if status != 'success':
-                            LOGGER.error(f"Dongle {dongle_id} reported failure for {entity.entity_id}")
-                            success = False
-                    
-                except asyncio.TimeoutError:
-                    LOGGER.error(f"Timeout waiting for responses from dongles: {self._pending_dongles}")
-                    success = False
-                
-                # If any dongle failed, revert state
-                if not success:
-                    self.hass.loop.call_soon_threadsafe(entity.revert_state)
-                
-                return success
-            finally:
-                # Clean up
-                for unsubscribe in unsubscribe_functions:
-                    unsubscribe()
-                self._processing = False
-                self._pending_dongles = set()
-                self._dongle_responses = {}
-                self.current_entity = None
-    
-    async def _wait_for_all_responses(self):
-        """Wait until all pending dongles have responded."""
-        while self._pending_dongles:
-            # Create event that will be set when a dongle response is received
-            event = asyncio.Event()
-            
-            # Store the event to be triggered when a response arrives
-            self._response_event = event
-            
-            # Wait for a response
-            await event.wait()
-            
-            # Reset the event for the next iteration
-            self._response_event = None
-    
-    async def response_received_multi_dongle(self, msg):
-        """Handle response from a dongle in a multi-dongle update scenario."""
-        entity = self.current_entity
-        if not entity:
-            return
-            
-        LOGGER.info(f"Received multi-dongle response for topic {msg.topic}: {msg.payload}")
-        
-        # Extract dongle ID from the topic
-        # Topic format is "{modified_dongle_id}/response"
-        topic_parts = msg.topic.split('/')
-        if len(topic_parts) < 2:
-            return
-        
-        modified_dongle_id = topic_parts[0]
-        
-        # The modified_dongle_id from topic is like "dongle-12:34:56:78:90:12"
-        # We need to match this against the original dongle IDs in _pending_dongles
-        # which should also be in the format "dongle-12:34:56:78:90:12"
-        
-        # For response matching, we use the modified_dongle_id as-is
-        dongle_id_for_matching = modified_dongle_id
-        
-        # Log the conversion for debugging
-        LOGGER.debug(f"Response received from dongle: {dongle_id_for_matching}")
-        
-        try:
-            response = json.loads(msg.payload)
-            status = response.get('status')
-            
-            # Remove dongle from pending set
-            if dongle_id_for_matching in self._pending_dongles:
-                self._pending_dongles.remove(dongle_id_for_matching)
-                # Store response with the original dongle ID
-                self._dongle_responses[dongle_id_for_matching] = status
-                LOGGER.info(f"Received response from {dongle_id_for_matching} (status: {status}). Still waiting for: {self._pending_dongles}")
+
+        # Check if this is a GridBoss setting
+        if self._is_gridboss_setting(unique_id):
+            # For GridBoss settings, we need to determine the correct bank
+            topic_suffix = f"gridboss_{self._get_gridboss_bank(unique_id)}"
+        else:
+            topic_suffix = "update"
+
+        if lane is None:
+            lane = self._lane_for(entity)
+        commands = [
+            QueuedCommand(dongle_id, {"setting": unique_id, "value": value}, entity,
+                          topic_suffix=topic_suffix, confirm=False, lane=lane)
+            for dongle_id in dongle_ids
+        ]
+        LOGGER.info(f"Expecting responses from {len(dongle_ids)} dongles: {dongle_ids}")
+        results = await asyncio.gather(
+            *(self.enqueue(command) for command in commands), return_exceptions=True
+        )
+
+        outcome = FanOutResult()
+        for command, result in zip(commands, results):
+            if result is True:
+                status = WRITE_OK
+            elif command.status is not None or isinstance(result, Exception):
+                LOGGER.error(f"Dongle {command.dongle_id} reported failure for {entity.entity_id}")
+                status = WRITE_FAILED
             else:
-                LOGGER.warning(f"Received unexpected response from {dongle_id_for_matching} - was not in pending list: {self._pending_dongles}")
-                
-            # If this was the last pending dongle, signal success
-            if not self._pending_dongles and self._response_event:
-                LOGGER.info(f"All dongles have responded. Responses: {self._dongle_responses}")
-                self._response_event.set()
-                
-        except json.JSONDecodeError:
-            LOGGER.error(f"Failed to decode JSON response for dongle {dongle_id_for_matching}: {msg.payload}")
-            
-            # Handle error case
-            if dongle_id_for_matching in self._pending_dongles:
-                self._pending_dongles.remove(dongle_id_for_matching)
-                # Count this as a response, but with failure
-                self._dongle_responses[dongle_id_for_matching] = 'error'
-                LOGGER.info(f"Marked {dongle_id_for_matching} as error. Still waiting for: {self._pending_dongles}")
-                
-            if not self._pending_dongles and self._response_event:
-                LOGGER.info(f"All dongles have responded (with errors). Responses: {self._dongle_responses}")
-                self._response_event.set()
+                LOGGER.error(f"Timeout waiting for response from dongle {command.dongle_id} for {entity.entity_id}")
+                status = WRITE_TIMEOUT
+            outcome[command.dongle_id] = DongleWriteResult(command.dongle_id, status, command.latency)
+        if outcome:
+            LOGGER.info(f"Received responses from all dongles for {entity.entity_id}")
+        else:
+            # If any dongle failed, revert state
+            self._revert(entity)
+        return outcome
 
     async def response_received(self, msg):
-        """Handle the response received message."""
-        entity = self.current_entity
-        if not entity:
+        """Handle a /response: match it to its in-flight write(s) and settle them."""
+        try:
+            response = json.loads(msg.payload)
+        except json.JSONDecodeError:
+            response = None
+        command = self._match_response(msg.topic.split("/", 1)[0], response)
+        if command is None:
+            LOGGER.debug(f"Ignoring response with no write in flight: {msg.topic} - {msg.payload}")
+            return
+        if (
+            command.has_echo
+            and self.coordinator.confirms_writes_by_echo(command.dongle_id)
+            and not (isinstance(response, dict) and response.get("status") not in (None, "success"))
+        ):
+            # The /setting/updated echo confirms it (confirm_from_echo). A
+            # failure gets no echo, so that /response still settles the write.
+            LOGGER.debug(f"Ignoring response for a write confirmed by its echo: {msg.topic}")
             return
-
         LOGGER.info(f"Received response for topic {msg.topic} at {datetime.now()}: {msg.payload}")
+        # One ack covers the whole payload; fan its result back to each write.
+        # Releasing first means a duplicate ack can't settle them twice.
+        for queued in command.batch:
+            self._release(queued)
+        for queued in command.batch:
+            self._settle(queued, response, msg.payload)
+
+    def _revert(self, entity) -> None:
+        """Roll back an entity's optimistic state (buttons have none)."""
+        if hasattr(entity, "revert_state"):
+            self.hass.loop.call_soon_threadsafe(entity.revert_state)
+
+    def confirm_from_echo(self, dongle_id: str, setting: str, normalized_value) -> bool:
+        """Settle the in-flight write a FW >= 4.3.0 /setting/updated echo confirms.
+
+        Called by the coordinator with the echo's value already normalized.
+        Returns True if the echo matched a write we're waiting on (same setting,
+        same value); False leaves the echo to be applied as an external change.
+        """
+        table = self._in_flight.get(topic_dongle_id(dongle_id))
+        if not table:
+            return False
+        wanted = setting.lower()
+        for name, command in table.items():
+            if name.lower() == wanted:
+                break
+        else:
+            return False
+        sent = next(item["value"] for item in command.settings if item["setting"] == name)
+        if self.coordinator.normalize_written_value(name, sent) != normalized_value:
+            # A competing write landed a different value; keep waiting for ours.
+            return False
+        del table[name]
+        command.echoed.add(name)
+        LOGGER.debug(f"Write to {name} on {dongle_id} confirmed by /setting/updated")
+        if command.echoed.issuperset(command.setting_names):
+            self._release(command)
+            self._settle(command, {"status": "success", "setting": name}, None)
+        return True
+
+    def _settle(self, command: QueuedCommand, response, raw_payload) -> None:
+        """Commit or revert one write's entity from the dongle's ack."""
+        command.confirmed_at = self.hass.loop.time()
+        entity = command.entity
         try:
-            response = json.loads(msg.payload)
-            
-            if response.get('status') == 'success':
+            if not isinstance(response, dict):
+                LOGGER.error(f"Failed to decode JSON response for {entity.entity_id}: {raw_payload}")
+                command.status = 'error'
+                if command.confirm:
+                    self._revert(entity)
+                return
+            command.status = response.get('status')
+
+            if not command.confirm:
+                # One part of a multi-dongle write; the sender tallies the statuses.
+                pass
+            elif command.status == 'success':
                 LOGGER.info(f"Successfully updated state of entity {entity.entity_id}.")
 
                 # The dongle's `success` reply is authoritative: the value we
@@ -288,7 +609,7 @@ class MQTTHandler:
                 # state — do not read anything back, do not re-derive. This is
                 # the crux: HA only cares that the write succeeded; it already
                 # knows the value it asked for.
-                setting_name = response.get('setting')
+                setting_name = command.payload.get('setting') or response.get('setting')
                 dongle_id = getattr(entity, '_dongle_id', None)
 
                 # Select entities own their commit logic (mirror the sent option
@@ -299,7 +620,7 @@ class MQTTHandler:
                     # Non-select entities: keep the optimistic state and mirror
                     # it into the coordinator so a later refresh doesn't revert.
                     entity_id = entity.entity_id
-                    self.coordinator.entities[entity_id] = entity._state
+                    self.coordinator.set_optimistic_value(entity_id, entity._state)
                     self.hass.loop.call_soon_threadsafe(entity.async_write_ha_state)
                 else:
                     self.hass.loop.call_soon_threadsafe(entity.async_write_ha_state)
@@ -315,108 +636,31 @@ class MQTTHandler:
                         self.coordinator.update_discharge_control_setting(dongle_id, new_value)
             else:
                 LOGGER.error(f"Failed to update state for {entity.entity_id}, reverting state.")
-                self.hass.loop.call_soon_threadsafe(entity.revert_state)
-        except json.JSONDecodeError:
-            LOGGER.error(f"Failed to decode JSON response for {entity.entity_id}: {msg.payload}")
-            self.hass.loop.call_soon_threadsafe(entity.revert_state)
+                self._revert(entity)
         finally:
-            # Unsubscribe and clear the event
-            if self._unsubscribe_response:
-                self._unsubscribe_response()
-                self._unsubscribe_response = None
-            self.response_received_event.set()
-
-    async def send_multiple_updates(self, dongle_id, payload_dict, entity):
-        """Handle multiple settings updates."""
-        now = datetime.now()
-        LOGGER.info(f"Sending multiple updates for {entity.entity_id} with payload {payload_dict}")
-
-        if self.last_time_update and (now - self.last_time_update).total_seconds() < 1:
-            LOGGER.info(f"Rate limit hit for {entity.entity_id}. Dropping update.")
-            return
-
-        async with self._lock:
-            if self._processing:
-                LOGGER.info(f"Already processing an update for {entity.entity_id}.")
-                return
-
-            self._processing = True
-            self.last_time_update = now
-            self.current_entity = entity
-
-            try:
-                success = await self._process_multiple_commands(dongle_id, payload_dict, entity)
-                return success
-            finally:
-                self._processing = False
-                self.response_received_event.clear()
-                self.current_entity = None
-
-    async def _process_multiple_commands(self, dongle_id, payload_dict, entity):
-        """Process multiple commands in a single payload."""
-        modified_dongle_id = dongle_id.replace("_", "-").split("-")
-        modified_dongle_id[1] = modified_dongle_id[1].upper()
-        modified_dongle_id = "-".join(modified_dongle_id)
+            command.response_event.set()
 
-        # All settings (including GridBoss settings) should be sent to the /update topic
-        # GridBoss bank topics are only for reading data, not for sending updates
-        topic = f"{modified_dongle_id}/update"
-        
-        # Create payload with multiple settings
-        settings = []
-        for setting, value in payload_dict.items():
-            settings.append({
-                "setting": setting,
-                "value": value
-            })
-        
-        payload = json.dumps({
-            "settings": settings,
-            "from": "homeassistant"
-        })
-        
-        LOGGER.info(f"Sending MQTT update: {topic} - {payload} at {datetime.now()}")
-        await mqtt.async_publish(self.hass, topic, payload)
-
-        self.response_received_event.clear()
-
-        response_topic = f"{modified_dongle_id}/response"
-        await mqtt.async_subscribe(self.hass, response_topic, self.response_received)
-
-        try:
-            await asyncio.wait_for(self.response_received_event.wait(), timeout=15)
-            LOGGER.debug(f"Response received or timeout for {entity.entity_id} at {datetime.now()}")
-            return True
-        except asyncio.TimeoutError:
-            LOGGER.error(f"No response received for {entity.entity_id} within the timeout period.")
-            self.hass.loop.call_soon_threadsafe(entity.revert_state)
-            return False
+    async def send_multiple_updates(self, dongle_id, payload_dict, entity, lane: Optional[int] = None):
+        """Handle multiple settings updates in a single payload."""
+        LOGGER.info(f"Sending multiple updates for {entity.entity_id} with payload {payload_dict}")
+        settings = [
+            {"setting": setting, "value": value}
+            for setting, value in payload_dict.items()
+        ]
+        if lane is None:
+            lane = self._lane_for(entity)
+        return await self.enqueue(QueuedCommand(dongle_id, {"settings": settings}, entity, lane=lane))
     
     def _is_gridboss_setting(self, unique_id):
-        """Check if a setting is a GridBoss setting by looking at the ENTITIES definition."""
-        # Look through all entity types and banks to find if this unique_id is in a gridboss bank
-        for entity_type, banks in ENTITIES.get("Lux", {}).items():
-            for bank_name, entities in banks.items():
-                for entity in entities:
-                    if entity.get("unique_id") == unique_id:
-                        # Check the source field first, then fall back to bank_name
-                        source = entity.get("source", bank_name)
-                        if source.startswith("gridboss_"):
-                            return True
-        return False
+        """Check if a setting is a GridBoss setting via the compiled catalog index."""
+        hit = catalog_lookup("Lux", unique_id)
+        return hit is not None and hit.gridboss_bank is not None
 
     def _get_gridboss_bank(self, unique_id):
-        """Get the GridBoss bank name for a given unique_id."""
-        # Look through all entity types and banks to find which gridboss bank this unique_id belongs to
-        for entity_type, banks in ENTITIES.get("Lux", {}).items():
-            for bank_name, entities in banks.items():
-                for entity in entities:
-                    if entity.get("unique_id") == unique_id:
-                        # Check the source field first, then fall back to bank_name
-                        source = entity.get("source", bank_name)
-                        if source.startswith("gridboss_"):
-                            # Extract the bank part (e.g., "holdbank1" from "gridboss_holdbank1")
-                            return source.replace("gridboss_", "")
+        """Get the GridBoss bank name (e.g. "holdbank1") for a given unique_id."""
+        hit = catalog_lookup("Lux", unique_id)
+        if hit is not None and hit.gridboss_bank:
+            return hit.gridboss_bank
 
         # Default fallback
-        return "holdbank1"
\ No newline at end of file
+        return "holdbank1"
@@ -2,18 +2,11 @@ from homeassistant.components.number import NumberEntity
 from homeassistant.core import callback
 from homeassistant.exceptions import HomeAssistantError
 import json
-import asyncio
-from homeassistant.helpers.event import (
-    async_track_state_change_event,
-    Event,
-)
-from homeassistant.const import (
-    STATE_UNKNOWN,
-)
 from typing import Dict, List, Optional
 from .const import DOMAIN, ENTITIES, LOGGER, CONF_USE_INPUT_BOX, DEFAULT_USE_INPUT_BOX
 from .coordinator import MonitorMySolarEntry
 from .entity import MonitorMySolarEntity
+from .aggregation import Aggregate
 
 async def async_setup_entry(hass, entry: MonitorMySolarEntry, async_add_entities):
     coordinator = entry.runtime_data
@@ -151,7 +144,7 @@ class InverterNumber(MonitorMySolarEntity, NumberEntity):
             raise HomeAssistantError("MQTT Handler is not initialized")
 
         # Save old value in case we need to revert
-        old_value = self._attr_native_value
+        previous = self._attr_native_value
 
         # `value` is the displayed/engineering value (e.g. 8.0 kW). The raw register
         # value the dongle uses is value * display_scale (e.g. 80). The coordinator
@@ -163,7 +156,7 @@ class InverterNumber(MonitorMySolarEntity, NumberEntity):
         self._attr_native_value = value
         self._user_initiated_change = True
         # Update coordinator's stored value so it doesn't overwrite us
-        self.coordinator.entities[self.entity_id] = raw_value
+        self.coordinator.set_optimistic_value(self.entity_id, raw_value)
         self.throttled_async_write_ha_state()
 
         # Apply multiplier for registers that need integer values (e.g. 46.1V -> 461).
@@ -173,21 +166,23 @@ class InverterNumber(MonitorMySolarEntity, NumberEntity):
             mqtt_value = int(raw_value)
 
         # Send the update via MQTT and wait for response
-        success = await mqtt_handler.send_update(
+        success = await self._async_track_write(previous, value, mqtt_handler.send_update(
             self._dongle_id,
             self.entity_info["unique_id"],
             mqtt_value,
             self,
-        )
+        ))
 
-        # If MQTT update failed, revert both UI and coordinator
+        # If MQTT update failed, revert both UI and coordinator to the last
+        # confirmed value (not necessarily ours: see _async_track_write).
         if not success:
+            old_value = self._revert_value
             LOGGER.error(f"Failed to update {self.entity_id} to {value}, reverting to {old_value}")
             self._user_initiated_change = False
             self._attr_native_value = old_value
             # Coordinator holds raw values, so restore the raw form of old_value.
             old_raw = old_value * self._display_scale if (self._display_scale != 1 and old_value is not None) else old_value
-            self.coordinator.entities[self.entity_id] = old_raw
+            self.coordinator.set_optimistic_value(self.entity_id, old_raw)
             self.throttled_async_write_ha_state()
             raise HomeAssistantError(f"Failed to update {self.entity_id} - no response from inverter")
 
@@ -251,65 +246,59 @@ class CombinedNumber(MonitorMySolarEntity, NumberEntity):
         self._attr_device_class = entity_info.get("class", None)
         self._manufacturer = entry.data.get("inverter_brand")
         self._previous_value = self._attr_native_value  # Track the previous value for revert
+        self._pending_value = None  # value being written; holds the display until the write settles
 
         # Track source entities that we need to monitor
         self._tracked_entities = []
-        self._source_values = {}
+        scales = {}
         for dongle_id in dongle_ids:
             source_entity_id = self.coordinator.build_entity_id("number", dongle_id, self._source_entity)
             self._tracked_entities.append(source_entity_id)
-            self._source_values[source_entity_id] = None
+            scales[source_entity_id] = self._source_display_scale(dongle_id)
             
-        # Set up state tracking
-        for entity_id in self._tracked_entities:
-            self._async_add_entity_listener(entity_id)
+        # Running mean over the sources' raw store values, in display units
+        self._aggregate = Aggregate(
+            self._tracked_entities, lambda key, raw: float(raw) / scales[key]
+        )
+        self._source_values = self._aggregate.values
         
         super().__init__(self.coordinator)
-        
-        # Initialize the state based on current source values
-        self.hass.async_create_task(self._initialize_state())
-        
-    def _async_add_entity_listener(self, entity_id):
-        """Set up a listener for a source entity."""
-        @callback
-        def async_state_changed_listener(event: Event) -> None:
-            """Handle entity state changes."""
-            # Handle generic Event data structure
-            if not hasattr(event, 'data'):
-                return
-                
-            new_state = event.data.get("new_state")
-            if new_state is None:
-                return
-                
-            try:
-                value = float(new_state.state)
-                self._source_values[entity_id] = value
-                # Use create_task to run the async method from a sync callback
-                self.hass.async_create_task(self._update_combined_state())
-            except (ValueError, TypeError):
-                LOGGER.warning(f"Invalid state value for {entity_id}: {new_state.state}")
-                
+
+    def _source_display_scale(self, dongle_id) -> float:
+        """display_scale of the source register for this dongle's firmware group."""
+        brand_numbers = ENTITIES.get(self.coordinator.inverter_brand, {}).get("number", {})
+        for bank_name, entities in brand_numbers.items():
+            if bank_name == "combined":
+                continue
+            for entity_info in entities:
+                if (
+                    entity_info["unique_id"] == self._source_entity
+                    and self.coordinator.entity_allowed_for_dongle(dongle_id, entity_info)
+                ):
+                    return entity_info.get("display_scale", 1)
+        return 1
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
         self.async_on_remove(
-            async_track_state_change_event(
-                self.hass, entity_id, async_state_changed_listener
-            )
+            self.coordinator.async_add_aggregate(self._aggregate, self._update_combined_state)
         )
+        self._update_combined_state()
     
-    async def _update_combined_state(self):
+    @callback
+    def _update_combined_state(self):
         """Update the combined state based on source entities.
 
         Takes the average of all current values.
         """
-        # Filter out None values
-        values = [v for v in self._source_values.values() if v is not None]
-
-        if not values:
+        if self._pending_value is not None:
+            return  # don't let a stale source value overwrite the write in flight
+        if not self._aggregate.count:
             LOGGER.debug(f"No values available for combined number {self._name}")
             return
 
         # Take the average for the display state
-        avg_value = sum(values) / len(values)
+        avg_value = self._aggregate.mean
 
         if avg_value != self._attr_native_value:
             self._attr_native_value = avg_value
@@ -326,15 +315,7 @@ class CombinedNumber(MonitorMySolarEntity, NumberEntity):
     @property
     def available(self):
         # At least one source value should be available
-        return any(v is not None for v in self._source_values.values())
-        
-    @property
-    def extra_state_attributes(self):
-        """Return extra attributes about the number."""
-        return {
-            "source_entities": self._tracked_entities,
-            "source_values": {k: v for k, v in self._source_values.items() if v is not None}
-        }
+        return self._aggregate.count > 0
         
     @property
     def device_info(self):
@@ -358,28 +339,24 @@ class CombinedNumber(MonitorMySolarEntity, NumberEntity):
 
         # Set the new value optimistically for immediate UI feedback
         self._attr_native_value = value
-        # Update all source values to prevent them from overwriting us
-        for entity_id in self._source_values.keys():
-            self._source_values[entity_id] = value
+        # Hold it until the write settles so the sources don't overwrite us
+        self._pending_value = value
         self.throttled_async_write_ha_state()
 
         LOGGER.info(f"Setting Combined Number value for {self.entity_id} to {value} across {len(self._dongle_ids)} dongles")
-        success = await mqtt_handler.send_update_to_multiple_dongles(
-            self._dongle_ids, self._source_entity, value, self
-        )
+        try:
+            success = await mqtt_handler.send_update_to_multiple_dongles(
+                self._dongle_ids, self._source_entity, value, self
+            )
+        finally:
+            self._pending_value = None
 
         # If MQTT update failed, revert and raise error
         if not success:
             LOGGER.error(f"Failed to update {self.entity_id} to {value}, reverting to {old_value}")
-            self._attr_native_value = old_value
-            # Revert source values - they'll update from coordinator naturally
-            for entity_id in self._source_values.keys():
-                state = self.hass.states.get(entity_id)
-                if state:
-                    try:
-                        self._source_values[entity_id] = float(state.state)
-                    except (ValueError, TypeError):
-                        pass
+            # Back to what the sources actually hold, if they've reported
+            mean = self._aggregate.mean
+            self._attr_native_value = mean if mean is not None else old_value
             self.throttled_async_write_ha_state()
             raise HomeAssistantError(f"Failed to update {self.entity_id} - no response from inverter")
     
@@ -401,21 +378,6 @@ class CombinedNumber(MonitorMySolarEntity, NumberEntity):
             "operation": "average"
         }
     
-    async def _initialize_state(self):
-        """Initialize the state based on current source entity states."""
-        await asyncio.sleep(2)  # Give entities time to load
-        
-        for entity_id in self._tracked_entities:
-            state = self.hass.states.get(entity_id)
-            if state:
-                try:
-                    value = float(state.state)
-                    self._source_values[entity_id] = value
-                except (ValueError, TypeError):
-                    LOGGER.debug(f"Could not parse state for {entity_id}: {state.state}")
-        
-        await self._update_combined_state()
-    
     @callback
     def _handle_coordinator_update(self) -> None:
         """Override to prevent looking for combined entity in coordinator."""
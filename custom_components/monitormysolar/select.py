@@ -112,7 +112,7 @@ class InverterSelect(MonitorMySolarEntity, SelectEntity):
             raise HomeAssistantError(availability_info["reason"])
         
         # Store the previous state before changing
-        self._previous_state = self._state
+        previous = self._state
         self._state = option
         
         # Set a flag to indicate this is a user-initiated change
@@ -192,18 +192,19 @@ class InverterSelect(MonitorMySolarEntity, SelectEntity):
                 elif bit_value == 0:  # Time mode
                     LOGGER.info(f"SmartLoad{smartload_number} set to Time mode - Time entities should become available, SOC/Volt entities should become unavailable")
         
-        await self.coordinator.mqtt_handler.send_update(
+        # The handler reverts a failed write (revert_state).
+        await self._async_track_write(previous, option, self.coordinator.mqtt_handler.send_update(
             self._dongle_id,
             self.entity_info["unique_id"],
             bit_value,
             self,
-        )
+        ))
 
     def revert_state(self):
-        """Revert to the previous state."""
-        if hasattr(self, '_previous_state') and self._previous_state is not None:
-            LOGGER.info(f"Reverting state for {self.entity_id} from {self._state} to {self._previous_state}")
-            self._state = self._previous_state
+        """Revert to the last confirmed state."""
+        if self._revert_value is not None:
+            LOGGER.info(f"Reverting state for {self.entity_id} from {self._state} to {self._revert_value}")
+            self._state = self._revert_value
             # Clear the user-initiated flag since we're reverting
             if hasattr(self, '_user_initiated_change'):
                 self._user_initiated_change = False
@@ -228,7 +229,7 @@ class InverterSelect(MonitorMySolarEntity, SelectEntity):
             return
         index = self._options.index(option)
         # Mirror as int so _handle_coordinator_update decodes it back to the option.
-        self.coordinator.entities[self.entity_id] = index
+        self.coordinator.set_optimistic_value(self.entity_id, index)
         LOGGER.debug(f"Select {self.entity_id}: confirmed option {option!r} (index {index})")
         self.throttled_async_write_ha_state()
 
@@ -1,6 +1,5 @@
 from datetime import datetime, timedelta
 import json
-import asyncio
 from typing import cast, List
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -16,25 +15,33 @@ from homeassistant.const import (
     UnitOfFrequency,
     UnitOfPower,
     UnitOfTemperature,
-    STATE_UNKNOWN,
     EntityCategory,
 )
 from homeassistant.core import (
-    Event,
-    EventStateChangedData,
     HomeAssistant,
     State,
     callback,
 )
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.event import (
-    async_track_state_change_event,
     async_track_time_change,
 )
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN, ENTITIES, FIRMWARE_CODES, LOGGER, STATUS_DIAGNOSTIC_SENSORS
+from .const import (
+    DOMAIN,
+    ENTITIES,
+    FIRMWARE_CODES,
+    LOGGER,
+    SIGNAL_BANK_UPDATED,
+    SIGNAL_SYNC_STATUS,
+    SIGNAL_WRITE_LATENCY,
+    STATUS_DIAGNOSTIC_SENSORS,
+    WRITE_LATENCY_SENSOR,
+)
 from .coordinator import MonitorMySolarEntry
 from .entity import MonitorMySolarEntity
+from .aggregation import Aggregate
 
 def _check_source_entities_exist(sensor_info, dongle_ids, coordinator):
     """Check if the source entities for a combined sensor exist."""
@@ -141,6 +148,8 @@ async def async_setup_entry(hass, entry: MonitorMySolarEntry, async_add_entities
             except Exception as e:
                 LOGGER.error(f"Error setting up status diagnostic sensor {sensor} for dongle {dongle_id}: {e}")
 
+        entities.append(WriteLatencySensor(WRITE_LATENCY_SENSOR, hass, entry, dongle_id))
+
     # Create combined parallel sensors if we have multiple dongles
     if len(dongle_ids) > 1:
         LOGGER.info(f"Creating combined sensors for {len(dongle_ids)} dongles")
@@ -364,9 +373,10 @@ class InverterSensor(MonitorMySolarEntity, SensorEntity):
                     self._state = round(value / 1000, 3)
                     #LOGGER.debug(f"Converted {self._sensor_type} from {value}Wh to {self._state}kWh")
                 else:
-                    self._state = (
-                        round(value, 2) if isinstance(value, (float, int)) else value
-                    )
+                    new_state = round(value, 2) if isinstance(value, (float, int)) else value
+                    if not self._passes_deadband(new_state, self.sensor_info):
+                        return
+                    self._state = new_state
                 self.throttled_async_write_ha_state()
         else:
             LOGGER.warning(f"entity {self.entity_id} key not found")
@@ -572,6 +582,10 @@ class StatusFieldSensor(MonitorMySolarEntity, SensorEntity):
     def device_info(self):
         return self.get_device_info(self._dongle_id, self._manufacturer, self.sensor_info.get("device_group"))
 
+    def _coordinator_keys(self) -> tuple[str, ...]:
+        """The shared /status blob, not this sensor's own entity_id."""
+        return (self._status_source_entity_id,)
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Pull this field's value out of the shared /status blob."""
@@ -681,6 +695,13 @@ class PowerFlowSensor(MonitorMySolarEntity, SensorEntity):
     def device_info(self):
         return self.get_device_info(self._dongle_id, self._manufacturer, self.sensor_info.get("device_group"))
 
+    def _coordinator_keys(self) -> tuple[str, ...]:
+        """The two source sensors the flow value is derived from."""
+        return (
+            self.coordinator.build_entity_id("sensor", self._dongle_id, self._attribute1),
+            self.coordinator.build_entity_id("sensor", self._dongle_id, self._attribute2),
+        )
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Update sensor with latest data from coordinator."""
@@ -840,20 +861,13 @@ class BankUpdateSensor(MonitorMySolarEntity, SensorEntity):
         return self.get_device_info(self._dongle_id, self._manufacturer, self.sensor_info.get("device_group"))
 
     @callback
-    def _handle_bank_update(self, event):
-        """Handle bank update events."""
+    def _handle_bank_update(self, bank_name):
+        """Handle a bank update signalled for this dongle."""
         # Skip processing if entity is disabled
         if not self.enabled:
             return
-            
-        bank_name = event.data.get("bank_name")
-        event_dongle_id = event.data.get("dongle_id")
-        
-        # Only process events for our specific dongle
-        if event_dongle_id != self._dongle_id:
-            return
-            
-        LOGGER.debug(f"Update Event Called for: {bank_name} on dongle {event_dongle_id}")
+
+        LOGGER.debug(f"Update Event Called for: {bank_name} on dongle {self._dongle_id}")
         if bank_name:
             current_time = datetime.now().isoformat()
             attr_name = f"{bank_name}_last_update"
@@ -865,11 +879,106 @@ class BankUpdateSensor(MonitorMySolarEntity, SensorEntity):
                 self.throttled_async_write_ha_state()
 
     async def async_added_to_hass(self):
-        """Subscribe to events when added to hass."""
+        """Subscribe to this dongle's bank update signal when added to hass."""
         await super().async_added_to_hass()
-        LOGGER.debug(f"Subscribing to bank update event for {self.entity_id}")
+        LOGGER.debug(f"Subscribing to bank update signal for {self.entity_id}")
         self.async_on_remove(
-            self.hass.bus.async_listen(f"{DOMAIN}_bank_updated", self._handle_bank_update)
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_BANK_UPDATED.format(self._dongle_id),
+                self._handle_bank_update,
+            )
+        )
+
+class WriteLatencySensor(MonitorMySolarEntity, SensorEntity):
+    """Write-ack round-trip latency for one dongle, from the MQTT handler.
+
+    State is p95 in ms; p50/p99, the adaptive ack timeout, the sample and
+    timeout counts and the writes queued per priority lane are attributes.
+    Updated on SIGNAL_WRITE_LATENCY whenever a write is queued, sent or acked;
+    the state stays unknown until the first ack.
+    """
+
+    def __init__(self, sensor_info, hass, entry, dongle_id):
+        self.coordinator = entry.runtime_data
+        self.sensor_info = sensor_info
+        self._name = sensor_info["name"]
+        self._unique_id = f"{entry.entry_id}_{dongle_id}_{sensor_info['unique_id']}".lower()
+        self._state = None
+        self._attributes = {}
+        self._dongle_id = dongle_id
+        self._sensor_type = sensor_info["unique_id"]
+        self.entity_id = self.coordinator.build_entity_id("sensor", self._dongle_id, self._sensor_type)
+        self.hass = hass
+        self._manufacturer = entry.data.get("inverter_brand")
+
+        super().__init__(self.coordinator)
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def unique_id(self):
+        return self._unique_id
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def state_class(self):
+        return self.sensor_info.get("state_class")
+
+    @property
+    def unit_of_measurement(self):
+        return self.sensor_info.get("unit_of_measurement")
+
+    @property
+    def device_class(self):
+        return self.sensor_info.get("device_class")
+
+    @property
+    def entity_category(self):
+        return EntityCategory.DIAGNOSTIC
+
+    @property
+    def extra_state_attributes(self):
+        return self._attributes
+
+    @property
+    def device_info(self):
+        return self.get_device_info(self._dongle_id, self._manufacturer, self.sensor_info.get("device_group"))
+
+    def _coordinator_keys(self) -> tuple[str, ...]:
+        """Not derived from the coordinator store."""
+        return ()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        mqtt_handler = self.coordinator.mqtt_handler
+        if not hasattr(mqtt_handler, "latency_stats"):
+            return
+        stats = mqtt_handler.latency_stats(self._dongle_id)
+        self._state = stats["p95"]
+        self._attributes = {
+            "p50_ms": stats["p50"],
+            "p99_ms": stats["p99"],
+            "ack_timeout_ms": stats["timeout"],
+            "samples": stats["samples"],
+            "timeouts": stats["timeouts"],
+            **{f"queued_{lane}": depth for lane, depth in mqtt_handler.lane_depths(self._dongle_id).items()},
+        }
+        self.throttled_async_write_ha_state()
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_WRITE_LATENCY.format(self._dongle_id),
+                self._handle_coordinator_update,
+            )
         )
 
 class FaultWarningSensor(MonitorMySolarEntity, SensorEntity):
@@ -1084,6 +1193,13 @@ class CalculatedSensor(MonitorMySolarEntity, SensorEntity):
                     "human_readable_time_left": "Unavailable"
                 }
 
+    def _coordinator_keys(self) -> tuple[str, ...]:
+        """The source sensors this calculation reads."""
+        return tuple(
+            self.coordinator.build_entity_id("sensor", self._dongle_id, sensor)
+            for sensor in self._source_sensors
+        )
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Update sensor with latest data from coordinator."""
@@ -1176,9 +1292,10 @@ class TemperatureSensor(MonitorMySolarEntity, SensorEntity):
         if self.entity_id in self.coordinator.entities:
             value = self.coordinator.entities[self.entity_id]
             if value is not None:
-                self._state = (
-                    round(value, 2) if isinstance(value, (float, int)) else value
-                )
+                new_state = round(value, 2) if isinstance(value, (float, int)) else value
+                if not self._passes_deadband(new_state, self.sensor_info):
+                    return
+                self._state = new_state
                 LOGGER.debug(f"Sensor {self.entity_id} state updated to {self._state}")
                 self.throttled_async_write_ha_state()
 
@@ -1205,7 +1322,6 @@ class CombinedParallelSensor(MonitorMySolarEntity, SensorEntity):
         self._operation = self._calculation.get("operation")
         self._source_entity = self._calculation.get("source_entity")
         self._source_entities = self._calculation.get("source_entities", [])
-        self._source_values = {}
         
         # Track source entities that we need to monitor
         self._tracked_entities = []
@@ -1216,71 +1332,45 @@ class CombinedParallelSensor(MonitorMySolarEntity, SensorEntity):
                 for source_entity in self._source_entities:
                     source_entity_id = self.coordinator.build_entity_id("sensor", dongle_id, source_entity)
                     self._tracked_entities.append(source_entity_id)
-                    self._source_values[source_entity_id] = None
         else:
             # Handle single source entity (for standard combined calculations)
             for dongle_id in dongle_ids:
                 source_entity_id = self.coordinator.build_entity_id("sensor", dongle_id, self._source_entity)
                 self._tracked_entities.append(source_entity_id)
-                self._source_values[source_entity_id] = None
         
-        # Set up state tracking
-        for entity_id in self._tracked_entities:
-            self._async_add_entity_listener(entity_id)
+        # Running sum/count over the sources' raw store values, kept by the coordinator
+        self._aggregate = Aggregate(self._tracked_entities)
+        self._source_values = self._aggregate.values
         
         super().__init__(self.coordinator)
-        
-        # Initialize the state based on current source values
-        self.hass.async_create_task(self._initialize_state())
-    
-    def _async_add_entity_listener(self, entity_id):
-        """Set up a listener for a source entity."""
-        # Check if the entity exists before setting up the listener
-        if entity_id not in self.coordinator.entities:
-            LOGGER.debug(f"Source entity {entity_id} does not exist yet, skipping listener setup")
-            return
-            
-        @callback
-        def async_state_changed_listener(event: Event[EventStateChangedData]) -> None:
-            """Handle entity state changes."""
-            if (new_state := event.data["new_state"]) is None:
-                return
-                
-            try:
-                value = float(new_state.state)
-                self._source_values[entity_id] = value
-                # Use create_task to run the async method from a sync callback
-                self.hass.async_create_task(self._update_combined_state())
-            except (ValueError, TypeError):
-                LOGGER.warning(f"Invalid state value for {entity_id}: {new_state.state}")
-                
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
         self.async_on_remove(
-            async_track_state_change_event(
-                self.hass, entity_id, async_state_changed_listener
-            )
+            self.coordinator.async_add_aggregate(self._aggregate, self._update_combined_state)
         )
+        self._update_combined_state()
     
-    async def _update_combined_state(self):
-        """Calculate the combined state based on source entities."""
-        # Filter out None values
-        values = [v for v in self._source_values.values() if v is not None]
-        
-        if not values:
+    @callback
+    def _update_combined_state(self):
+        """Calculate the combined state from the running aggregate."""
+        aggregate = self._aggregate
+        if not aggregate.count:
             LOGGER.debug(f"No values available for combined sensor {self._name}")
             self._state = None
             self.throttled_async_write_ha_state()
             return
             
         if self._operation == "addition":
-            self._state = sum(values)
+            self._state = aggregate.sum
         elif self._operation == "average":
-            self._state = sum(values) / len(values)
+            self._state = aggregate.mean
         elif self._operation == "net_power":
             # For NET power calculations (L1 + L2)
-            self._state = sum(values)
+            self._state = aggregate.sum
         elif self._operation == "net_current":
             # For NET current calculations (L1 + L2)
-            self._state = sum(values)
+            self._state = aggregate.sum
         else:
             LOGGER.warning(f"Unknown operation {self._operation} for combined sensor {self._name}")
             return
@@ -1290,21 +1380,6 @@ class CombinedParallelSensor(MonitorMySolarEntity, SensorEntity):
             self._state = round(self._state, 2)
             
         self.throttled_async_write_ha_state()
-    
-    async def _initialize_state(self):
-        """Initialize the state based on current source entity states."""
-        await asyncio.sleep(2)  # Give entities time to load
-        
-        for entity_id in self._tracked_entities:
-            state = self.hass.states.get(entity_id)
-            if state and state.state not in [STATE_UNKNOWN, "unavailable"]:
-                try:
-                    value = float(state.state)
-                    self._source_values[entity_id] = value
-                except (ValueError, TypeError):
-                    LOGGER.debug(f"Could not parse state for {entity_id}: {state.state}")
-        
-        await self._update_combined_state()
         
     @property
     def name(self):
@@ -1380,11 +1455,16 @@ class CombinedParallelSensor(MonitorMySolarEntity, SensorEntity):
 
 
 class SyncStatusSensor(MonitorMySolarEntity, SensorEntity):
-    """Sensor that shows the synchronization status of multiple inverters."""
+    """Sensor that shows the synchronization status of multiple inverters.
+
+    Reads the coordinator's incremental out-of-sync index and is only woken
+    (SIGNAL_SYNC_STATUS) when the set of drifted settings changes.
+    """
     
     def __init__(self, hass, entry: MonitorMySolarEntry, dongle_ids):
         """Initialize the sync status sensor."""
         self.coordinator = entry.runtime_data
+        self._entry_id = entry.entry_id
         self._name = "Inverter Sync Status"
         self._unique_id = f"{entry.entry_id}_sync_status".lower()
         self._state = "unknown"
@@ -1394,111 +1474,34 @@ class SyncStatusSensor(MonitorMySolarEntity, SensorEntity):
         self.entity_id = f"sensor.{self._formatted_dongle_id}_sync_status"
         self.hass = hass
         self._manufacturer = entry.data.get("inverter_brand")
-        
-        # Sync status tracking
-        self._total_settings = 0
-        self._out_of_sync_count = 0
-        self._last_check_time = None
-        self._sync_details = {}  # {setting_id: {dongle_id: value}}
-        self._monitored_settings = {}  # {unique_id: entity_type}
-        
-        # Get entity configuration for monitoring
-        inverter_brand = self.coordinator.inverter_brand
-        brand_entities = ENTITIES.get(inverter_brand, {})
-        
-        # Build list of settings to monitor
-        monitored_types = ["switch", "number", "select", "time", "time_hhmm"]
-        for entity_type in monitored_types:
-            if entity_type not in brand_entities:
-                continue
-                
-            for bank_name, entities in brand_entities[entity_type].items():
-                # Skip combined entities
-                if bank_name == "combined":
-                    continue
-                    
-                for entity_config in entities:
-                    unique_id = entity_config["unique_id"]
-                    self._monitored_settings[unique_id] = entity_type
-        
-        self._total_settings = len(self._monitored_settings)
+        self._last_change_time = None
         
         super().__init__(self.coordinator)
-        
-        # Start periodic sync status check (but not during startup)
-        if self.coordinator._hass_startup_complete:
-            self.hass.async_create_task(self._start_monitoring())
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_SYNC_STATUS.format(self._entry_id),
+                self._handle_sync_status,
+            )
+        )
+        self._handle_sync_status()
+
+    @callback
+    def _handle_sync_status(self) -> None:
+        """Re-render from the index after the drifted set changed."""
+        index = self.coordinator.sync_index
+        self._last_change_time = datetime.now().isoformat()
+        if not index.known:
+            self._state = "unknown"
+        elif index.drifted:
+            self._state = f"{len(index.drifted)} unsynced"
         else:
-            # Schedule to start after startup is complete
-            from homeassistant.helpers.event import async_call_later
-            async def start_after_startup(now=None):
-                if self.coordinator._hass_startup_complete:
-                    self.hass.async_create_task(self._start_monitoring())
-                else:
-                    # If still not ready, schedule again
-                    async_call_later(self.hass, 5, start_after_startup)
-            async_call_later(self.hass, 35, start_after_startup)  # Start after our 30s startup delay
-    
-    async def _start_monitoring(self):
-        """Start monitoring sync status."""
-        # Initial delay to let entities load
-        await asyncio.sleep(10)
-        
-        # Initial check
-        await self._check_sync_status()
-        
-        # Set up periodic check every 30 seconds using async_call_later instead of blocking loop
-        self._schedule_next_check()
-    
-    def _schedule_next_check(self):
-        """Schedule the next sync status check."""
-        from homeassistant.helpers.event import async_call_later
-        
-        async def check_and_schedule(_):
-            await self._check_sync_status()
-            self._schedule_next_check()  # Schedule the next check
-        
-        # Schedule next check in 30 seconds
-        async_call_later(self.hass, 30, check_and_schedule)
-    
-    async def _check_sync_status(self):
-        """Check the sync status of all monitored settings."""
-        self._last_check_time = datetime.now().isoformat()
-        self._sync_details = {}
-        self._out_of_sync_count = 0
-        
-        for unique_id, entity_type in self._monitored_settings.items():
-            setting_values = {}
-            
-            # Get values from all dongles for this setting
-            for dongle_id in self._dongle_ids:
-                # Determine entity ID based on type
-                if entity_type == "time_hhmm":
-                    entity_id = self.coordinator.build_entity_id("time", dongle_id, unique_id)
-                else:
-                    entity_id = self.coordinator.build_entity_id(entity_type, dongle_id, unique_id)
-                
-                state = self.hass.states.get(entity_id)
-                if state and state.state not in [STATE_UNKNOWN, "unavailable"]:
-                    setting_values[dongle_id] = state.state
-                else:
-                    setting_values[dongle_id] = "unknown"
-            
-            self._sync_details[unique_id] = setting_values
-            
-            # Check if values are different (excluding unknowns)
-            known_values = [v for v in setting_values.values() if v != "unknown"]
-            if known_values and len(set(known_values)) > 1:
-                self._out_of_sync_count += 1
-        
-        # Update state
-        if self._out_of_sync_count == 0:
             self._state = "synced"
-        else:
-            self._state = f"{self._out_of_sync_count} unsynced"
-        
         self.throttled_async_write_ha_state()
-        LOGGER.debug(f"Sync status check complete: {self._out_of_sync_count} out of sync settings")
+        LOGGER.debug(f"Sync status changed: {len(index.drifted)} out of sync settings")
     
     @property
     def name(self):
@@ -1528,61 +1531,37 @@ class SyncStatusSensor(MonitorMySolarEntity, SensorEntity):
     @property
     def extra_state_attributes(self):
         """Return detailed sync status attributes."""
+        index = self.coordinator.sync_index
         attributes = {
-            "last_check": self._last_check_time,
-            "total_settings": self._total_settings,
-            "out_of_sync_count": self._out_of_sync_count,
+            "last_change": self._last_change_time,
+            "total_settings": index.total,
+            "out_of_sync_count": len(index.drifted),
             "sync_enabled": self.coordinator.get_sync_settings_enabled()
         }
-        
-        # Create sync status grid
-        if self._sync_details:
-            # Create header row with dongle IDs
-            grid_data = {}
-            
-            # Group settings by their sync status
-            synced_settings = {}
-            unsynced_settings = {}
-            
-            for setting_id, values in self._sync_details.items():
-                # Get all non-unknown values
-                known_values = {k: v for k, v in values.items() if v != "unknown"}
-                
-                if not known_values:
-                    continue
-                    
-                # Check if all known values are the same
-                unique_values = set(known_values.values())
-                if len(unique_values) == 1:
-                    synced_settings[setting_id] = values
-                else:
-                    unsynced_settings[setting_id] = values
-            
-            # Add unsynced settings first
-            if unsynced_settings:
-                attributes["unsynced_settings"] = {}
-                for setting_id, values in unsynced_settings.items():
-                    row = {}
-                    for dongle_id, value in values.items():
-                        # Format dongle ID for display
-                        display_id = dongle_id.split('-')[1] if '-' in dongle_id else dongle_id
-                        row[display_id] = f"❌ {value}"
-                    attributes["unsynced_settings"][setting_id] = row
-            
-            # Add synced settings count
-            attributes["synced_settings_count"] = len(synced_settings)
-            
-            # Optionally show some synced settings (first 5)
-            if synced_settings:
-                attributes["synced_settings_sample"] = {}
-                for i, (setting_id, values) in enumerate(synced_settings.items()):
-                    if i >= 5:  # Only show first 5
-                        break
-                    row = {}
-                    for dongle_id, value in values.items():
-                        display_id = dongle_id.split('-')[1] if '-' in dongle_id else dongle_id
-                        row[display_id] = f"✅ {value}"
-                    attributes["synced_settings_sample"][setting_id] = row
+
+        def row(values, mark):
+            # Format dongle ID for display
+            return {
+                (dongle_id.split('-')[1] if '-' in dongle_id else dongle_id): f"{mark} {value}"
+                for dongle_id, value in values.items()
+            }
+
+        # Add unsynced settings first
+        if index.drifted:
+            attributes["unsynced_settings"] = {
+                setting_id: row(index.values(setting_id), "❌")
+                for setting_id in sorted(index.drifted)
+            }
+
+        # Add synced settings count, and show some synced settings (first 5)
+        attributes["synced_settings_count"] = index.known - len(index.drifted)
+        sample = {}
+        for setting_id in index.in_sync():
+            if len(sample) >= 5:
+                break
+            sample[setting_id] = row(index.values(setting_id), "✅")
+        if sample:
+            attributes["synced_settings_sample"] = sample
         
         return attributes
         
@@ -1665,7 +1644,8 @@ class BatteryDetailSensor(MonitorMySolarEntity, SensorEntity):
         if self.entity_id in self.coordinator.entities:
             value = self.coordinator.entities[self.entity_id]
             if value is not None:
-                self._state = (
-                    round(value, 2) if isinstance(value, (float, int)) else value
-                )
+                new_state = round(value, 2) if isinstance(value, (float, int)) else value
+                if not self._passes_deadband(new_state, self._sensor_def):
+                    return
+                self._state = new_state
                 self.throttled_async_write_ha_state()
@@ -0,0 +1,302 @@
+"""Batched reconciliation of settings across parallel dongles.
+
+CombinedSyncSwitch's periodic check used to walk the synced settings one at a
+time: read every dongle's HA state string, pick a value, then await one
+send_update_to_multiple_dongles per drifted setting. With 20 drifted settings
+on a parallel stack that was 20 serial round trips, minutes in total.
+
+Here the whole pass works on the coordinator's raw per-dongle register values.
+plan_reconciliation compares every synced setting at once and returns the
+minimal diff per dongle (only the settings that dongle has wrong).
+async_reconcile then sends each dongle ONE {"settings": [...]} payload (split at
+MAX_BATCH_SETTINGS), all dongles concurrently, and returns a
+ReconcileSummary of what converged.
+
+SyncIndex is the incremental side of the same comparison. The coordinator
+feeds it every settings value written to the store. For each setting it keeps
+a count of how many dongles hold each value, so a setting is drifted exactly
+when it has more than one distinct value. Each write is O(1), and SyncStatusSensor
+hears about it only when the set of drifted settings changes. Its setting
+listeners are the sync switch's change stream: one callback for every synced
+setting on every dongle, instead of one HA state listener per entity.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .const import ENTITIES
+from .mqttHandeler import LANE_SYNC, MAX_BATCH_SETTINGS
+
+# Catalog platforms whose values are kept identical across a parallel stack.
+SYNCED_PLATFORMS = ("switch", "number", "select", "time", "time_hhmm")
+
+
+class SyncedSetting(NamedTuple):
+    """One setting the sync switch keeps identical across dongles."""
+
+    unique_id: str  # the catalog unique_id, as sent to the dongle
+    platform: str  # entity platform ("time_hhmm" folded to "time")
+    entry: Dict[str, Any]  # the catalog dict (options, scaling, ...)
+
+
+class SettingDrift(NamedTuple):
+    """A setting whose dongles disagree, and the value they should converge on."""
+
+    target: Any  # normalized value the stack converges on
+    source: str  # dongle the target was taken from
+    values: Dict[str, Any]  # dongle_id -> normalized current value
+
+
+class ReconcileSummary(NamedTuple):
+    """Outcome of one reconciliation pass."""
+
+    checked: int  # settings compared
+    drifted: Dict[str, SettingDrift]  # setting -> drift, before any write
+    writes: Dict[str, Dict[str, Any]]  # dongle_id -> {setting: value sent}
+    results: Dict[str, bool]  # dongle_id -> every payload acked
+
+    @property
+    def converged(self) -> bool:
+        return all(self.results.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        """JSON-friendly form for entity attributes."""
+        return {
+            "checked": self.checked,
+            "drifted": sorted(self.drifted),
+            "writes": {dongle_id: len(settings) for dongle_id, settings in self.writes.items()},
+            "failed_dongles": sorted(d for d, ok in self.results.items() if not ok),
+            "converged": self.converged,
+        }
+
+
+def synced_settings(brand: str) -> List[SyncedSetting]:
+    """Every settings entry of `brand` outside the combined bank (first declaration wins)."""
+    seen = set()
+    settings = []
+    brand_entities = ENTITIES.get(brand, {})
+    for platform in SYNCED_PLATFORMS:
+        banks = brand_entities.get(platform)
+        if not isinstance(banks, dict):
+            continue
+        for bank_name, entries in banks.items():
+            if bank_name == "combined":
+                continue
+            for entry in entries:
+                unique_id = entry["unique_id"]
+                if unique_id.lower() in seen:
+                    continue
+                seen.add(unique_id.lower())
+                resolved = "time" if platform == "time_hhmm" else platform
+                settings.append(SyncedSetting(unique_id, resolved, entry))
+    return settings
+
+
+def _comparable(normalize: Callable, setting: SyncedSetting, raw) -> Any:
+    """A raw store value in the one form every dongle's copy is compared in.
+
+    `normalize` is the coordinator's normalize_setting_value.
+    """
+    value = normalize(setting.platform, setting.entry, raw)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def wire_value(setting: SyncedSetting, value) -> Any:
+    """The value to write for a normalized register `value` (inverse of the read path)."""
+    if setting.platform == "number":
+        multiplier = setting.entry.get("mqtt_multiplier", 1)
+        if multiplier > 1:
+            # Registers that arrive pre-scaled but are written as integers.
+            return int(round(value * multiplier))
+        if setting.entry.get("display_scale", 1) != 1:
+            return int(value)
+    return value
+
+
+def _pick_target(values: Dict[str, Any], dongle_ids: List[str], latest_change) -> Tuple[Any, str]:
+    """The most recently changed dongle wins; without history, the majority value.
+
+    Majority ties go to the earliest dongle in `dongle_ids` (the master first).
+    """
+    if latest_change and latest_change.get("dongle_id") in values:
+        source = latest_change["dongle_id"]
+        return values[source], source
+    counts: Dict[Any, int] = {}
+    for value in values.values():
+        counts[value] = counts.get(value, 0) + 1
+    best = max(counts.values())
+    for dongle_id in dongle_ids:
+        if dongle_id in values and counts[values[dongle_id]] == best:
+            return values[dongle_id], dongle_id
+    raise ValueError("no values to pick from")
+
+
+def plan_reconciliation(
+    coordinator, dongle_ids: Iterable[str], settings: Optional[List[SyncedSetting]] = None
+) -> Tuple[Dict[str, SettingDrift], Dict[str, Dict[str, Any]]]:
+    """Compare every synced setting across `dongle_ids` in one pass.
+
+    Returns (drift per setting, writes per dongle). A dongle that hasn't
+    reported a setting is left out of that setting's comparison. Writes hold
+    wire values, only for the dongles that differ from the target.
+    """
+    dongle_ids = list(dongle_ids)
+    if settings is None:
+        settings = synced_settings(coordinator.inverter_brand)
+    store = coordinator.entities
+    drifted: Dict[str, SettingDrift] = {}
+    writes: Dict[str, Dict[str, Any]] = {}
+    for setting in settings:
+        suffix = setting.unique_id.lower()
+        values = {}
+        for dongle_id in dongle_ids:
+            raw = store.get(coordinator.build_entity_id(setting.platform, dongle_id, suffix))
+            if raw is not None:
+                values[dongle_id] = _comparable(coordinator.normalize_setting_value, setting, raw)
+        if len(set(values.values())) < 2:
+            continue
+        target, source = _pick_target(
+            values, dongle_ids, coordinator.get_latest_setting_change(setting.unique_id)
+        )
+        drifted[setting.unique_id] = SettingDrift(target, source, values)
+        for dongle_id, value in values.items():
+            if value != target:
+                writes.setdefault(dongle_id, {})[setting.unique_id] = wire_value(setting, target)
+    return drifted, writes
+
+
+async def async_reconcile(
+    coordinator, dongle_ids: Iterable[str], entity, settings: Optional[List[SyncedSetting]] = None,
+    syncing: Optional[Dict[str, Any]] = None,
+) -> ReconcileSummary:
+    """Plan, then push every dongle's diff as batched payloads, dongles in parallel.
+
+    `syncing` (setting -> normalized value being pushed) gets every planned
+    target for the duration of the pass, so the sync switch takes their
+    echoes for what they are rather than new changes to fan out.
+    """
+    dongle_ids = list(dongle_ids)
+    if settings is None:
+        settings = synced_settings(coordinator.inverter_brand)
+    drifted, writes = plan_reconciliation(coordinator, dongle_ids, settings)
+    if syncing is None:
+        syncing = {}
+    targets = {unique_id: drift.target for unique_id, drift in drifted.items()}
+    mqtt_handler = coordinator.mqtt_handler
+
+    async def push(dongle_id: str, diff: Dict[str, Any]) -> bool:
+        items = list(diff.items())
+        chunks = [
+            dict(items[start:start + MAX_BATCH_SETTINGS])
+            for start in range(0, len(items), MAX_BATCH_SETTINGS)
+        ]
+        # A dongle's chunks queue back to back on its own worker anyway.
+        acks = await asyncio.gather(*(
+            mqtt_handler.send_multiple_updates(dongle_id, chunk, entity, lane=LANE_SYNC)
+            for chunk in chunks
+        ), return_exceptions=True)
+        return all(ack is True for ack in acks)
+
+    results = {}
+    if writes:
+        syncing.update(targets)
+        try:
+            acks = await asyncio.gather(*(push(dongle_id, diff) for dongle_id, diff in writes.items()))
+        finally:
+            for unique_id, target in targets.items():
+                if syncing.get(unique_id) == target:
+                    del syncing[unique_id]
+        results = dict(zip(writes, acks))
+    return ReconcileSummary(len(settings), drifted, writes, results)
+
+
+class SyncIndex:
+    """Which synced settings currently disagree across dongles, kept incrementally."""
+
+    def __init__(self, total: int, keys: Dict[str, Tuple[SyncedSetting, str]], normalize: Callable) -> None:
+        self.total = total  # settings monitored
+        self._keys = keys  # store key (entity_id) -> (setting, dongle_id)
+        self._normalize = normalize
+        self._values: Dict[str, Dict[str, Any]] = {}  # setting -> dongle_id -> value
+        self._counts: Dict[str, Dict[Any, int]] = {}  # setting -> value -> dongles holding it
+        self.drifted: Set[str] = set()
+        self.changed = True  # drifted set changed since the last notification
+        # Called as listener(setting, dongle_id, value) when a dongle's known
+        # value for a setting changes to another known value.
+        self.listeners: List[Callable[[SyncedSetting, str, Any], None]] = []
+
+    @classmethod
+    def build(cls, coordinator, dongle_ids: Iterable[str], listeners=()) -> "SyncIndex":
+        """Index every synced setting of `dongle_ids`, seeded from the store.
+
+        `listeners` (carried over from a previous index) aren't called for
+        the seed values.
+        """
+        settings = synced_settings(coordinator.inverter_brand)
+        keys = {}
+        for setting in settings:
+            suffix = setting.unique_id.lower()
+            for dongle_id in dongle_ids:
+                keys[coordinator.build_entity_id(setting.platform, dongle_id, suffix)] = (setting, dongle_id)
+        index = cls(len(settings), keys, coordinator.normalize_setting_value)
+        store = coordinator.entities
+        for key in keys.keys() & store.keys():
+            index.observe(key, store[key])
+        index.changed = True
+        index.listeners.extend(listeners)
+        return index
+
+    def observe(self, key: str, raw) -> bool:
+        """Account for `raw` written to store key `key`; True if the drifted set changed."""
+        hit = self._keys.get(key)
+        if hit is None:
+            return False
+        setting, dongle_id = hit
+        unique_id = setting.unique_id
+        value = None if raw is None else _comparable(self._normalize, setting, raw)
+        values = self._values.setdefault(unique_id, {})
+        counts = self._counts.setdefault(unique_id, {})
+        if dongle_id in values:
+            old = values[dongle_id]
+            if old == value:
+                return False
+            if counts[old] == 1:
+                del counts[old]
+            else:
+                counts[old] -= 1
+            if value is not None:
+                # A change, not a first report (startup snapshots, warm start).
+                for listener in list(self.listeners):
+                    listener(setting, dongle_id, value)
+        if value is None:
+            values.pop(dongle_id, None)
+        else:
+            values[dongle_id] = value
+            counts[value] = counts.get(value, 0) + 1
+        if not values:
+            del self._values[unique_id], self._counts[unique_id]
+
+        if (len(counts) > 1) == (unique_id in self.drifted):
+            return False
+        if len(counts) > 1:
+            self.drifted.add(unique_id)
+        else:
+            self.drifted.discard(unique_id)
+        self.changed = True
+        return True
+
+    def values(self, unique_id: str) -> Dict[str, Any]:
+        """dongle_id -> normalized value, for the dongles that reported `unique_id`."""
+        return dict(self._values.get(unique_id, {}))
+
+    @property
+    def known(self) -> int:
+        """Settings at least one dongle has reported."""
+        return len(self._values)
+
+    def in_sync(self) -> Iterable[str]:
+        """Reported settings whose dongles all agree."""
+        return (unique_id for unique_id in self._values if unique_id not in self.drifted)
@@ -0,0 +1,58 @@
+"""MQTT subscription planner.
+
+We used to subscribe to `<dongle>/#` and then, for GridBoss dongles, ALSO to
+each `gridboss_*` bank topic. Those topics already match the wildcard, so the
+broker delivered every GridBoss bank message twice. The wildcard also pulled in
+`debug/*` (discarded in Python) and the echo of our own `/update` writes.
+
+plan_topics() instead returns the minimal, explicit, non-overlapping topic set
+a dongle actually needs, from its role (GridBoss or inverter) and its firmware
+generation:
+
+  * FW >= 4.3.0 ("unified"): /input, /hold, the snap/* replies and the
+    /setting/updated write echo.
+  * FW <  4.3.0 ("legacy"): the per-bank topics (inputbankN / holdbankN, or
+    gridboss_* for a GridBoss).
+  * Generation not known yet (no /status seen): the union of both, so nothing
+    is missed on first connect. The plan is re-applied once /status reports
+    the version, dropping the topics that generation never publishes.
+
+Write acks (/response) are planned for every dongle: the coordinator forwards
+them to the MQTT handler's correlation table, so writes no longer subscribe and
+unsubscribe per command. FW >= 4.3.0 dongles confirm setting writes on
+/setting/updated, but admin commands (restart, firmware update) have no echo and
+are still acked on /response. The update platform's admin/OTA topics are
+subscribed by their owner, not here.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import FrozenSet, Optional
+
+from .topic_router import LEGACY_BANKS
+
+# Topics every dongle needs regardless of generation. /response acks every
+# write on FW < 4.3.0 and the admin commands on FW >= 4.3.0.
+COMMON_SUFFIXES = ("status", "availability", "batteries", "firmwarecode/response", "response")
+
+# FW >= 4.3.0 unified data topics.
+UNIFIED_SUFFIXES = ("input", "hold", "snap/input", "snap/hold", "setting/updated")
+
+# FW < 4.3.0 per-bank data topics.
+INVERTER_BANKS = tuple(bank for bank in LEGACY_BANKS if not bank.startswith("gridboss_"))
+GRIDBOSS_BANKS = tuple(bank for bank in LEGACY_BANKS if bank.startswith("gridboss_"))
+
+
+@lru_cache(maxsize=64)
+def plan_topics(dongle_id: str, gridboss: bool, unified: Optional[bool]) -> FrozenSet[str]:
+    """Return the exact topics to subscribe for one dongle.
+
+    `unified` is True for FW >= 4.3.0, False for older firmware and None when
+    the firmware generation isn't known yet.
+    """
+    suffixes = list(COMMON_SUFFIXES)
+    if unified is not False:
+        suffixes.extend(UNIFIED_SUFFIXES)
+    if unified is not True:
+        suffixes.extend(GRIDBOSS_BANKS if gridboss else INVERTER_BANKS)
+    return frozenset(f"{dongle_id}/{suffix}" for suffix in suffixes)
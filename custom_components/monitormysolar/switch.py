@@ -3,17 +3,13 @@ import asyncio
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.core import callback
 from homeassistant.exceptions import HomeAssistantError
-from homeassistant.helpers.event import (
-    async_track_state_change_event,
-    Event,
-)
-from homeassistant.const import (
-    STATE_UNKNOWN,
-)
-from typing import Dict, List, Optional
+from typing import Dict, List
 from .const import DOMAIN, ENTITIES
 from .coordinator import MonitorMySolarEntry
 from .entity import MonitorMySolarEntity
+from .aggregation import Aggregate, switch_parser
+from .mqttHandeler import LANE_SYNC
+from .settings_sync import async_reconcile, synced_settings, wire_value
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -100,7 +96,6 @@ class InverterSwitch(MonitorMySolarEntity, SwitchEntity):
         self.entity_id = self.coordinator.build_entity_id("switch", self._dongle_id, self._entity_type)
         self.hass = hass
         self._manufacturer = entry.data.get("inverter_brand")
-        self._previous_state = None
         self._user_initiated_change = False
 
         super().__init__(self.coordinator)
@@ -145,14 +140,14 @@ class InverterSwitch(MonitorMySolarEntity, SwitchEntity):
         
         mqtt_handler = self.coordinator.mqtt_handler
         if mqtt_handler is not None:
-            self._previous_state = self._state
+            previous = self._state
             self._state = True  # Optimistically update the state
             self._user_initiated_change = True
             self.throttled_async_write_ha_state()
             _LOGGER.info(f"Setting Switch on value for {self.entity_id}")
-            success = await mqtt_handler.send_update(
+            success = await self._async_track_write(previous, True, mqtt_handler.send_update(
                 self._dongle_id, self.entity_info["unique_id"], 1, self
-            )
+            ))
             if not success:
                 self.revert_state()
         else:
@@ -167,24 +162,24 @@ class InverterSwitch(MonitorMySolarEntity, SwitchEntity):
 
         mqtt_handler = self.coordinator.mqtt_handler
         if mqtt_handler is not None:
-            self._previous_state = self._state  # Save the current state before changing
+            previous = self._state  # Save the current state before changing
             self._state = False  # Optimistically update the state in HA
             self._user_initiated_change = True
             self.throttled_async_write_ha_state()  # Update HA state immediately
             _LOGGER.info(f"Setting Switch off value for {self.entity_id}")
-            success = await mqtt_handler.send_update(
+            success = await self._async_track_write(previous, False, mqtt_handler.send_update(
                 self._dongle_id, self.entity_info["unique_id"], 0, self
-            )
+            ))
             if not success:
                 self.revert_state()
         else:
             _LOGGER.error("MQTT Handler is not initialized")
 
     def revert_state(self):
-        """Revert to the previous state."""
+        """Revert to the last confirmed state."""
         self._user_initiated_change = False
-        if self._previous_state is not None:
-            self._state = self._previous_state
+        if self._revert_value is not None:
+            self._state = self._revert_value
             self.throttled_async_write_ha_state()
 
     def clear_user_initiated_flag(self):
@@ -222,6 +217,7 @@ class InverterSwitch(MonitorMySolarEntity, SwitchEntity):
                 # Schedule state update on the main thread
                 self.hass.loop.call_soon_threadsafe(self.throttled_async_write_ha_state)
 
+
 class CombinedSwitch(MonitorMySolarEntity, SwitchEntity):
     """Switch that controls multiple dongles at once."""
     
@@ -243,76 +239,43 @@ class CombinedSwitch(MonitorMySolarEntity, SwitchEntity):
         self.hass = hass
         self._manufacturer = entry.data.get("inverter_brand")
         self._previous_state = None
-        self._initialization_complete = False
         
         _LOGGER.info(f"Initializing combined switch {self._name} with entity_id: {self.entity_id}, source_entity: {self._source_entity}")
         
         # Track source entities that we need to monitor
         self._tracked_entities = []
-        self._source_values = {}
         for dongle_id in dongle_ids:
             source_entity_id = self.coordinator.build_entity_id("switch", dongle_id, self._source_entity)
             self._tracked_entities.append(source_entity_id)
-            self._source_values[source_entity_id] = None
             _LOGGER.debug(f"Combined switch {self._name} will track: {source_entity_id}")
             
-        # Set up state tracking
-        for entity_id in self._tracked_entities:
-            self._async_add_entity_listener(entity_id)
+        # Running min over the sources' raw store values (1.0 on, 0.0 off)
+        self._aggregate = Aggregate(
+            self._tracked_entities, switch_parser(self.coordinator.normalize_setting_value)
+        )
+        self._source_values = self._aggregate.values
         
         super().__init__(self.coordinator)
-        
-        # Initialize the state based on current source values
-        self.hass.async_create_task(self._initialize_state())
-        
-    def _async_add_entity_listener(self, entity_id):
-        """Set up a listener for a source entity."""
-        @callback
-        def async_state_changed_listener(event: Event) -> None:
-            """Handle entity state changes."""
-            # Updated to use generic Event data structure
-            if not hasattr(event, 'data'):
-                return
-                
-            new_state = event.data.get("new_state")
-            if new_state is None:
-                return
-                
-            try:
-                # Convert state to boolean
-                if new_state.state.lower() == 'on':
-                    value = True
-                elif new_state.state.lower() == 'off':
-                    value = False
-                else:
-                    value = bool(int(new_state.state))
-                    
-                self._source_values[entity_id] = value
-                # Use create_task to run the async method from a sync callback
-                self.hass.async_create_task(self._update_combined_state())
-            except (ValueError, TypeError):
-                _LOGGER.warning(f"Invalid state value for {entity_id}: {new_state.state}")
-                
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
         self.async_on_remove(
-            async_track_state_change_event(
-                self.hass, entity_id, async_state_changed_listener
-            )
+            self.coordinator.async_add_aggregate(self._aggregate, self._update_combined_state)
         )
+        self._update_combined_state()
     
-    async def _update_combined_state(self):
+    @callback
+    def _update_combined_state(self):
         """Update the combined state based on source switches.
         
         If any switch is off, the combined state is off.
         """
-        # Get all defined values
-        values = [v for v in self._source_values.values() if v is not None]
-        
-        if not values:
+        if not self._aggregate.count:
             _LOGGER.debug(f"No values available for combined switch {self._name}")
             return
             
         # If any switch is OFF, the combined state is OFF
-        new_state = all(values)
+        new_state = self._aggregate.min == 1
         
         if new_state != self._state:
             self._state = new_state
@@ -335,15 +298,8 @@ class CombinedSwitch(MonitorMySolarEntity, SwitchEntity):
         
     @property
     def available(self):
-        # Check if we're still initializing
-        if not hasattr(self, '_initialization_complete'):
-            return True  # Show as available during initialization
-        # After initialization, at least one source entity should exist and have a valid state
-        for entity_id in self._tracked_entities:
-            state = self.hass.states.get(entity_id)
-            if state and state.state not in [STATE_UNKNOWN, "unavailable"]:
-                return True
-        return False
+        # At least one source switch should have reported
+        return self._aggregate.count > 0
         
     @property
     def device_info(self):
@@ -415,37 +371,6 @@ class CombinedSwitch(MonitorMySolarEntity, SwitchEntity):
             "source_entities": self._tracked_entities
         }
     
-    async def _initialize_state(self):
-        """Initialize the state based on current source entity states."""
-        # Try multiple times with increasing delays to ensure entities are loaded
-        for attempt in range(3):
-            await asyncio.sleep(2 * (attempt + 1))  # 2s, 4s, 6s delays
-            
-            entities_found = False
-            for entity_id in self._tracked_entities:
-                state = self.hass.states.get(entity_id)
-                if state and state.state not in [STATE_UNKNOWN, "unavailable"]:
-                    entities_found = True
-                    try:
-                        if state.state.lower() == 'on':
-                            value = True
-                        elif state.state.lower() == 'off':
-                            value = False
-                        else:
-                            value = bool(int(state.state))
-                        self._source_values[entity_id] = value
-                    except (ValueError, TypeError):
-                        _LOGGER.debug(f"Could not parse state for {entity_id}: {state.state}")
-            
-            if entities_found:
-                break
-            elif attempt < 2:
-                _LOGGER.debug(f"Attempt {attempt + 1}: Source entities not ready for {self._name}, retrying...")
-        
-        self._initialization_complete = True
-        await self._update_combined_state()
-        self.throttled_async_write_ha_state()
-    
     @callback
     def _handle_coordinator_update(self) -> None:
         """Override to prevent looking for combined entity in coordinator."""
@@ -475,11 +400,12 @@ class CombinedSyncSwitch(MonitorMySolarEntity, SwitchEntity):
         self._manufacturer = entry.data.get("inverter_brand")
         self._icon = entity_info.get("icon", "mdi:sync")
         
-        # Track all listeners we set up
-        self._sync_listeners = []
-        self._monitored_entities: Dict[str, any] = {}
+        self._remove_setting_listener = None  # coordinator setting listener, while enabled
+        self._syncing: Dict[str, any] = {}  # setting -> value being pushed to the other dongles
         self._periodic_sync_task = None
         self._sync_check_interval = 60  # Check every 60 seconds
+        self._synced_settings = synced_settings(self.coordinator.inverter_brand)
+        self._last_reconciliation = None  # ReconcileSummary.as_dict() of the last periodic check
         
         super().__init__(self.coordinator)
         
@@ -491,6 +417,10 @@ class CombinedSyncSwitch(MonitorMySolarEntity, SwitchEntity):
         if self._state:
             await self._setup_sync_listeners()
             _LOGGER.info(f"Restored sync state: enabled for {len(self._dongle_ids)} dongles")
+
+    async def async_will_remove_from_hass(self):
+        await self._remove_sync_listeners()
+        await super().async_will_remove_from_hass()
         
     @property
     def name(self):
@@ -541,10 +471,11 @@ class CombinedSyncSwitch(MonitorMySolarEntity, SwitchEntity):
         return {
             "sync_enabled": self._state,
             "monitored_dongles": self._dongle_ids,
-            "monitored_entities_count": len(self._monitored_entities),
+            "monitored_entities_count": len(self._synced_settings) * len(self._dongle_ids) if self._state else 0,
             "synced_entity_types": ["switch", "number", "select", "time"] if self._state else [],
             "sync_check_interval_seconds": self._sync_check_interval,
-            "recent_sync_history": recent_syncs
+            "recent_sync_history": recent_syncs,
+            "last_reconciliation": self._last_reconciliation,
         }
         
     async def async_turn_on(self, **kwargs):
@@ -568,113 +499,41 @@ class CombinedSyncSwitch(MonitorMySolarEntity, SwitchEntity):
         _LOGGER.info("Inverter settings synchronization disabled")
         
     async def _setup_sync_listeners(self):
-        """Set up listeners for all entities that should be synchronized."""
-        # Get all entities that need syncing
-        inverter_brand = self.coordinator.inverter_brand
-        brand_entities = ENTITIES.get(inverter_brand, {})
-        
-        # Entity types to monitor for changes (excluding sensors and binary sensors)
-        monitored_types = ["switch", "number", "select", "time", "time_hhmm"]
-        
-        for entity_type in monitored_types:
-            if entity_type not in brand_entities:
-                continue
-                
-            for bank_name, entities in brand_entities[entity_type].items():
-                # Skip combined entities to avoid loops
-                if bank_name == "combined":
-                    continue
-                    
-                for entity_config in entities:
-                    unique_id = entity_config["unique_id"]
-                    
-                    # Create listeners for each dongle
-                    for dongle_id in self._dongle_ids:
-                        formatted_dongle_id = self.coordinator.get_formatted_dongle_id(dongle_id)
-                        
-                        # Determine the actual entity type for entity_id
-                        actual_entity_type = "time" if entity_type == "time_hhmm" else entity_type
-                        entity_id = f"{actual_entity_type}.{formatted_dongle_id}_{unique_id.lower()}"
-                        
-                        # Store entity info for later use
-                        self._monitored_entities[entity_id] = {
-                            "dongle_id": dongle_id,
-                            "unique_id": unique_id,
-                            "entity_type": entity_type,
-                            "bank_name": bank_name
-                        }
-                        
-                        # Set up listener
-                        @callback
-                        async def async_state_changed_listener(event: Event, monitored_entity_id=entity_id) -> None:
-                            """Handle entity state changes and sync to other dongles."""
-                            await self._handle_entity_change(event, monitored_entity_id)
-                            
-                        listener = async_track_state_change_event(
-                            self.hass, entity_id, async_state_changed_listener
-                        )
-                        self._sync_listeners.append(listener)
-        
-        _LOGGER.info(f"Set up synchronization for {len(self._monitored_entities)} entities across {len(self._dongle_ids)} dongles")
-        
-    async def _handle_entity_change(self, event: Event, entity_id: str):
-        """Handle when a monitored entity changes and sync to other dongles."""
-        if not self._state:  # Sync is disabled
-            return
-            
-        if not hasattr(event, 'data'):
-            return
-            
-        new_state = event.data.get("new_state")
-        old_state = event.data.get("old_state")
-        
-        if new_state is None or new_state.state in [STATE_UNKNOWN, "unavailable"]:
-            return
-            
-        # Get entity info
-        entity_info = self._monitored_entities.get(entity_id)
-        if not entity_info:
-            return
-            
-        source_dongle_id = entity_info["dongle_id"]
-        unique_id = entity_info["unique_id"]
-        entity_type = entity_info["entity_type"]
-        
-        # Don't sync if the value hasn't actually changed
-        if old_state and old_state.state == new_state.state:
+        """Follow every synced setting through one coordinator change listener."""
+        if self._remove_setting_listener is None:
+            self._remove_setting_listener = self.coordinator.async_add_setting_listener(
+                self._handle_setting_change
+            )
+        _LOGGER.info(f"Set up synchronization for {len(self._synced_settings)} settings across {len(self._dongle_ids)} dongles")
+
+    @callback
+    def _handle_setting_change(self, setting, source_dongle_id: str, value) -> None:
+        """A dongle's value for a synced setting changed: push it to the others."""
+        if not self._state or source_dongle_id not in self._dongle_ids:
             return
-            
-        _LOGGER.info(f"Syncing change from {entity_id}: {old_state.state if old_state else 'unknown'} -> {new_state.state}")
-        
+        unique_id = setting.unique_id
+        if self._syncing.get(unique_id) == value:
+            return  # the echo of a value we're pushing right now
         # Record this change in history
-        self.coordinator.record_setting_change(source_dongle_id, unique_id, new_state.state)
-        
-        # Determine the value to sync based on entity type
-        value = None
-        if entity_type == "switch":
-            value = 1 if new_state.state == "on" else 0
-        elif entity_type in ["number", "select"]:
-            value = new_state.state
-        elif entity_type in ["time", "time_hhmm"]:
-            # For time entities, we need to handle the format properly
-            value = new_state.state
-            
-        if value is None:
-            _LOGGER.warning(f"Could not determine value to sync for {entity_id}")
+        self.coordinator.record_setting_change(source_dongle_id, unique_id, value)
+        # Only dongles that reported the setting, and hold something else.
+        others = self.coordinator.sync_index.values(unique_id)
+        targets = [
+            dongle_id for dongle_id in self._dongle_ids
+            if dongle_id != source_dongle_id and dongle_id in others and others[dongle_id] != value
+        ]
+        if not targets:
             return
-            
-        # Get the MQTT handler
+        _LOGGER.info(f"Syncing change of {unique_id} on {source_dongle_id}: -> {value!r}")
+        self.hass.async_create_task(self._sync_setting(setting, value, targets))
+
+    async def _sync_setting(self, setting, value, dongle_ids: List[str]) -> None:
+        """Write one setting's new value to `dongle_ids`."""
         mqtt_handler = self.coordinator.mqtt_handler
         if not mqtt_handler:
             _LOGGER.error("MQTT Handler is not initialized")
             return
             
-        # Sync to all other dongles
-        other_dongle_ids = [d for d in self._dongle_ids if d != source_dongle_id]
-        
-        if not other_dongle_ids:
-            return
-            
         # Create a temporary entity object for the MQTT handler
         class TempEntity:
             def __init__(self, entity_id):
@@ -686,29 +545,33 @@ class CombinedSyncSwitch(MonitorMySolarEntity, SwitchEntity):
             def async_write_ha_state(self):
                 pass
                 
-        temp_entity = TempEntity(entity_id)
+        unique_id = setting.unique_id
+        temp_entity = TempEntity(f"sync_{unique_id.lower()}")
         
         # Use the multi-dongle update method for better reliability
-        _LOGGER.debug(f"Syncing {unique_id}={value} from {source_dongle_id} to {len(other_dongle_ids)} other dongles")
+        _LOGGER.debug(f"Syncing {unique_id}={value} to {len(dongle_ids)} other dongles")
+        self._syncing[unique_id] = value
         try:
             # Send update to all other dongles at once and wait for all responses
-            success = await mqtt_handler.send_update_to_multiple_dongles(
-                other_dongle_ids, unique_id, value, temp_entity
+            result = await mqtt_handler.send_update_to_multiple_dongles(
+                dongle_ids, unique_id, wire_value(setting, value), temp_entity, lane=LANE_SYNC
             )
-            if not success:
-                _LOGGER.warning(f"Failed to sync {unique_id} to one or more dongles: {other_dongle_ids}")
+            if not result:
+                _LOGGER.warning(f"Failed to sync {unique_id} to dongles: {result.failed}")
             else:
-                _LOGGER.info(f"Successfully synced {unique_id}={value} to all {len(other_dongle_ids)} other dongles")
+                _LOGGER.info(f"Successfully synced {unique_id}={value} to all {len(dongle_ids)} other dongles")
         except Exception as e:
             _LOGGER.error(f"Error syncing to other dongles: {e}")
+        finally:
+            if self._syncing.get(unique_id) == value:
+                del self._syncing[unique_id]
         
     async def _remove_sync_listeners(self):
-        """Remove all sync listeners."""
-        for listener in self._sync_listeners:
-            listener()
-        self._sync_listeners.clear()
-        self._monitored_entities.clear()
-        _LOGGER.debug("Removed all sync listeners")
+        """Remove the sync listener."""
+        if self._remove_setting_listener is not None:
+            self._remove_setting_listener()
+            self._remove_setting_listener = None
+        _LOGGER.debug("Removed sync listener")
     
     async def _start_periodic_sync_check(self):
         """Start periodic checking for out-of-sync settings."""
@@ -729,102 +592,52 @@ class CombinedSyncSwitch(MonitorMySolarEntity, SwitchEntity):
         _LOGGER.debug("Stopped periodic sync check")
     
     async def _check_and_sync_all_settings(self):
-        """Check all monitored settings and sync any that are out of sync."""
+        """Reconcile every synced setting across the dongles in one batched pass."""
         if not self._state:
             return
-            
+        if not self.coordinator.mqtt_handler:
+            _LOGGER.error("MQTT Handler is not initialized")
+            return
+
         _LOGGER.debug("Running periodic sync check for all monitored settings")
-        
-        # Get all unique settings being monitored
-        unique_settings = {}
-        for entity_id, entity_info in self._monitored_entities.items():
-            unique_id = entity_info["unique_id"]
-            entity_type = entity_info["entity_type"]
-            if unique_id not in unique_settings:
-                unique_settings[unique_id] = {
-                    "entity_type": entity_type,
-                    "entities": []
-                }
-            unique_settings[unique_id]["entities"].append(entity_id)
-        
-        # Check each setting
-        out_of_sync_count = 0
-        for unique_id, setting_info in unique_settings.items():
-            entity_type = setting_info["entity_type"]
-            entities = setting_info["entities"]
-            
-            # Get current values for all dongles
-            values = {}
-            for entity_id in entities:
-                state = self.hass.states.get(entity_id)
-                if state and state.state not in [STATE_UNKNOWN, "unavailable"]:
-                    dongle_id = self._monitored_entities[entity_id]["dongle_id"]
-                    values[dongle_id] = state.state
-            
-            # Check if values are different
-            if len(set(values.values())) > 1:
-                out_of_sync_count += 1
-                _LOGGER.warning(f"Setting {unique_id} is out of sync across dongles: {values}")
-                
-                # Use history to determine which value is correct
-                latest_change = self.coordinator.get_latest_setting_change(unique_id)
-                
-                if latest_change:
-                    # Use the most recent change as source of truth
-                    correct_value = latest_change["value"]
-                    source_dongle = latest_change["dongle_id"]
-                    _LOGGER.info(f"Using most recent change from {source_dongle} as source of truth: {unique_id}={correct_value}")
-                else:
-                    # No history, use the most common value or first dongle's value
-                    value_counts = {}
-                    for v in values.values():
-                        value_counts[v] = value_counts.get(v, 0) + 1
-                    correct_value = max(value_counts, key=value_counts.get)
-                    source_dongle = next(d for d, v in values.items() if v == correct_value)
-                    _LOGGER.info(f"No history available, using most common value from {source_dongle}: {unique_id}={correct_value}")
-                
-                # Sync all other dongles to the correct value
-                dongles_to_sync = [d for d, v in values.items() if v != correct_value]
-                
-                if dongles_to_sync:
-                    # Convert value for MQTT based on entity type
-                    mqtt_value = None
-                    if entity_type == "switch":
-                        mqtt_value = 1 if correct_value == "on" else 0
-                    elif entity_type in ["number", "select", "time", "time_hhmm"]:
-                        mqtt_value = correct_value
-                    
-                    if mqtt_value is not None:
-                        # Create temp entity for sync
-                        class TempEntity:
-                            def __init__(self, entity_id):
-                                self.entity_id = entity_id
-                            def revert_state(self):
-                                pass
-                            def async_write_ha_state(self):
-                                pass
-                        
-                        temp_entity = TempEntity(f"sync_check_{unique_id}")
-                        
-                        # Send update to out-of-sync dongles
-                        mqtt_handler = self.coordinator.mqtt_handler
-                        if mqtt_handler:
-                            try:
-                                success = await mqtt_handler.send_update_to_multiple_dongles(
-                                    dongles_to_sync, unique_id, mqtt_value, temp_entity
-                                )
-                                if success:
-                                    _LOGGER.info(f"Successfully synced {unique_id}={correct_value} to {len(dongles_to_sync)} dongles")
-                                else:
-                                    _LOGGER.error(f"Failed to sync {unique_id} to out-of-sync dongles")
-                            except Exception as e:
-                                _LOGGER.error(f"Error during periodic sync of {unique_id}: {e}")
-        
-        if out_of_sync_count > 0:
-            _LOGGER.info(f"Periodic sync check found and corrected {out_of_sync_count} out-of-sync settings")
-        else:
+
+        class TempEntity:
+            def __init__(self, entity_id):
+                self.entity_id = entity_id
+            def revert_state(self):
+                pass
+            def async_write_ha_state(self):
+                pass
+
+        try:
+            summary = await async_reconcile(
+                self.coordinator, self._dongle_ids, TempEntity("sync_check"), self._synced_settings,
+                syncing=self._syncing,
+            )
+        except Exception as e:
+            _LOGGER.error(f"Error during periodic sync check: {e}")
+            return
+        self._last_reconciliation = summary.as_dict()
+
+        for unique_id, drift in summary.drifted.items():
+            _LOGGER.warning(
+                f"Setting {unique_id} is out of sync across dongles: {drift.values}; "
+                f"converging on {drift.target!r} from {drift.source}"
+            )
+        if not summary.drifted:
             _LOGGER.debug("Periodic sync check found all settings in sync")
-    
+        elif summary.converged:
+            _LOGGER.info(
+                f"Periodic sync check corrected {len(summary.drifted)} out-of-sync settings "
+                f"with {len(summary.writes)} batched writes"
+            )
+        else:
+            _LOGGER.error(
+                f"Periodic sync check could not correct {len(summary.drifted)} settings on: "
+                f"{self._last_reconciliation['failed_dongles']}"
+            )
+        self.throttled_async_write_ha_state()
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Override to prevent looking for sync switch in coordinator."""
@@ -1,5 +1,4 @@
 from datetime import datetime, timedelta
-import asyncio
 from homeassistant.components.time import TimeEntity
 from homeassistant.core import callback
 from homeassistant.exceptions import HomeAssistantError
@@ -59,9 +58,7 @@ class InverterTime(MonitorMySolarEntity, TimeEntity):
         self.hass = hass
         self._manufacturer = entry.data.get("inverter_brand")
         self._last_mqtt_update = None
-        self._debounce_task = None
         self._user_initiated_change = False
-        self._previous_state = None
 
         super().__init__(self.coordinator)
 
@@ -99,8 +96,6 @@ class InverterTime(MonitorMySolarEntity, TimeEntity):
 
     async def async_set_value(self, value):
         """Handle user input and send to MQTT."""
-        now = datetime.now()
-
         # Check if entity should be available based on conditional settings
         availability_info = self.coordinator.get_entity_availability_info(self._dongle_id, self._entity_type)
         if not availability_info["available"] and availability_info["reason"]:
@@ -111,30 +106,20 @@ class InverterTime(MonitorMySolarEntity, TimeEntity):
             LOGGER.debug(f"No change in state for {self.entity_id}. Skipping MQTT update.")
             return
 
-        # Debounce logic to delay the MQTT update and prevent multiple messages
-        if self._debounce_task:
-            self._debounce_task.cancel()
-
-        async def debounce():
-            await asyncio.sleep(1)
-            if self._last_mqtt_update and (now - self._last_mqtt_update).total_seconds() < 1:
-                LOGGER.debug(f"Skipping MQTT update for {self.entity_id} due to rate limiting")
-                return
-
-            LOGGER.info(f"Setting time value for {self.entity_id} to {value}")
-            self._previous_state = self._state
-            self._user_initiated_change = True
-            self.update_state(value)
-            success = await self.coordinator.mqtt_handler.send_update(
-                self._dongle_id,
-                self.entity_info["unique_id"],
-                value.isoformat(),
-                self,
-            )
-            if not success:
-                self.revert_state()
-
-        self._debounce_task = asyncio.create_task(debounce())
+        # Rapid changes are coalesced by the MQTT handler: a newer value replaces
+        # a queued one for the same setting, so only the final time is sent.
+        LOGGER.info(f"Setting time value for {self.entity_id} to {value}")
+        previous = self._state
+        self._user_initiated_change = True
+        self.update_state(value)
+        success = await self._async_track_write(previous, value, self.coordinator.mqtt_handler.send_update(
+            self._dongle_id,
+            self.entity_info["unique_id"],
+            value.isoformat(),
+            self,
+        ))
+        if not success:
+            self.revert_state()
 
     @callback
     def update_state(self, value):
@@ -147,10 +132,10 @@ class InverterTime(MonitorMySolarEntity, TimeEntity):
             self.hass.loop.call_soon_threadsafe(self.throttled_async_write_ha_state)
 
     def revert_state(self):
-        """Revert to the previous state."""
+        """Revert to the last confirmed state."""
         self._user_initiated_change = False
-        if self._previous_state is not None:
-            self._state = self._previous_state
+        if self._revert_value is not None:
+            self._state = self._revert_value
         self.hass.loop.call_soon_threadsafe(self.throttled_async_write_ha_state)
 
     def clear_user_initiated_flag(self):
@@ -0,0 +1,113 @@
+"""Precompiled MQTT topic router.
+
+The coordinator's MQTT callback used to classify every topic with a chain of
+`endswith` / `in` tests, and process_message re-split the topic to find the
+bank and re-tested it for /availability and /setting/updated. The router
+compiles every concrete topic a dongle publishes into a `topic -> Route` map
+when we subscribe, so classifying a message is a single dict lookup and the
+dongle id and bank come pre-parsed.
+
+Topics we didn't precompile (debug/*, anything new the firmware starts
+publishing) are classified once with the same rules the old chain used and
+then cached, up to a bound.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, NamedTuple
+
+# Route kinds.
+ROUTE_FIRMWARE_CODE = "firmware_code"
+ROUTE_DEBUG = "debug"
+ROUTE_BATTERIES = "batteries"
+ROUTE_STATUS = "status"
+ROUTE_AVAILABILITY = "availability"
+ROUTE_SNAPSHOT = "snapshot"
+ROUTE_RESPONSE = "response"
+ROUTE_SETTING_UPDATED = "setting_updated"
+ROUTE_DATA = "data"
+
+# Legacy per-bank data topics (pre-4.3.0 firmware, and GridBoss).
+LEGACY_BANKS = (
+    "inputbank1", "inputbank2", "inputbank3", "inputbank4", "inputbank5", "inputbank6",
+    "holdbank1", "holdbank2", "holdbank3", "holdbank4", "holdbank5", "holdbank6",
+    "gridboss_inputbank1", "gridboss_inputbank2",
+    "gridboss_holdbank1", "gridboss_holdbank2", "gridboss_holdbank3",
+)
+
+# Every concrete topic suffix a dongle publishes, with its route kind.
+TOPIC_SUFFIXES: Dict[str, str] = {
+    "firmwarecode/response": ROUTE_FIRMWARE_CODE,
+    "batteries": ROUTE_BATTERIES,
+    "status": ROUTE_STATUS,
+    "availability": ROUTE_AVAILABILITY,
+    "snap/input": ROUTE_SNAPSHOT,
+    "snap/hold": ROUTE_SNAPSHOT,
+    "response": ROUTE_RESPONSE,
+    "setting/updated": ROUTE_SETTING_UPDATED,
+    "input": ROUTE_DATA,
+    "hold": ROUTE_DATA,
+    **{bank: ROUTE_DATA for bank in LEGACY_BANKS},
+}
+
+
+class Route(NamedTuple):
+    """A classified topic."""
+
+    kind: str  # one of the ROUTE_* constants
+    dongle_id: str  # first topic segment
+    bank: str  # last topic segment, e.g. "inputbank1", "input", "updated"
+
+
+def classify_topic(topic: str) -> Route:
+    """Classify a topic with the rules the old endswith chain applied, in order."""
+    dongle_id = topic.split("/", 1)[0]
+    bank = topic.rsplit("/", 1)[-1]
+    if topic.endswith("/firmwarecode/response"):
+        kind = ROUTE_FIRMWARE_CODE
+    elif "/debug/" in topic:
+        kind = ROUTE_DEBUG
+    elif topic.endswith("/batteries"):
+        kind = ROUTE_BATTERIES
+    elif topic.endswith("/status"):
+        kind = ROUTE_STATUS
+    elif topic.endswith("/availability"):
+        kind = ROUTE_AVAILABILITY
+    elif topic.endswith("/snap/input") or topic.endswith("/snap/hold"):
+        kind = ROUTE_SNAPSHOT
+    elif topic.endswith("/setting/updated"):
+        kind = ROUTE_SETTING_UPDATED
+    elif topic.endswith("/response"):
+        kind = ROUTE_RESPONSE
+    else:
+        kind = ROUTE_DATA
+    return Route(kind, dongle_id, bank)
+
+
+class TopicRouter:
+    """`topic -> Route` lookup table, precompiled per dongle."""
+
+    def __init__(self, max_dynamic_routes: int = 1024) -> None:
+        self._routes: Dict[str, Route] = {}
+        self._dynamic_routes = 0
+        self._max_dynamic_routes = max_dynamic_routes
+
+    def add_dongle(self, dongle_id: str, suffixes: Iterable[str] = ()) -> None:
+        """Precompile every known topic for `dongle_id` (plus any extra suffixes)."""
+        for suffix in (*TOPIC_SUFFIXES, *suffixes):
+            topic = f"{dongle_id}/{suffix}"
+            self._routes[topic] = classify_topic(topic)
+
+    def route(self, topic: str) -> Route:
+        """Return the Route for `topic` — one dict hit for precompiled topics."""
+        route = self._routes.get(topic)
+        if route is None:
+            route = classify_topic(topic)
+            # Cache ad-hoc topics too, but bounded so an unexpected stream of
+            # unique topic names can't grow the table forever.
+            if self._dynamic_routes < self._max_dynamic_routes:
+                self._routes[topic] = route
+                self._dynamic_routes += 1
+        return route
+
+    def __len__(self) -> int:
+        return len(self._routes)
@@ -9,22 +9,20 @@ This module provides firmware update functionality with:
 - Support for stable and beta versions
 
 The update entity will:
-1. Check for updates automatically every 6 hours
+1. Follow the coordinator's shared FirmwareVersionCache, which checks the
+   update server in the background every 6 hours (see firmware_versions.py)
 2. Check when user clicks on the entity (via async_release_notes)
 3. Display release notes from the server
 4. Show progress during firmware installation
 """
 from __future__ import annotations
 
-import aiohttp
 import asyncio
 import json
 import uuid
-from datetime import timedelta
 from homeassistant.components import mqtt
 from homeassistant.components.update import UpdateEntity, UpdateEntityFeature, UpdateDeviceClass
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.event import async_track_time_interval
 from .const import DOMAIN, ENTITIES, LOGGER, CONF_USE_BETA, DEFAULT_USE_BETA
 from .coordinator import MonitorMySolarEntry
 from .entity import MonitorMySolarEntity
@@ -35,16 +33,18 @@ from .entity import MonitorMySolarEntity
 OTA_ACK_TIMEOUT = 30  # seconds to wait for <id>/admin/response
 OTA_OVERALL_TIMEOUT = 600  # seconds to watch progress/result before giving up
 
-UPDATE_URL = "https://monitoring.monitormy.solar/version"
-UPDATE_CHECK_INTERVAL = timedelta(hours=6)  # Check every 6 hours
+# Re-check the server when release notes are opened, if the cached copy is older than this.
+RELEASE_NOTES_MAX_AGE = 300  # seconds
 
 async def async_setup_entry(hass: HomeAssistant, entry: MonitorMySolarEntry, async_add_entities) -> None:
     """Set up update entities."""
     coordinator = entry.runtime_data
     dongle_ids = coordinator._dongle_ids
     
-    # Fetch latest firmware version from server
-    await _fetch_server_versions(coordinator)
+    # Latest firmware versions load from storage and refresh in the background;
+    # the entities update themselves when they arrive.
+    coordinator.firmware_versions.async_start()
+    entry.async_on_unload(coordinator.firmware_versions.async_stop)
 
     entities = []
     
@@ -61,22 +61,6 @@ async def async_setup_entry(hass: HomeAssistant, entry: MonitorMySolarEntry, asy
     if entities:
         async_add_entities(entities)
         
-async def _fetch_server_versions(coordinator) -> None:
-    """Fetch latest firmware versions from server."""
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(UPDATE_URL, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    server_data = await response.json()
-                    coordinator.server_versions = server_data
-                    LOGGER.debug(f"Server versions updated: {server_data}")
-                else:
-                    LOGGER.warning(f"Failed to fetch server versions: HTTP {response.status}")
-    except asyncio.TimeoutError:
-        LOGGER.warning("Timeout fetching server versions")
-    except Exception as e:
-        LOGGER.error(f"Failed to fetch server versions: {e}")
-
 
 class DongleFirmwareUpdate(MonitorMySolarEntity, UpdateEntity):
     """Firmware update entity for MonitorMySolar dongle."""
@@ -100,8 +84,6 @@ class DongleFirmwareUpdate(MonitorMySolarEntity, UpdateEntity):
         self.entity_id = self.coordinator.build_entity_id("update", self._dongle_id, "firmware_update")
         self._attr_in_progress = False
         self._attr_progress = None
-        self._unsubscribe_timer = None
-        self._last_check = None
         
         super().__init__(self.coordinator)
 
@@ -167,7 +149,7 @@ class DongleFirmwareUpdate(MonitorMySolarEntity, UpdateEntity):
     @property
     def latest_version(self) -> str | None:
         """Latest version available."""
-        server_versions = self.coordinator.server_versions or {}
+        server_versions = self.coordinator.firmware_versions.versions
 
         if self._use_beta:
             version = server_versions.get("betaFwVersion")
@@ -187,7 +169,7 @@ class DongleFirmwareUpdate(MonitorMySolarEntity, UpdateEntity):
     def release_notes(self) -> str | None:
         """Return the release notes."""
         try:
-            server_versions = self.coordinator.server_versions or {}
+            server_versions = self.coordinator.firmware_versions.versions
             
             # Determine which changelog to show based on version
             latest = self.latest_version
@@ -382,35 +364,21 @@ class DongleFirmwareUpdate(MonitorMySolarEntity, UpdateEntity):
         """When entity is added to hass."""
         await super().async_added_to_hass()
         
-        # Set up periodic update checks
-        async def _periodic_update_check(_):
-            """Check for updates periodically."""
-            await self._async_check_for_update()
-        
-        self._unsubscribe_timer = async_track_time_interval(
-            self.hass, _periodic_update_check, UPDATE_CHECK_INTERVAL
+        # Follow the shared version cache instead of polling the server ourselves.
+        self.async_on_remove(
+            self.coordinator.firmware_versions.async_add_listener(self.async_write_ha_state)
         )
-        
-        LOGGER.debug(f"Set up periodic update check for {self._dongle_id} every {UPDATE_CHECK_INTERVAL}")
-    
-    async def async_will_remove_from_hass(self) -> None:
-        """When entity will be removed from hass."""
-        if self._unsubscribe_timer:
-            self._unsubscribe_timer()
-        await super().async_will_remove_from_hass()
     
-    async def _async_check_for_update(self) -> None:
+    async def _async_check_for_update(self, max_age: float = 0) -> None:
         """Check for firmware updates."""
         LOGGER.debug(f"Checking for firmware updates for {self._dongle_id}")
-        await _fetch_server_versions(self.coordinator)
-        self._last_check = self.hass.loop.time()
+        await self.coordinator.firmware_versions.async_refresh(max_age=max_age)
         self.async_write_ha_state()
     
     async def async_release_notes(self) -> str | None:
         """Return the release notes and trigger update check if needed."""
-        # Check for updates if we haven't checked recently
-        if self._last_check is None or (self.hass.loop.time() - self._last_check) > 300:  # 5 minutes
-            await self._async_check_for_update()
+        # Check for updates if the shared cache hasn't been refreshed recently
+        await self._async_check_for_update(max_age=RELEASE_NOTES_MAX_AGE)
         
         return self.release_notes()
     
@@ -0,0 +1,61 @@
+"""Warm-start cache of the coordinator store across HA restarts.
+
+After a restart every entity used to sit at 'unknown' until the connect-time
+snapshot round-tripped — and if the dongle was slow or offline, FW >= 4.3.0
+(change-data only) units stayed blank until each value happened to change.
+
+The coordinator persists its last-known state to HA storage (one file per
+config entry) and rehydrates it before the platforms are forwarded, so
+entities seed instantly at boot and the snapshot only reconciles the
+difference. Saves are debounced and run in the background via Store's delayed
+write, which HA also flushes on shutdown.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Optional
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, LOGGER
+
+STORAGE_VERSION = 1
+
+# Seconds between a change and the save that persists it. A save is scheduled
+# at most once per window, so a steady stream of data can't postpone it forever.
+SAVE_DELAY = 60
+
+
+class WarmStartCache:
+    """Debounced persistence of the coordinator's last-known state."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        self._store: Store[Dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.warm_start"
+        )
+        self._save_pending = False
+
+    async def async_load(self) -> Optional[Dict[str, Any]]:
+        """Return the saved state, or None if there is none (or it's unreadable)."""
+        try:
+            data = await self._store.async_load()
+        except Exception as e:
+            LOGGER.warning(f"Could not load warm-start cache: {e}")
+            return None
+        return data if isinstance(data, dict) else None
+
+    def async_schedule_save(self, data_func: Callable[[], Dict[str, Any]]) -> None:
+        """Save `data_func()` within SAVE_DELAY seconds, unless already scheduled."""
+        if self._save_pending:
+            return
+        self._save_pending = True
+
+        def _data() -> Dict[str, Any]:
+            self._save_pending = False
+            return data_func()
+
+        self._store.async_delay_save(_data, SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Delete the saved state (config entry removed)."""
+        await self._store.async_remove()
@@ -0,0 +1,68 @@
+"""Per-dongle write-ack latency and the timeouts derived from it.
+
+Every write used to wait a flat 15 s for <dongle>/response before reverting.
+A healthy LAN dongle acks in ~100 ms, so a lost write took 15 s to show; a
+congested WiFi unit can take seconds, so a tighter flat limit would revert
+writes that actually landed.
+
+AckLatency keeps a rolling window of measured publish->ack times for one
+dongle and derives its timeout as p99 x TIMEOUT_FACTOR, clamped to
+[MIN_TIMEOUT, MAX_TIMEOUT]. Until MIN_SAMPLES acks have been seen the caller's
+default applies. A timed-out write is recorded at its timeout (it took at
+least that long), so a link that degrades widens its own timeout.
+"""
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Deque, Dict, Optional
+
+LATENCY_WINDOW = 100  # most recent acks kept per dongle
+MIN_SAMPLES = 5
+TIMEOUT_FACTOR = 3.0
+MIN_TIMEOUT = 2.0  # seconds
+MAX_TIMEOUT = 30.0  # seconds
+
+
+class AckLatency:
+    """Rolling publish->ack latency for one dongle."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.timeouts = 0
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def record_timeout(self, seconds: float) -> None:
+        self.timeouts += 1
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Nearest-rank percentile (q in 0-100) of the window, None if empty."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(1, math.ceil(len(ordered) * q / 100))
+        return ordered[rank - 1]
+
+    def timeout(self, default: float) -> float:
+        """How long the next write should wait for its ack."""
+        if len(self._samples) < MIN_SAMPLES:
+            return default
+        return min(MAX_TIMEOUT, max(MIN_TIMEOUT, self.percentile(99) * TIMEOUT_FACTOR))
+
+    def stats(self, default: float) -> Dict[str, Optional[float]]:
+        """p50/p95/p99 and the current timeout, in milliseconds."""
+
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 1) if seconds is not None else None
+
+        return {
+            "p50": ms(self.percentile(50)),
+            "p95": ms(self.percentile(95)),
+            "p99": ms(self.percentile(99)),
+            "timeout": ms(self.timeout(default)),
+            "samples": len(self._samples),
+            "timeouts": self.timeouts,
+        }
@@ -81,6 +81,7 @@ def coordinator():
     """
     # Import inside the fixture so the HA stubs are in place first.
     from custom_components.monitormysolar.coordinator import MonitorMySolar
+    from custom_components.monitormysolar.topic_router import TopicRouter
 
     # Bypass __init__ by allocating directly.
     coord = MonitorMySolar.__new__(MonitorMySolar)
@@ -98,9 +99,30 @@ def coordinator():
     coord.entry = entry
     coord._dongle_ids = ["dongle-test"]
     coord._dongle_data = []
+    coord._entity_id_cache_source = None  # entity_id memo rebuilds on first use
+    coord._sync_index = None
     coord._mqtt_unsubscribe_callbacks = {}
+    coord._subscription_plans = {}
+    coord._subscription_locks = {}
+    coord._dongle_unified = {}
     coord.data = {}
+    coord._topic_router = TopicRouter()
+    coord._route_handlers = coord._build_route_handlers()
     coord.async_set_updated_data = MagicMock()
+    coord._key_listeners = {}
+    coord._changed_keys = set()
+    coord._unconfirmed_keys = set()
+    coord._aggregates = {}
+    coord._aggregate_listeners = {}
+    coord._dirty_aggregates = {}
+    coord._dispatch_window = 0.0
+    coord._dispatch_handle = None
+    coord._dispatch_full = False
+    coord._bank_update_interval = 1.0
+    coord._bank_update_last = {}
+    coord._pending_state_writes = set()
+    coord._warm_start = MagicMock()
+    coord.mqtt_handler = {}  # as before start_mqtt_subscription creates it
     # Default to non-GridBoss for the standard fixture; the gridboss
     # fixture overrides this with its own MagicMock.
     coord.is_gridboss_dongle = MagicMock(return_value=False)
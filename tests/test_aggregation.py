@@ -0,0 +1,71 @@
+"""Combined* entities aggregate straight from store writes, once per dispatch.
+
+They used to parse their sources' HA states back to floats and re-sum every
+source in a task per state-change event.
+"""
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+from custom_components.monitormysolar.aggregation import Aggregate, switch_parser
+
+
+def test_running_aggregate_tracks_replacements():
+    aggregate = Aggregate(["a", "b", "c"])
+    assert aggregate.update("a", 3)
+    assert aggregate.update("b", "5.00")
+    assert not aggregate.update("b", 5)  # same value, other form
+    assert aggregate.update("c", "garbage") is False  # unparseable = no value
+    assert (aggregate.sum, aggregate.count, aggregate.min, aggregate.max) == (8, 2, 3, 5)
+
+    # Replacing the extreme recomputes it; a source going away drops out.
+    aggregate.update("b", 1)
+    assert (aggregate.min, aggregate.max, aggregate.mean) == (1, 3, 2)
+    aggregate.update("a", None)
+    assert (aggregate.sum, aggregate.count, aggregate.min, aggregate.max) == (1, 1, 1, 1)
+    aggregate.update("b", None)
+    assert (aggregate.sum, aggregate.count, aggregate.mean, aggregate.min) == (0, 0, None, None)
+
+
+def test_coordinator_feeds_aggregates_and_flushes_once(coordinator):
+    coordinator._dongle_ids = ["dongle-aa", "dongle-bb"]
+    keys = [coordinator.build_entity_id("sensor", d, "pall") for d in coordinator._dongle_ids]
+    coordinator.set_entity_value(keys[0], 1000)
+    aggregate = Aggregate(keys)
+    listener = MagicMock()
+    remove = coordinator.async_add_aggregate(aggregate, listener)
+    assert aggregate.sum == 1000  # seeded from the store
+
+    # A burst of writes to both sources: one callback on the next flush.
+    coordinator.set_entity_value(keys[0], 1200)
+    coordinator.set_entity_value(keys[1], 800)
+    coordinator.set_entity_value(coordinator.build_entity_id("sensor", "dongle-aa", "soc"), 50)
+    listener.assert_not_called()
+    coordinator._async_flush_dispatch()
+    listener.assert_called_once()
+    assert aggregate.sum == 2000
+
+    # Optimistic writes count too, and schedule their own flush.
+    coordinator.hass.loop.call_soon.reset_mock()
+    coordinator.set_optimistic_value(keys[1], 900)
+    coordinator.hass.loop.call_soon.assert_called_once()
+    coordinator._async_flush_dispatch()
+    assert listener.call_count == 2 and aggregate.sum == 2100
+
+    remove()
+    coordinator.set_entity_value(keys[0], 0)
+    coordinator._async_flush_dispatch()
+    assert listener.call_count == 2
+    assert not coordinator._aggregates
+
+
+def test_switch_sources_count_echo_strings_as_on(coordinator):
+    # /setting/updated "1.00" / "1.0" must read as on, as in the sync index.
+    aggregate = Aggregate(["a", "b", "c", "d"], switch_parser(coordinator.normalize_setting_value))
+    for key, raw in zip(aggregate.keys, ("1.00", "1.0", True, 1)):
+        aggregate.update(key, raw)
+    assert (aggregate.count, aggregate.min) == (4, 1)
+    aggregate.update("b", "0.00")
+    assert aggregate.min == 0
+    aggregate.update("b", "garbage")
+    assert (aggregate.count, aggregate.min) == (3, 1)
@@ -0,0 +1,56 @@
+"""Bank-update timestamps travel over a per-dongle dispatcher signal.
+
+Every data message used to fire a global `<domain>_bank_updated` bus event
+(seen by the recorder, websocket subscribers and every BankUpdateSensor, each
+filtering by dongle). It is now a scoped signal, at most once per bank per
+interval.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.monitormysolar import coordinator as coordinator_module
+from custom_components.monitormysolar.const import SIGNAL_BANK_UPDATED
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture
+def send(monkeypatch):
+    mock = MagicMock()
+    monkeypatch.setattr(coordinator_module, "async_dispatcher_send", mock)
+    return mock
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(coordinator_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_data_message_signals_its_dongle_not_the_bus(coordinator, send, monkeypatch):
+    monkeypatch.setattr(coordinator, "determine_entity_type", MagicMock(return_value="sensor"))
+    payload = json.dumps({"Vpv1": 1.0})
+    _run(coordinator.process_message("dongle-test", "dongle-test/inputbank1", payload))
+
+    send.assert_called_once_with(
+        coordinator.hass, SIGNAL_BANK_UPDATED.format("dongle-test"), "inputbank1")
+    coordinator.hass.bus.async_fire.assert_not_called()
+
+
+def test_rate_limited_per_bank(coordinator, send, clock):
+    coordinator._signal_bank_update("dongle-test", "inputbank1")
+    coordinator._signal_bank_update("dongle-test", "inputbank1")
+    coordinator._signal_bank_update("dongle-test", "holdbank1")  # other bank: own budget
+    assert send.call_count == 2
+
+    clock[0] += coordinator._bank_update_interval
+    coordinator._signal_bank_update("dongle-test", "inputbank1")
+    assert send.call_count == 3
@@ -0,0 +1,95 @@
+"""The compiled catalog index must resolve exactly like the old linear scans.
+
+determine_entity_type / find_catalog_entry / the MQTT handler's GridBoss
+helpers used to walk ENTITIES[brand] on every key. They now share one frozen
+suffix -> CatalogHit index per brand. These tests pin the index to the
+historical first-match semantics so the switch is invisible to callers.
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+
+RESOLUTION_ORDER = ["sensor", "switch", "number", "time", "time_hhmm", "button", "select"]
+
+
+def _linear_scan(brand_entities, suffix):
+    """The pre-index determine_entity_type / find_catalog_entry walk."""
+    for entity_type in RESOLUTION_ORDER:
+        if entity_type in brand_entities:
+            for _bank, entries in brand_entities[entity_type].items():
+                for entry in entries:
+                    if entry["unique_id"].lower() == suffix.lower():
+                        resolved = "time" if entity_type == "time_hhmm" else entity_type
+                        return resolved, entry
+    return None, None
+
+
+def test_index_matches_linear_scan_for_every_lux_uid():
+    from custom_components.monitormysolar.const import ENTITIES
+    from custom_components.monitormysolar.catalog import get_catalog_index
+
+    lux = ENTITIES["Lux"]
+    index = get_catalog_index("Lux")
+    for platform in RESOLUTION_ORDER:
+        for entries in lux.get(platform, {}).values():
+            for entry in entries:
+                suffix = entry["unique_id"].lower()
+                expected_type, expected_entry = _linear_scan(lux, suffix)
+                hit = index[suffix]
+                assert hit.platform == expected_type
+                # Duplicated unique_ids resolve to the FIRST declaration.
+                assert hit.entry is expected_entry
+
+
+def test_index_is_cached_and_frozen():
+    from custom_components.monitormysolar.catalog import get_catalog_index
+
+    index = get_catalog_index("Lux")
+    assert get_catalog_index("Lux") is index
+    with pytest.raises(TypeError):
+        index["new_key"] = None
+
+
+def test_unknown_brand_is_empty():
+    from custom_components.monitormysolar.catalog import get_catalog_index, lookup
+
+    assert len(get_catalog_index("NoSuchBrand")) == 0
+    assert lookup("NoSuchBrand", "SOC") is None
+
+
+def test_lookup_is_case_insensitive():
+    from custom_components.monitormysolar.catalog import lookup
+
+    hit = lookup("Lux", "SmartLoad3_PortMode")
+    assert hit is not None
+    assert hit.platform == "select"
+    assert lookup("Lux", "smartload3_portmode") is hit
+
+
+def test_coordinator_uses_index(coordinator):
+    coordinator.entry.data = {"inverter_brand": "Lux"}
+    entity_type, entry = coordinator.find_catalog_entry("SmartLoad3_PortMode")
+    assert entity_type == "select"
+    assert "options" in entry
+    assert coordinator.determine_entity_type("SmartLoad3_PortMode") == "select"
+    # Unknown keys still default to sensor and are remembered as ignored.
+    assert coordinator.determine_entity_type("NotARealKey") == "sensor"
+    assert "notarealkey" in coordinator._ignored_entity_suffixes
+
+
+def test_gridboss_bank_resolution_matches_catalog():
+    from custom_components.monitormysolar.const import ENTITIES
+    from custom_components.monitormysolar.mqttHandeler import MQTTHandler
+
+    handler = MQTTHandler(MagicMock())
+    for banks in ENTITIES["Lux"].values():
+        for bank_name, entries in banks.items():
+            for entry in entries:
+                source = entry.get("source", bank_name)
+                if source.startswith("gridboss_"):
+                    uid = entry["unique_id"]
+                    assert handler._is_gridboss_setting(uid)
+                    assert handler._get_gridboss_bank(uid) == source.replace("gridboss_", "")
+    assert not handler._is_gridboss_setting("ChargePowerPercentCMD")
+    assert handler._get_gridboss_bank("ChargePowerPercentCMD") == "holdbank1"
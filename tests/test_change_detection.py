@@ -0,0 +1,81 @@
+"""Store writes that don't change a value must not wake any entity.
+
+A full /snap/input or /snap/hold reply (every reconnect and recovery) or a
+legacy per-bank poll re-announces hundreds of unchanged values. The store
+compares on write so only keys whose value actually moved are dispatched.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def _snap(values: dict) -> str:
+    return json.dumps({"event": "input_state", "ts": 1717000000, "payload": values})
+
+
+def _prep(coordinator, monkeypatch, entity_type="sensor"):
+    monkeypatch.setattr(coordinator, "determine_entity_type",
+                        MagicMock(return_value=entity_type))
+
+
+def test_set_entity_value_reports_change(coordinator):
+    assert coordinator.set_entity_value("sensor.dongle_test_soc", 50) is True
+    coordinator._changed_keys.clear()
+    assert coordinator.set_entity_value("sensor.dongle_test_soc", 50) is False
+    assert coordinator._changed_keys == set()
+    assert coordinator.set_entity_value("sensor.dongle_test_soc", 51) is True
+    assert coordinator._changed_keys == {"sensor.dongle_test_soc"}
+
+
+def test_seeded_none_to_value_is_a_change(coordinator):
+    # _create_entities_for_dongle seeds every key with None.
+    coordinator.entities["sensor.dongle_test_soc"] = None
+    assert coordinator.set_entity_value("sensor.dongle_test_soc", 0) is True
+
+
+def test_repeated_snapshot_dispatches_only_moved_keys(coordinator, monkeypatch):
+    _prep(coordinator, monkeypatch)
+    vpv1, soc = MagicMock(), MagicMock()
+    coordinator.async_add_key_listener(vpv1, ["sensor.dongle_test_vpv1"])
+    coordinator.async_add_key_listener(soc, ["sensor.dongle_test_soc"])
+
+    _run(coordinator.process_message("dongle-test", "dongle-test/snap/input",
+                                     _snap({"Vpv1": 235.0, "SOC": 99})))
+    coordinator._async_flush_dispatch()
+    assert vpv1.call_count == 1 and soc.call_count == 1
+
+    # Same snapshot again, only SOC moved.
+    _run(coordinator.process_message("dongle-test", "dongle-test/snap/input",
+                                     _snap({"Vpv1": 235.0, "SOC": 98})))
+    coordinator._async_flush_dispatch()
+    assert vpv1.call_count == 1
+    assert soc.call_count == 2
+
+
+def test_optimistic_write_echo_still_dispatched(coordinator, monkeypatch):
+    """The confirming echo of a user write carries the SAME value as the
+    optimistic mirror, but it is what clears the entity's user-initiated guard,
+    so it must still reach the entity (once)."""
+    _prep(coordinator, monkeypatch, "number")
+    entity_id = "number.dongle_test_chargepowerpercentcmd"
+    listener = MagicMock()
+    coordinator.async_add_key_listener(listener, [entity_id])
+
+    coordinator.set_optimistic_value(entity_id, 80)
+    assert coordinator._changed_keys == set()  # the entity already shows it
+
+    hold = json.dumps({"event": "hold_delta", "ts": 1, "payload": {"ChargePowerPercentCMD": 80}})
+    _run(coordinator.process_message("dongle-test", "dongle-test/hold", hold))
+    coordinator._async_flush_dispatch()
+    listener.assert_called_once()
+
+    # A further identical value is a plain no-op again.
+    _run(coordinator.process_message("dongle-test", "dongle-test/hold", hold))
+    coordinator._async_flush_dispatch()
+    listener.assert_called_once()
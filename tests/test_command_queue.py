@@ -0,0 +1,449 @@
+"""Writes go through per-dongle priority queues, each resolving a future.
+
+MQTTHandler used to hold one global lock and silently drop any write that
+arrived within a second of the last one, or while another dongle's write was
+still waiting for its /response.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from custom_components.monitormysolar import mqttHandeler as handler_module
+from custom_components.monitormysolar.mqttHandeler import MQTTHandler
+from custom_components.monitormysolar.write_latency import MIN_SAMPLES, MIN_TIMEOUT
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    publish = AsyncMock()
+    monkeypatch.setattr(handler_module.mqtt, "async_publish", publish)
+    monkeypatch.setattr(handler_module, "BATCH_WINDOW", 0)
+    # Acks arrive via the coordinator's planned /response subscription.
+    monkeypatch.setattr(handler_module.mqtt, "async_subscribe", AsyncMock(
+        side_effect=AssertionError("writes must not subscribe per command")))
+    hass = MagicMock()
+    hass.loop = asyncio.get_event_loop()
+    hass.async_create_background_task = lambda coro, name: hass.loop.create_task(coro)
+    handler = MQTTHandler(hass)
+    handler.coordinator = MagicMock()
+    handler.coordinator.confirms_writes_by_echo.return_value = False
+    handler.publish = publish
+    return handler
+
+
+def _entity(name):
+    entity = MagicMock(spec=["entity_id", "revert_state", "async_write_ha_state"])
+    entity.entity_id = f"number.{name}"
+    return entity
+
+
+def _payloads(handler):
+    return [json.loads(call.args[2]) for call in handler.publish.await_args_list]
+
+
+def _published_settings(handler):
+    return [payload["setting"] for payload in _payloads(handler) if "setting" in payload]
+
+
+async def _respond(handler, topic_id, status="success", **extra):
+    msg = MagicMock(topic=f"{topic_id}/response", payload=json.dumps({"status": status, **extra}))
+    await handler.response_received(msg)
+
+
+def test_same_dongle_writes_are_sent_in_order(handler):
+    async def scenario():
+        first = asyncio.ensure_future(handler.send_update("dongle-ab:cd", "A", 1, _entity("a")))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(handler.send_update("dongle-ab:cd", "B", 2, _entity("b")))
+        await asyncio.sleep(0.01)
+        # B waits behind A rather than being dropped.
+        assert _published_settings(handler) == ["A"]
+        assert handler.queue_depth("dongle-ab:cd") == 1
+
+        await _respond(handler, "dongle-AB:CD")
+        assert await first is True
+        await asyncio.sleep(0.01)
+        assert _published_settings(handler) == ["A", "B"]
+        await _respond(handler, "dongle-AB:CD")
+        assert await second is True
+        await handler.async_stop()
+
+    _run(scenario())
+
+
+def test_different_dongles_proceed_concurrently(handler):
+    async def scenario():
+        a = asyncio.ensure_future(handler.send_update("dongle-aa", "A", 1, _entity("a")))
+        b = asyncio.ensure_future(handler.send_update("dongle-bb", "B", 1, _entity("b")))
+        await asyncio.sleep(0.01)
+        assert sorted(_published_settings(handler)) == ["A", "B"]
+
+        await _respond(handler, "dongle-BB")
+        assert await b is True
+        assert not a.done()
+        await _respond(handler, "dongle-AA")
+        assert await a is True
+        await handler.async_stop()
+
+    _run(scenario())
+
+
+def test_timeout_resolves_false_and_reverts(handler, monkeypatch):
+    monkeypatch.setattr(handler_module, "RESPONSE_TIMEOUT", 0.01)
+    entity = _entity("a")
+
+    async def scenario():
+        result = await handler.send_update("dongle-aa", "A", 1, entity)
+        await asyncio.sleep(0)
+        await handler.async_stop()
+        return result
+
+    assert _run(scenario()) is False
+    entity.revert_state.assert_called_once()
+
+
+def test_stop_resolves_queued_writes(handler):
+    async def scenario():
+        first = asyncio.ensure_future(handler.send_update("dongle-aa", "A", 1, _entity("a")))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(handler.send_update("dongle-aa", "B", 1, _entity("b")))
+        await asyncio.sleep(0.01)
+        await handler.async_stop()
+        return await asyncio.gather(first, second)
+
+    assert _run(scenario()) == [False, False]
+
+
+def test_multi_dongle_failure_reverts_once(handler, monkeypatch):
+    monkeypatch.setattr(handler_module, "RESPONSE_TIMEOUT", 0.05)
+    entity = _entity("combined")
+
+    async def scenario():
+        write = asyncio.ensure_future(handler.send_update_to_multiple_dongles(
+            ["dongle-aa", "dongle-bb", "dongle-cc"], "A", 1, entity))
+        await asyncio.sleep(0.01)
+        # All three were published before any ack arrived.
+        assert len(handler.publish.await_args_list) == 3
+        await _respond(handler, "dongle-AA")
+        await _respond(handler, "dongle-BB", status="error")
+        result = await write  # dongle-cc never answers
+        await asyncio.sleep(0)
+        await handler.async_stop()
+        return result
+
+    result = _run(scenario())
+    assert not result
+    assert {d: r.status for d, r in result.items()} == {
+        "dongle-aa": handler_module.WRITE_OK,
+        "dongle-bb": handler_module.WRITE_FAILED,
+        "dongle-cc": handler_module.WRITE_TIMEOUT,
+    }
+    assert result["dongle-aa"].latency is not None and result["dongle-cc"].latency is None
+    assert result.failed == ["dongle-bb", "dongle-cc"]
+    entity.revert_state.assert_called_once()
+
+
+def test_acks_are_matched_through_the_correlation_table(handler):
+    entity = _entity("a")
+
+    async def scenario():
+        write = asyncio.ensure_future(handler.send_update("dongle-aa", "A", 1, entity))
+        await asyncio.sleep(0.01)
+        # Stray acks (other dongle, nothing in flight) are ignored.
+        await _respond(handler, "dongle-BB", status="error")
+        assert not write.done()
+
+        await _respond(handler, "dongle-AA", setting="A")
+        # A duplicate ack for the same write settles nothing twice.
+        await _respond(handler, "dongle-AA", status="error", setting="A")
+        result = await write
+        assert not any(handler._in_flight.values())
+        await handler.async_stop()
+        return result
+
+    assert _run(scenario()) is True
+    entity.revert_state.assert_not_called()
+
+
+def test_newer_values_replace_the_queued_write(handler):
+    entity = _entity("slider")
+
+    async def scenario():
+        writes = [asyncio.ensure_future(handler.send_update("dongle-aa", "A", 1, entity))]
+        await asyncio.sleep(0.01)  # 1 is in flight now
+        writes += [
+            asyncio.ensure_future(handler.send_update("dongle-aa", "A", value, entity))
+            for value in (2, 3, 4)
+        ]
+        await asyncio.sleep(0.01)
+        await _respond(handler, "dongle-AA")
+        await asyncio.sleep(0.01)
+        await _respond(handler, "dongle-AA")
+        results = await asyncio.gather(*writes)
+        await handler.async_stop()
+        return results
+
+    assert _run(scenario()) == [True, True, True, True]
+    # The in-flight value, then only the final one; 2 and 3 never hit the wire.
+    values = [payload["value"] for payload in _payloads(handler)]
+    assert values == [1, 4]
+
+
+def test_writes_issued_together_share_one_payload(handler, monkeypatch):
+    monkeypatch.setattr(handler_module, "BATCH_WINDOW", 0.02)
+    a, b, c = _entity("a"), _entity("b"), _entity("c")
+
+    async def scenario():
+        writes = [
+            asyncio.ensure_future(handler.send_update("dongle-aa", "A", 1, a)),
+            asyncio.ensure_future(handler.send_update("dongle-aa", "B", 2, b)),
+        ]
+        await asyncio.sleep(0.005)
+        # Still inside the window: joins the same payload.
+        writes.append(asyncio.ensure_future(handler.send_update("dongle-aa", "C", 3, c)))
+        await asyncio.sleep(0.03)
+        assert _payloads(handler) == [{
+            "settings": [{"setting": "A", "value": 1}, {"setting": "B", "value": 2},
+                         {"setting": "C", "value": 3}],
+            "from": "homeassistant",
+        }]
+        # One ack settles every write in the payload.
+        await _respond(handler, "dongle-AA", status="error")
+        results = await asyncio.gather(*writes)
+        await asyncio.sleep(0)
+        await handler.async_stop()
+        return results
+
+    assert _run(scenario()) == [False, False, False]
+    for entity in (a, b, c):
+        entity.revert_state.assert_called_once()
+
+
+def test_acks_feed_the_dongle_latency_window(handler):
+    async def scenario():
+        for value in range(MIN_SAMPLES):
+            write = asyncio.ensure_future(handler.send_update("dongle-aa", "A", value, _entity("a")))
+            await asyncio.sleep(0.01)
+            await _respond(handler, "dongle-AA")
+            assert await write is True
+        await handler.async_stop()
+
+    _run(scenario())
+    stats = handler.latency_stats("dongle-aa")
+    assert stats["samples"] == MIN_SAMPLES and stats["p50"] < 1000
+    # Fast acks: the next write waits seconds, not the 15 s default.
+    assert handler.ack_timeout("dongle-aa") == MIN_TIMEOUT
+    assert handler.ack_timeout("dongle-bb") == handler_module.RESPONSE_TIMEOUT
+
+
+def test_setting_echo_confirms_without_a_response(handler):
+    handler.coordinator.confirms_writes_by_echo.return_value = True  # FW >= 4.3.0
+    handler.coordinator.normalize_written_value = lambda setting, value: float(value)
+    a, b = _entity("a"), _entity("b")
+
+    async def scenario():
+        writes = [
+            asyncio.ensure_future(handler.send_update("dongle-aa", "ChgA", 1, a)),
+            asyncio.ensure_future(handler.send_update("dongle-aa", "ChgB", 2, b)),
+        ]
+        await asyncio.sleep(0.01)
+        # A competing value for our setting doesn't confirm our write.
+        assert not handler.confirm_from_echo("dongle-aa", "chga", 5.0)
+        # Each setting of the batched payload is confirmed by its own echo.
+        assert handler.confirm_from_echo("dongle-aa", "chga", 1.0)
+        await asyncio.sleep(0)
+        assert not writes[0].done()  # the payload resolves as a whole
+        assert handler.confirm_from_echo("dongle-aa", "ChgB", 2.0)
+        results = await asyncio.gather(*writes)
+        # Nothing left in flight: a late echo is an ordinary external change.
+        assert not handler.confirm_from_echo("dongle-aa", "ChgB", 2.0)
+        await handler.async_stop()
+        return results
+
+    assert _run(scenario()) == [True, True]
+    handler.coordinator.record_self_write.assert_not_called()
+    a.revert_state.assert_not_called()
+
+
+def test_admin_commands_are_acked_on_response_by_unified_dongles(handler):
+    handler.coordinator.confirms_writes_by_echo.return_value = True  # FW >= 4.3.0
+    handler.coordinator.normalize_written_value = lambda setting, value: float(value)
+    button = MagicMock(spec=["entity_id", "async_write_ha_state"])  # no revert_state
+    button.entity_id = "button.restart"
+
+    async def scenario():
+        write = asyncio.ensure_future(handler.send_update("dongle-aa", "ChgA", 1, _entity("a")))
+        await asyncio.sleep(0.01)
+        # The setting write's /response is left to its echo.
+        await _respond(handler, "dongle-AA", setting="ChgA")
+        await asyncio.sleep(0)
+        assert not write.done()
+        assert handler.confirm_from_echo("dongle-aa", "ChgA", 1.0)
+        assert await write is True
+
+        restart = asyncio.ensure_future(handler.send_update(
+            "dongle-aa", "restart", "1", button, lane=handler_module.LANE_ADMIN))
+        await asyncio.sleep(0.01)
+        await _respond(handler, "dongle-AA")
+        result = await restart
+        await handler.async_stop()
+        return result
+
+    assert _run(scenario()) is True
+    assert handler.latency_stats("dongle-aa")["samples"] == 2
+
+
+def test_unified_dongles_settle_a_failure_response(handler):
+    # A rejected write gets no echo; its /response settles it straight away.
+    handler.coordinator.confirms_writes_by_echo.return_value = True  # FW >= 4.3.0
+    entity = _entity("a")
+
+    async def scenario():
+        single = asyncio.ensure_future(handler.send_update("dongle-aa", "ChgA", 1, entity))
+        await asyncio.sleep(0.01)
+        await _respond(handler, "dongle-AA", status="fail", setting="ChgA")
+        assert await single is False  # settled, not left to time out
+        fan_out = asyncio.ensure_future(handler.send_update_to_multiple_dongles(
+            ["dongle-aa"], "ChgA", 2, _entity("combined")))
+        await asyncio.sleep(0.01)
+        await _respond(handler, "dongle-AA", status="fail")
+        result = await fan_out
+        await asyncio.sleep(0)
+        await handler.async_stop()
+        return result
+
+    result = _run(scenario())
+    assert result["dongle-aa"].status == handler_module.WRITE_FAILED
+    entity.revert_state.assert_called_once()
+
+
+def test_failed_coalesced_write_reverts_to_the_last_confirmed_value(handler):
+    # A slider drag: 10 goes out, 20 queues behind it and 30 replaces 20
+    # before it's sent. If 30 fails, 20 (never sent) isn't a value to go
+    # back to; 10, which the dongle confirmed, is.
+    from custom_components.monitormysolar.entity import MonitorMySolarEntity
+
+    slider = MonitorMySolarEntity.__new__(MonitorMySolarEntity)
+    slider.entity_id = "number.dongle_aa_slider"
+    slider.async_write_ha_state = MagicMock()
+    slider._writes_in_flight = 0
+    slider._revert_value = None
+
+    def drag(previous, value):
+        return asyncio.ensure_future(slider._async_track_write(
+            previous, value, handler.send_update("dongle-aa", "Slider", value, slider)))
+
+    async def scenario():
+        writes = [drag(0, 10)]
+        await asyncio.sleep(0.01)
+        writes += [drag(10, 20), drag(20, 30)]
+        await asyncio.sleep(0.01)
+        await _respond(handler, "dongle-AA")
+        await asyncio.sleep(0.01)
+        await _respond(handler, "dongle-AA", status="fail")
+        results = await asyncio.gather(*writes)
+        await handler.async_stop()
+        return results
+
+    _run(scenario())
+    assert _published_settings(handler) == ["Slider", "Slider"]
+    assert [p["value"] for p in _payloads(handler)] == [10, 30]
+    assert slider._revert_value == 10
+
+
+def _command(setting, lane):
+    return handler_module.QueuedCommand("dongle-aa", {"setting": setting, "value": 1}, None, lane=lane)
+
+
+def test_higher_lanes_overtake_queued_sync_writes(handler):
+    async def scenario():
+        first = asyncio.ensure_future(handler.send_update("dongle-aa", "A", 1, _entity("a")))
+        await asyncio.sleep(0.01)
+        writes = [
+            asyncio.ensure_future(handler.send_update(
+                "dongle-aa", "Sync", 1, _entity("sync"), lane=handler_module.LANE_SYNC)),
+            asyncio.ensure_future(handler.send_update(
+                "dongle-aa", "Restart", 1, _entity("restart"), lane=handler_module.LANE_ADMIN)),
+            asyncio.ensure_future(handler.send_update("dongle-aa", "User", 1, _entity("user"))),
+        ]
+        await asyncio.sleep(0.01)
+        assert handler.lane_depths("dongle-aa") == {
+            "interactive": 1, "automation": 0, "sync": 1, "admin": 1}
+        for _ in range(3):
+            await _respond(handler, "dongle-AA")
+            await asyncio.sleep(0.01)
+        await _respond(handler, "dongle-AA")
+        await asyncio.gather(first, *writes)
+        await handler.async_stop()
+
+    _run(scenario())
+    payloads = _payloads(handler)
+    # The user's write joins the batch ahead of the sync write; the admin
+    # command always goes out alone, after the settings.
+    assert payloads[1]["settings"] == [{"setting": "User", "value": 1}, {"setting": "Sync", "value": 1}]
+    assert payloads[2]["setting"] == "Restart"
+
+
+def test_automation_context_selects_the_automation_lane(handler):
+    by_user, by_automation = _entity("a"), _entity("b")
+    by_user._context = MagicMock(user_id="abc")
+    by_automation._context = MagicMock(user_id=None)
+    assert handler._lane_for(by_user) == handler_module.LANE_INTERACTIVE
+    assert handler._lane_for(by_automation) == handler_module.LANE_AUTOMATION
+    assert handler._lane_for(_entity("c")) == handler_module.LANE_INTERACTIVE
+
+
+def test_starved_lane_goes_next_after_the_limit():
+    async def scenario():
+        queue = handler_module.CommandQueue()
+        queue.put_nowait(_command("sync", handler_module.LANE_SYNC))
+        served = []
+        for n in range(handler_module.STARVATION_LIMIT + 2):
+            queue.put_nowait(_command(f"user{n}", handler_module.LANE_INTERACTIVE))
+            served.append(queue.get_nowait().payload["setting"])
+        return served
+
+    served = _run(scenario())
+    assert served.index("sync") == handler_module.STARVATION_LIMIT
+    assert served.count("sync") == 1
+
+
+def test_batch_filling_does_not_reset_a_starved_lane():
+    # Sustained load: each cycle two interactive writes arrive, and the
+    # worker's get() starts a batch that _fill_batch tops up. The admin
+    # write can't be batched, so filling always stops at it.
+    async def scenario():
+        queue = handler_module.CommandQueue()
+        queue.put_nowait(_command("restart", handler_module.LANE_ADMIN))
+        for cycle in range(handler_module.STARVATION_LIMIT + 2):
+            queue.put_nowait(_command(f"a{cycle}", handler_module.LANE_INTERACTIVE))
+            queue.put_nowait(_command(f"b{cycle}", handler_module.LANE_INTERACTIVE))
+            batch = [await queue.get()]
+            if batch[0].batchable:
+                MQTTHandler._fill_batch(batch, queue)
+            if batch[0].lane == handler_module.LANE_ADMIN:
+                return cycle
+        return None
+
+    assert _run(scenario()) == handler_module.STARVATION_LIMIT
+
+
+def test_coalescing_promotes_a_queued_write():
+    async def scenario():
+        queue = handler_module.CommandQueue()
+        sync = _command("A", handler_module.LANE_SYNC)
+        queue.put_nowait(_command("B", handler_module.LANE_AUTOMATION))
+        queue.put_nowait(sync)
+        queue.promote(sync, handler_module.LANE_INTERACTIVE)
+        assert queue.get_nowait() is sync
+        assert queue.depths()["sync"] == 0
+
+    _run(scenario())
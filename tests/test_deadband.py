@@ -0,0 +1,76 @@
+"""Measurement noise inside a sensor's deadband isn't written.
+
+Grid voltage jitters by ±0.1 V, frequency by ±0.01 Hz, temperatures by a few
+tenths; each jitter used to be a state write and a recorder row. Values inside
+the band are held back, with a heartbeat write so history stays continuous.
+"""
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.monitormysolar import entity as entity_module
+from custom_components.monitormysolar.entity import MonitorMySolarEntity
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(entity_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _entity(coordinator, **data):
+    coordinator.entry.data = data
+    ent = MonitorMySolarEntity.__new__(MonitorMySolarEntity)
+    ent.coordinator = coordinator
+    ent._deadband = None
+    ent._deadband_value = None
+    ent._deadband_written = None
+    return ent
+
+
+def test_voltage_default_is_relative(coordinator, clock):
+    grid = _entity(coordinator)
+    info = {"device_class": "voltage"}
+    assert grid._passes_deadband(230.0, info)
+    assert not grid._passes_deadband(230.1, info)
+    assert not grid._passes_deadband(229.9, info)
+    assert grid._passes_deadband(230.5, info)
+
+    # The same class default still tracks a 3.3 V cell at mV resolution.
+    cell = _entity(coordinator)
+    assert cell._passes_deadband(3.300, info)
+    assert cell._passes_deadband(3.305, info)
+
+
+def test_catalog_entry_overrides_default(coordinator, clock):
+    ent = _entity(coordinator)
+    info = {"device_class": "frequency", "deadband": 0}
+    assert ent._passes_deadband(50.0, info)
+    assert ent._passes_deadband(50.01, info)
+
+    ent = _entity(coordinator)
+    info = {"device_class": "power", "deadband": 50}
+    assert ent._passes_deadband(1000, info)
+    assert not ent._passes_deadband(1040, info)
+    assert ent._passes_deadband(1060, info)
+
+
+def test_heartbeat_lets_unchanged_value_through(coordinator, clock):
+    ent = _entity(coordinator, deadband_heartbeat=5)
+    info = {"device_class": "temperature"}
+    assert ent._passes_deadband(40.0, info)
+    clock[0] += 299
+    assert not ent._passes_deadband(40.2, info)
+    clock[0] += 1
+    assert ent._passes_deadband(40.2, info)
+
+
+def test_non_numeric_and_unbanded_values_pass(coordinator, clock):
+    ent = _entity(coordinator)
+    assert ent._passes_deadband("Normal", {"device_class": "voltage"})
+    ent = _entity(coordinator)
+    assert ent._passes_deadband(1, {})
+    assert ent._passes_deadband(1, {})
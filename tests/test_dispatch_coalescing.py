@@ -0,0 +1,93 @@
+"""Entity notifications are coalesced into one pass per loop tick.
+
+A single MQTT message used to notify entities two or three times (the end of
+process_message, again in _async_handle_mqtt_message, and the /setting/updated
+branch), and a burst of retained messages or snapshot replies notified once
+per message. Writes now only mark the store dirty; the first mark schedules a
+single flush on the event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def _make_msg(topic: str, payload: str):
+    msg = MagicMock()
+    msg.topic = topic
+    msg.payload = payload
+    return msg
+
+
+def _payload(values: dict) -> str:
+    return json.dumps({"event": "input_delta", "ts": 1717000000, "payload": values})
+
+
+def _prep(coordinator, monkeypatch):
+    monkeypatch.setattr(coordinator, "determine_entity_type",
+                        MagicMock(return_value="sensor"))
+    coordinator._hass_startup_complete = True
+    coordinator.mqtt_handler = MagicMock()
+    coordinator._dongle_last_seen = {}
+    coordinator._dongle_stale_after = 90.0
+
+
+def test_burst_of_messages_schedules_one_flush(coordinator, monkeypatch):
+    _prep(coordinator, monkeypatch)
+    listener = MagicMock()
+    coordinator.async_add_key_listener(
+        listener, ["sensor.dongle_test_vpv1", "sensor.dongle_test_soc"])
+
+    for values in ({"Vpv1": 1.0}, {"SOC": 50}, {"Vpv1": 2.0}):
+        msg = _make_msg("dongle-test/input", _payload(values))
+        _run(coordinator._async_handle_mqtt_message(msg))
+
+    # Three messages, one scheduled flush, nobody notified yet.
+    coordinator.hass.loop.call_soon.assert_called_once()
+    listener.assert_not_called()
+
+    coordinator._async_flush_dispatch()
+    listener.assert_called_once()
+    assert coordinator._dispatch_handle is None
+    assert coordinator.entities["sensor.dongle_test_vpv1"] == 2.0
+
+
+def test_snapshot_reply_is_not_fanned_out_twice(coordinator, monkeypatch):
+    _prep(coordinator, monkeypatch)
+    msg = _make_msg("dongle-test/snap/input", _payload({"Vpv1": 1.0}))
+    _run(coordinator._async_handle_mqtt_message(msg))
+
+    coordinator.hass.loop.call_soon.assert_called_once()
+    coordinator.async_set_updated_data.assert_not_called()
+
+
+def test_micro_batch_window_uses_call_later(coordinator, monkeypatch):
+    _prep(coordinator, monkeypatch)
+    coordinator._dispatch_window = 0.005
+    coordinator.async_schedule_dispatch()
+    coordinator.async_schedule_dispatch()
+    coordinator.hass.loop.call_later.assert_called_once_with(
+        0.005, coordinator._async_flush_dispatch)
+    coordinator.hass.loop.call_soon.assert_not_called()
+
+
+def test_full_dispatch_wins_over_key_dispatch(coordinator, monkeypatch):
+    _prep(coordinator, monkeypatch)
+    listener = MagicMock()
+    coordinator.async_add_key_listener(listener, ["sensor.dongle_test_vpv1"])
+    coordinator.set_entity_value("sensor.dongle_test_vpv1", 1.0)
+    coordinator.async_schedule_dispatch()
+    coordinator.async_schedule_dispatch(full=True)
+
+    coordinator._async_flush_dispatch()
+
+    # One full fan-out (which reaches every entity) instead of both passes.
+    coordinator.async_set_updated_data.assert_called_once_with(coordinator.entities)
+    listener.assert_not_called()
+    assert coordinator._changed_keys == set()
+    assert coordinator._dispatch_full is False
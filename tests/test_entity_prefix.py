@@ -51,3 +51,28 @@ def test_legacy_drop_flag_single_dongle(coordinator):
     _set_dongle_data(coordinator, [{"dongle_id": "dongle-AA"}])
     coordinator._drop_dongle_id = True
     assert coordinator.build_entity_id("sensor", "dongle-AA", "soc") == "sensor.soc"
+
+
+def test_entity_ids_are_memoized(coordinator):
+    """Repeat builds hit the cache and return the same (interned) string."""
+    _set_dongle_data(coordinator, [{"dongle_id": "dongle-AA", "entity_prefix": "flexboss1"}])
+    first = coordinator.build_entity_id("sensor", "dongle-AA", "SOC")
+    calls = []
+    coordinator.get_dongle_info = lambda d: calls.append(d) or {}
+    assert coordinator.build_entity_id("sensor", "dongle-AA", "SOC") is first
+    assert calls == []  # no dongle_data scan on the hot path
+
+
+def test_replacing_dongle_data_invalidates_cache(coordinator):
+    _set_dongle_data(coordinator, [{"dongle_id": "dongle-AA", "entity_prefix": "flexboss1"}])
+    assert coordinator.build_entity_id("sensor", "dongle-AA", "SOC") == "sensor.flexboss1_soc"
+    _set_dongle_data(coordinator, [{"dongle_id": "dongle-AA", "entity_prefix": "stack_a"}])
+    assert coordinator.build_entity_id("sensor", "dongle-AA", "SOC") == "sensor.stack_a_soc"
+
+
+def test_in_place_change_needs_explicit_invalidate(coordinator):
+    _set_dongle_data(coordinator, [{"dongle_id": "dongle-AA", "entity_prefix": "flexboss1"}])
+    assert coordinator.build_entity_id("sensor", "dongle-AA", "SOC") == "sensor.flexboss1_soc"
+    coordinator._dongle_data[0]["entity_prefix"] = "stack_a"
+    coordinator.invalidate_entity_id_cache()
+    assert coordinator.build_entity_id("sensor", "dongle-AA", "SOC") == "sensor.stack_a_soc"
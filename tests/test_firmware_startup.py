@@ -0,0 +1,82 @@
+"""Startup waits on per-dongle firmware-code events, not a 20 s poll loop.
+
+async_setup_entry used to poll _pending_dongles once a second for up to 20 s,
+and codes already saved in the config entry went through the same gate.
+Cached codes now resolve immediately; the rest are requested concurrently and
+resolve as each response arrives.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from custom_components.monitormysolar import coordinator as coordinator_module
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture
+def mqtt(monkeypatch):
+    subscribe = AsyncMock(return_value=MagicMock())
+    publish = AsyncMock()
+    monkeypatch.setattr(coordinator_module.mqtt, "async_subscribe", subscribe)
+    monkeypatch.setattr(coordinator_module.mqtt, "async_publish", publish)
+    return publish
+
+
+def _prep(coordinator, monkeypatch, dongles, codes):
+    coordinator._dongle_ids = list(dongles)
+    coordinator._pending_dongles = list(dongles)
+    coordinator._firmware_codes = dict(codes)
+    coordinator._firmware_code_events = {d: asyncio.Event() for d in dongles}
+    coordinator._setup_errors = []
+    monkeypatch.setattr(coordinator, "_create_entities_for_dongle", AsyncMock())
+    monkeypatch.setattr(coordinator_module, "async_call_later", MagicMock())
+
+
+def test_cached_codes_resolve_without_waiting(coordinator, monkeypatch, mqtt):
+    dongles = [f"dongle-{i}" for i in range(4)]
+    _prep(coordinator, monkeypatch, dongles, {d: "FAAB" for d in dongles})
+
+    _run(coordinator.request_firmware_codes())
+    assert coordinator._pending_dongles == []
+    mqtt.assert_not_awaited()
+
+    loop = asyncio.get_event_loop()
+    started = loop.time()
+    _run(coordinator.async_wait_for_firmware_codes(timeout=5, resend_after=2))
+    assert loop.time() - started < 0.5
+
+
+def test_response_wakes_the_waiter(coordinator, monkeypatch, mqtt):
+    _prep(coordinator, monkeypatch, ["dongle-a", "dongle-b"], {"dongle-a": "FAAB"})
+    monkeypatch.setattr(coordinator, "save_firmware_code", AsyncMock())
+    _run(coordinator.request_firmware_codes())
+    assert coordinator._pending_dongles == ["dongle-b"]
+    mqtt.assert_awaited_once_with(coordinator.hass, "dongle-b/firmwarecode/request", "")
+
+    async def scenario():
+        waiter = asyncio.ensure_future(
+            coordinator.async_wait_for_firmware_codes(timeout=5, resend_after=2))
+        await asyncio.sleep(0)
+        msg = MagicMock(payload=json.dumps({"FWCode": "IAAB"}))
+        await coordinator._handle_firmware_code_response("dongle-b", msg)
+        await asyncio.wait_for(waiter, 0.5)
+
+    _run(scenario())
+    assert coordinator._pending_dongles == []
+
+
+def test_silent_dongles_are_asked_again(coordinator, monkeypatch, mqtt):
+    _prep(coordinator, monkeypatch, ["dongle-a", "dongle-b"], {})
+    _run(coordinator.request_firmware_codes())
+    assert mqtt.await_count == 2
+
+    _run(coordinator.async_wait_for_firmware_codes(timeout=0.02, resend_after=0.01))
+    assert mqtt.await_count == 4
+    assert coordinator._pending_dongles == ["dongle-a", "dongle-b"]
@@ -0,0 +1,103 @@
+"""The shared firmware version cache, against a local HTTP stand-in.
+
+The update platform used to await the version GET before creating any update
+entity, and every update entity refetched the same URL on its own timer. One
+cache per coordinator now fetches in the background with conditional requests.
+"""
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from custom_components.monitormysolar import firmware_versions as fv_module
+from custom_components.monitormysolar.firmware_versions import FirmwareVersionCache
+
+VERSIONS = {"latestFwVersion": "4.3.0.111", "betaFwVersion": "4.3.1.5", "changelog": "fixes"}
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+class _VersionServer:
+    """Serves VERSIONS with an ETag and honours If-None-Match."""
+
+    def __init__(self):
+        self.requests = []
+        self.etag = '"v1"'
+        app = web.Application()
+        app.router.add_get("/version", self._handle)
+        self.server = TestServer(app)
+
+    async def _handle(self, request):
+        self.requests.append(dict(request.headers))
+        if request.headers.get("If-None-Match") == self.etag:
+            return web.Response(status=304)
+        return web.json_response(VERSIONS, headers={
+            "ETag": self.etag, "Last-Modified": "Sat, 17 Oct 2026 10:00:00 GMT"})
+
+
+@pytest.fixture
+def server():
+    srv = _VersionServer()
+    _run(srv.server.start_server())
+    yield srv
+    _run(srv.server.close())
+
+
+@pytest.fixture
+def cache(server, monkeypatch):
+    store = MagicMock()
+    monkeypatch.setattr(fv_module, "Store", MagicMock(return_value=store))
+    hass = MagicMock()
+    hass.async_create_task = lambda coro: asyncio.get_event_loop().create_task(coro)
+    cache = FirmwareVersionCache(hass, url=str(server.server.make_url("/version")))
+    cache.store = store
+    return cache
+
+
+def test_fetch_notifies_and_persists(cache, server):
+    listener = MagicMock()
+    cache.async_add_listener(listener)
+
+    _run(cache.async_refresh())
+
+    assert cache.versions == VERSIONS
+    listener.assert_called_once()
+    saved = cache.store.async_delay_save.call_args.args[0]()
+    assert saved["versions"] == VERSIONS and saved["etag"] == '"v1"'
+
+
+def test_conditional_request_returns_304(cache, server):
+    listener = MagicMock()
+    cache.async_add_listener(listener)
+    _run(cache.async_refresh())
+    _run(cache.async_refresh())
+
+    assert server.requests[1]["If-None-Match"] == '"v1"'
+    assert server.requests[1]["If-Modified-Since"] == "Sat, 17 Oct 2026 10:00:00 GMT"
+    assert cache.versions == VERSIONS
+    listener.assert_called_once()  # a 304 changes nothing
+
+
+def test_concurrent_and_fresh_callers_share_one_request(cache, server):
+    async def many():
+        await asyncio.gather(*(cache.async_refresh() for _ in range(4)))
+
+    _run(many())
+    assert len(server.requests) == 1
+
+    # A copy younger than max_age is served from the cache.
+    _run(cache.async_refresh(max_age=300))
+    assert len(server.requests) == 1
+
+
+def test_unreachable_server_keeps_stored_versions(cache):
+    cache.url = "http://127.0.0.1:9/version"
+    cache.versions = dict(VERSIONS)
+    _run(cache.async_refresh())
+    assert cache.versions == VERSIONS
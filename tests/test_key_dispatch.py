@@ -0,0 +1,75 @@
+"""Key-targeted dispatch: a message only wakes the entities whose keys it wrote.
+
+Previously every MQTT message ended in async_set_updated_data, which calls
+_handle_coordinator_update on every entity of every dongle. Now the coordinator
+records which store keys were written and notifies only the listeners on those
+keys (an entity's own entity_id, or the source keys of derived sensors).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def _payload(values: dict) -> str:
+    return json.dumps({"event": "input_delta", "ts": 1717000000, "payload": values})
+
+
+def _process(coordinator, values: dict):
+    """Process one /input message, then run the coalesced flush (the loop tick)."""
+    _run(coordinator.process_message("dongle-test", "dongle-test/input", _payload(values)))
+    coordinator._async_flush_dispatch()
+
+
+def _prep(coordinator, monkeypatch):
+    monkeypatch.setattr(coordinator, "determine_entity_type",
+                        MagicMock(return_value="sensor"))
+
+
+def test_only_listeners_on_written_keys_are_called(coordinator, monkeypatch):
+    _prep(coordinator, monkeypatch)
+    vpv1, soc = MagicMock(), MagicMock()
+    coordinator.async_add_key_listener(vpv1, ["sensor.dongle_test_vpv1"])
+    coordinator.async_add_key_listener(soc, ["sensor.dongle_test_soc"])
+
+    _process(coordinator, {"Vpv1": 235.0})
+
+    vpv1.assert_called_once()
+    soc.assert_not_called()
+    # The data path never falls back to the full fan-out.
+    coordinator.async_set_updated_data.assert_not_called()
+
+
+def test_multi_key_listener_called_once_per_dispatch(coordinator, monkeypatch):
+    """A derived sensor listening on both of its sources is woken once."""
+    _prep(coordinator, monkeypatch)
+    flow = MagicMock()
+    coordinator.async_add_key_listener(
+        flow, ["sensor.dongle_test_pcharge", "sensor.dongle_test_pdischarge"])
+
+    _process(coordinator, {"Pcharge": 100, "Pdischarge": 0})
+
+    flow.assert_called_once()
+
+
+def test_remove_listener(coordinator, monkeypatch):
+    _prep(coordinator, monkeypatch)
+    listener = MagicMock()
+    remove = coordinator.async_add_key_listener(listener, ["sensor.dongle_test_vpv1"])
+    remove()
+    assert coordinator._key_listeners == {}
+
+    _process(coordinator, {"Vpv1": 1.0})
+    listener.assert_not_called()
+
+
+def test_dispatch_without_writes_is_noop(coordinator):
+    listener = MagicMock()
+    coordinator.async_add_key_listener(listener, ["sensor.dongle_test_vpv1"])
+    coordinator.async_dispatch_changed()
+    listener.assert_not_called()
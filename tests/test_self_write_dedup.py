@@ -10,7 +10,7 @@ value, so "1.00" over /setting/updated matches the index 1 we recorded.
 """
 import json
 import time
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 
 def _run(coro):
@@ -26,8 +26,8 @@ def _prep(coordinator, monkeypatch, entity_type="number"):
                         MagicMock(return_value=entity_type))
     # Capture refreshes so we can assert whether the echo was applied.
     refreshes = []
-    monkeypatch.setattr(coordinator, "async_set_updated_data",
-                        lambda data: refreshes.append(1))
+    monkeypatch.setattr(coordinator, "async_schedule_dispatch",
+                        lambda full=False: refreshes.append(1))
     return refreshes
 
 
@@ -103,3 +103,63 @@ def test_select_echo_deduped_against_index(coordinator, monkeypatch):
         "dongle-test", "dongle-test/setting/updated",
         json.dumps({"setting": "SmartLoad3_PortMode", "value": "1.00", "from": "HA"})))
     assert refreshes == []  # deduped
+
+
+def test_echo_of_in_flight_write_settles_it(coordinator, monkeypatch):
+    # FW >= 4.3.0: the echo IS the write confirmation. The MQTT handler
+    # settles the write (committing the entity) and the echo isn't re-applied.
+    from custom_components.monitormysolar.mqttHandeler import MQTTHandler
+
+    refreshes = _prep(coordinator, monkeypatch, "number")
+    coordinator.mqtt_handler = MagicMock(spec=MQTTHandler)
+    coordinator.mqtt_handler.confirm_from_echo.return_value = True
+    entity_id = coordinator.build_entity_id("number", "dongle-test", "chargepowerpercentcmd")
+    coordinator.set_optimistic_value(entity_id, 60)  # the entity's own write
+    _run(coordinator.process_message(
+        "dongle-test", "dongle-test/setting/updated",
+        json.dumps({"setting": "ChargePowerPercentCMD", "value": "60", "from": "HA"})))
+    coordinator.mqtt_handler.confirm_from_echo.assert_called_once_with(
+        "dongle-test", "ChargePowerPercentCMD", 60)
+    assert refreshes == []
+    assert entity_id not in coordinator._unconfirmed_keys
+    assert entity_id not in coordinator._changed_keys  # no stale wake-up later
+
+
+def test_echo_confirming_a_fan_out_write_lands_in_the_store(coordinator, monkeypatch):
+    # Fan-out and sync parts commit nothing when settled: the echo that
+    # confirms them is what updates the target dongle's value.
+    import asyncio
+    from custom_components.monitormysolar import mqttHandeler as handler_module
+    from custom_components.monitormysolar.mqttHandeler import LANE_SYNC, WRITE_OK, MQTTHandler
+
+    refreshes = _prep(coordinator, monkeypatch, "switch")
+    monkeypatch.setattr(handler_module.mqtt, "async_publish", AsyncMock())
+    monkeypatch.setattr(handler_module, "BATCH_WINDOW", 0)
+    coordinator.entry.data = {"inverter_brand": "Lux"}
+    coordinator._dongle_unified = {"dongle-test": True}  # FW >= 4.3.0
+    entity_id = coordinator.build_entity_id("switch", "dongle-test", "accharge")
+    coordinator.entities[entity_id] = 0
+    hass = MagicMock()
+    hass.loop = asyncio.get_event_loop()
+    hass.async_create_background_task = lambda coro, name: hass.loop.create_task(coro)
+    handler = MQTTHandler(hass)
+    handler.coordinator = coordinator
+    coordinator.mqtt_handler = handler
+    sync_check = MagicMock(spec=["entity_id", "revert_state", "async_write_ha_state"])
+    sync_check.entity_id = "sync_check"
+
+    async def scenario():
+        write = asyncio.ensure_future(handler.send_update_to_multiple_dongles(
+            ["dongle-test"], "ACCharge", 1, sync_check, lane=LANE_SYNC))
+        await asyncio.sleep(0.01)
+        await coordinator.process_message(
+            "dongle-test", "dongle-test/setting/updated",
+            json.dumps({"setting": "ACCharge", "value": "1.00", "from": "HA"}))
+        outcome = await write
+        await handler.async_stop()
+        return outcome
+
+    outcome = _run(scenario())
+    assert outcome["dongle-test"].status == WRITE_OK
+    assert coordinator.entities[entity_id] == 1
+    assert refreshes == [1]
@@ -0,0 +1,188 @@
+"""Periodic settings sync: one pass over raw values, one payload per dongle.
+
+CombinedSyncSwitch used to compare HA state strings setting by setting and
+await a multi-dongle write for each drifted one in turn.
+"""
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from custom_components.monitormysolar import settings_sync
+from custom_components.monitormysolar.mqttHandeler import LANE_SYNC
+
+DONGLES = ["dongle-aa", "dongle-bb", "dongle-cc"]
+
+
+@pytest.fixture
+def stack(coordinator):
+    coordinator._dongle_ids = list(DONGLES)
+    coordinator._setting_history = {}
+    coordinator._max_history_entries = 100
+    coordinator.hass.loop.time.return_value = 100.0
+    coordinator.entry.data = {"inverter_brand": "Lux"}
+    return coordinator
+
+
+def _run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def _set(coord, platform, dongle_id, setting, value):
+    coord.entities[coord.build_entity_id(platform, dongle_id, setting.lower())] = value
+
+
+def _seed_drift(coord):
+    # No history: the majority value wins.
+    for dongle_id, value in zip(DONGLES, (1, "1", 0)):
+        _set(coord, "switch", dongle_id, "FeedInGrid", value)
+    # 46.1 V everywhere but dongle-cc; "46.10" is the /setting/updated form.
+    for dongle_id, value in zip(DONGLES, (46.1, "46.10", 48)):
+        _set(coord, "number", dongle_id, "ACChgStartVolt", value)
+    # dongle-bb changed it last, so its value wins over the majority.
+    for dongle_id, value in zip(DONGLES, (0, 1, 0)):
+        _set(coord, "select", dongle_id, "CTSampleRatio", value)
+    coord.record_setting_change("dongle-bb", "CTSampleRatio", "1:3000")
+    # In sync, or only reported by one dongle: nothing to do.
+    for dongle_id in DONGLES:
+        _set(coord, "switch", dongle_id, "ForcedDischgEn", 0)
+    _set(coord, "number", "dongle-aa", "ACChgEndVolt", 50)
+
+
+def test_plan_is_a_minimal_per_dongle_diff(stack):
+    _seed_drift(stack)
+    drifted, writes = settings_sync.plan_reconciliation(stack, DONGLES)
+
+    assert sorted(drifted) == ["ACChgStartVolt", "CTSampleRatio", "FeedInGrid"]
+    assert drifted["CTSampleRatio"].source == "dongle-bb"
+    assert writes == {
+        "dongle-aa": {"CTSampleRatio": 1},
+        # Wire values: ACChgStartVolt is written x10 as an integer.
+        "dongle-cc": {"FeedInGrid": 1, "ACChgStartVolt": 461, "CTSampleRatio": 1},
+    }
+
+
+def test_reconcile_sends_one_payload_per_dongle_concurrently(stack):
+    _seed_drift(stack)
+    in_flight = []
+
+    async def send_multiple_updates(dongle_id, payload, entity, lane=None):
+        in_flight.append(dongle_id)
+        await asyncio.sleep(0)
+        # Both dongles were sent to before either answered.
+        assert len(in_flight) == 2
+        return dongle_id != "dongle-cc"
+
+    stack.mqtt_handler = MagicMock()
+    stack.mqtt_handler.send_multiple_updates = AsyncMock(side_effect=send_multiple_updates)
+
+    summary = _run(settings_sync.async_reconcile(stack, DONGLES, MagicMock(entity_id="sync_check")))
+
+    calls = stack.mqtt_handler.send_multiple_updates.await_args_list
+    assert sorted(call.args[0] for call in calls) == ["dongle-aa", "dongle-cc"]
+    assert all(call.kwargs["lane"] == LANE_SYNC for call in calls)
+    assert not summary.converged
+    assert summary.as_dict() == {
+        "checked": len(settings_sync.synced_settings("Lux")),
+        "drifted": ["ACChgStartVolt", "CTSampleRatio", "FeedInGrid"],
+        "writes": {"dongle-aa": 1, "dongle-cc": 3},
+        "failed_dongles": ["dongle-cc"],
+        "converged": False,
+    }
+
+
+def test_reconcile_marks_its_targets_as_syncing_until_acked(stack):
+    # The sync switch skips echoes of values in `syncing`; without this the
+    # pass's own writes came back as changes and were fanned out again.
+    _seed_drift(stack)
+    syncing = {"ForcedDischgEn": 1}  # a single-setting sync already under way
+    seen = []
+
+    async def send_multiple_updates(dongle_id, payload, entity, lane=None):
+        seen.append(dict(syncing))
+        return True
+
+    stack.mqtt_handler = MagicMock()
+    stack.mqtt_handler.send_multiple_updates = AsyncMock(side_effect=send_multiple_updates)
+
+    summary = _run(settings_sync.async_reconcile(stack, DONGLES, MagicMock(), syncing=syncing))
+
+    targets = {unique_id: drift.target for unique_id, drift in summary.drifted.items()}
+    assert seen and all(during == {"ForcedDischgEn": 1, **targets} for during in seen)
+    assert syncing == {"ForcedDischgEn": 1}
+
+
+def test_large_diffs_are_split_into_capped_payloads(stack, monkeypatch):
+    monkeypatch.setattr(settings_sync, "MAX_BATCH_SETTINGS", 2)
+    _seed_drift(stack)
+    stack.mqtt_handler = MagicMock()
+    stack.mqtt_handler.send_multiple_updates = AsyncMock(return_value=True)
+
+    summary = _run(settings_sync.async_reconcile(stack, DONGLES, MagicMock()))
+
+    payloads = [call.args[1] for call in stack.mqtt_handler.send_multiple_updates.await_args_list
+                if call.args[0] == "dongle-cc"]
+    assert payloads == [{"FeedInGrid": 1, "ACChgStartVolt": 461}, {"CTSampleRatio": 1}]
+    assert summary.converged
+
+
+def test_index_tracks_drift_incrementally(stack, monkeypatch):
+    signals = []
+    monkeypatch.setattr(
+        "custom_components.monitormysolar.coordinator.async_dispatcher_send",
+        lambda hass, signal: signals.append(signal),
+    )
+    stack.entry.entry_id = "entry1"
+    for dongle_id in DONGLES:
+        _set(stack, "switch", dongle_id, "FeedInGrid", 1)
+    index = stack.sync_index  # seeded from the store
+    assert index.known == 1 and not index.drifted
+    stack._async_flush_dispatch()
+    assert signals == ["monitormysolar_sync_status_entry1"]
+
+    key = stack.build_entity_id("switch", "dongle-cc", "feedingrid")
+    assert stack.set_entity_value(key, 0)
+    assert index.drifted == {"FeedInGrid"}
+    assert index.values("FeedInGrid") == {"dongle-aa": 1, "dongle-bb": 1, "dongle-cc": 0}
+
+    # Keys outside the synced settings, and value changes that leave the
+    # drifted set as it was, don't wake the sensor.
+    stack.set_entity_value(stack.build_entity_id("sensor", "dongle-aa", "soc"), 50)
+    stack._async_flush_dispatch()
+    assert len(signals) == 2
+    stack.set_entity_value(stack.build_entity_id("switch", "dongle-bb", "feedingrid"), "1")
+    stack._async_flush_dispatch()
+    assert len(signals) == 2
+
+    # The optimistic write that fixes the last dongle clears the drift.
+    stack.set_optimistic_value(key, 1)
+    assert not index.drifted
+    stack._async_flush_dispatch()
+    assert len(signals) == 3
+
+
+def test_setting_listener_sees_changes_straight_from_the_store(stack):
+    changes = []
+    remove = stack.async_add_setting_listener(
+        lambda setting, dongle_id, value: changes.append((setting.unique_id, dongle_id, value))
+    )
+    key = stack.build_entity_id("number", "dongle-aa", "acchgstartvolt")
+
+    stack.set_entity_value(key, 46.1)  # first report: nothing changed
+    stack.set_entity_value(stack.build_entity_id("sensor", "dongle-aa", "soc"), 50)
+    stack.set_entity_value(key, "47.00")
+    stack.set_entity_value(key, 47)  # same value, other form
+    assert changes == [("ACChgStartVolt", "dongle-aa", 47)]
+
+    # Re-keying on an entity_id prefix change keeps the listener.
+    stack.invalidate_entity_id_cache()
+    stack.set_optimistic_value(key, 48)
+    remove()
+    stack.set_entity_value(key, 49)
+    assert changes[1:] == [("ACChgStartVolt", "dongle-aa", 48)]
@@ -81,6 +81,20 @@ def test_plain_input_still_dropped_during_startup(coordinator, monkeypatch):
     assert "sensor.dongle_test_vpv1" not in coordinator.entities
 
 
+def test_setting_echo_processed_during_startup(coordinator, monkeypatch):
+    """/setting/updated confirms FW >= 4.3.0 writes, including boot-time ones."""
+    _prep(coordinator, monkeypatch, startup_complete=False)
+    coordinator._self_write_ledger = {}
+    coordinator._dongle_last_seen = {}
+    coordinator._dongle_stale_after = 90.0
+
+    msg = _make_msg("dongle-test/setting/updated",
+                    json.dumps({"setting": "ChargePowerPercentCMD", "value": 80, "from": "HA"}))
+    _run(coordinator._async_handle_mqtt_message(msg))
+
+    assert coordinator.entities["sensor.dongle_test_chargepowerpercentcmd"] == 80
+
+
 def test_snap_input_processed_after_startup(coordinator, monkeypatch):
     """After startup, snap/input still routes (covered by the generic else too)."""
     _prep(coordinator, monkeypatch, startup_complete=True)
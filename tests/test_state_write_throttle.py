@@ -0,0 +1,99 @@
+"""throttled_async_write_ha_state honours update_interval.
+
+It used to write immediately regardless of the configured interval, so every
+5 s input poll of several hundred sensors landed in the recorder. Writes inside
+the interval are now deferred to its end (carrying the latest value), settings
+platforms are never throttled, and pending writes are flushed on shutdown.
+"""
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.monitormysolar import entity as entity_module
+from custom_components.monitormysolar.entity import MonitorMySolarEntity
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(entity_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def call_later(monkeypatch):
+    mock = MagicMock(return_value=MagicMock())
+    monkeypatch.setattr(entity_module, "async_call_later", mock)
+    return mock
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    mock = MagicMock()
+    monkeypatch.setattr(
+        entity_module.CoordinatorEntity, "async_write_ha_state",
+        lambda self: mock(self.entity_id))
+    return mock
+
+
+def _entity(coordinator, entity_id, **data):
+    coordinator.entry.data = {"update_interval": 60, **data}
+    ent = MonitorMySolarEntity.__new__(MonitorMySolarEntity)
+    ent.coordinator = coordinator
+    ent.hass = MagicMock()
+    ent.entity_id = entity_id
+    ent._last_state_change = None
+    ent._update_interval = None
+    ent._throttle_cancel = None
+    return ent
+
+
+def test_writes_within_interval_are_deferred_once(coordinator, clock, call_later, writes):
+    ent = _entity(coordinator, "sensor.dongle_test_soc")
+    ent.throttled_async_write_ha_state()
+    assert writes.call_count == 1
+
+    clock[0] += 10
+    ent.throttled_async_write_ha_state()
+    ent.throttled_async_write_ha_state()
+    assert writes.call_count == 1
+    call_later.assert_called_once()
+    assert call_later.call_args.args[1] == 50  # the rest of the interval
+    assert ent in coordinator._pending_state_writes
+
+    # End of interval: one write with whatever the entity now holds.
+    ent._async_throttled_write()
+    assert writes.call_count == 2
+    assert ent._throttle_cancel is None
+    assert ent not in coordinator._pending_state_writes
+
+
+def test_settings_platforms_bypass(coordinator, clock, call_later, writes):
+    number = _entity(coordinator, "number.dongle_test_chargepowerpercentcmd")
+    number.throttled_async_write_ha_state()
+    number.throttled_async_write_ha_state()
+    assert writes.call_count == 2
+    call_later.assert_not_called()
+
+
+def test_interval_override_by_platform(coordinator, clock, call_later, writes):
+    ent = _entity(coordinator, "binary_sensor.dongle_test_fault",
+                  update_intervals={"binary_sensor": 0})
+    ent.throttled_async_write_ha_state()
+    ent.throttled_async_write_ha_state()
+    assert writes.call_count == 2
+
+
+def test_flush_writes_pending_states(coordinator, clock, call_later, writes):
+    ent = _entity(coordinator, "sensor.dongle_test_soc")
+    ent.throttled_async_write_ha_state()
+    ent.throttled_async_write_ha_state()
+    cancel = ent._throttle_cancel
+
+    coordinator.async_flush_state_writes()
+
+    assert writes.call_count == 2
+    cancel.assert_called_once()
+    assert coordinator._pending_state_writes == set()
@@ -0,0 +1,165 @@
+"""Each dongle subscribes to an explicit, non-overlapping topic set.
+
+The old `<dongle>/#` wildcard plus the extra per-topic GridBoss subscriptions
+delivered every GridBoss bank message twice, and the wildcard also carried the
+debug/* streams and the echo of our own /update writes.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from custom_components.monitormysolar import coordinator as coordinator_module
+from custom_components.monitormysolar.subscription_planner import (
+    GRIDBOSS_BANKS,
+    INVERTER_BANKS,
+    plan_topics,
+)
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture(autouse=True)
+def _new_event_loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def subscribe(monkeypatch):
+    """Record MQTT subscriptions; each gets its own unsubscribe mock."""
+    unsubscribers = {}
+
+    async def _subscribe(hass, topic, callback):
+        unsubscribers[topic] = MagicMock()
+        return unsubscribers[topic]
+
+    mock = AsyncMock(side_effect=_subscribe)
+    monkeypatch.setattr(coordinator_module.mqtt, "async_subscribe", mock)
+    mock.unsubscribers = unsubscribers
+    return mock
+
+
+def _subscribed_topics(mock):
+    return [call.args[1] for call in mock.await_args_list]
+
+
+def test_no_wildcards_debug_or_write_echo():
+    for gridboss in (False, True):
+        for unified in (None, False, True):
+            topics = plan_topics("dongle-AA", gridboss, unified)
+            assert not any("#" in t or "+" in t for t in topics)
+            assert not any("/debug/" in t for t in topics)
+            assert "dongle-AA/update" not in topics
+            # Write acks ride the planned subscription, not one per write.
+            # FW >= 4.3.0 still acks admin commands there.
+            assert "dongle-AA/response" in topics
+
+
+def test_generation_selects_data_topics():
+    unified = plan_topics("dongle-AA", False, True)
+    assert {"dongle-AA/input", "dongle-AA/hold", "dongle-AA/setting/updated"} <= unified
+    assert not any(t.endswith("bank1") for t in unified)
+
+    legacy = plan_topics("dongle-AA", False, False)
+    assert {f"dongle-AA/{bank}" for bank in INVERTER_BANKS} <= legacy
+    assert "dongle-AA/input" not in legacy
+
+    gridboss = plan_topics("dongle-AA", True, False)
+    assert {f"dongle-AA/{bank}" for bank in GRIDBOSS_BANKS} <= gridboss
+    assert "dongle-AA/inputbank1" not in gridboss
+
+    # Unknown generation: cover both until /status says which.
+    assert unified | legacy == plan_topics("dongle-AA", False, None)
+
+
+def test_gridboss_topics_subscribed_once(coordinator, subscribe, monkeypatch):
+    monkeypatch.setattr(coordinator, "is_gridboss_dongle", lambda dongle_id: True)
+    assert _run(coordinator._apply_subscription_plan("dongle-test"))
+    topics = _subscribed_topics(subscribe)
+    assert len(topics) == len(set(topics))
+    assert topics.count("dongle-test/gridboss_inputbank1") == 1
+
+
+def test_status_narrows_plan(coordinator, subscribe, monkeypatch):
+    monkeypatch.setattr(coordinator, "request_snapshot", AsyncMock())
+    coordinator._dongle_boot_count = {}
+    _run(coordinator._apply_subscription_plan("dongle-test"))
+    assert "dongle-test/inputbank1" in coordinator._subscription_plans["dongle-test"]
+
+    status = json.dumps({"version": "4.3.0.111S3"})
+    _run(coordinator.process_status_message("dongle-test", status))
+
+    assert coordinator._subscription_plans["dongle-test"] == plan_topics(
+        "dongle-test", False, True)
+    subscribe.unsubscribers["dongle-test/inputbank1"].assert_called_once()
+    assert "dongle-test/inputbank1" not in coordinator._mqtt_unsubscribe_callbacks
+
+    # A repeat /status with the same generation doesn't resubscribe anything.
+    count = subscribe.await_count
+    _run(coordinator.process_status_message("dongle-test", status))
+    assert subscribe.await_count == count
+
+
+def test_late_firmware_code_replans_gridboss_banks(coordinator, subscribe):
+    # Subscribed before the code was known: planned as an inverter.
+    del coordinator.is_gridboss_dongle  # classify from the firmware code
+    coordinator._has_gridboss = False
+    coordinator._pending_dongles = []
+    coordinator._firmware_code_events = {}
+    coordinator.hass.async_create_task = asyncio.get_event_loop().create_task
+    _run(coordinator._apply_subscription_plan("dongle-test"))
+    assert "dongle-test/inputbank1" in coordinator._subscription_plans["dongle-test"]
+
+    async def code_arrives():
+        coordinator._firmware_codes["dongle-test"] = "IAAB"  # a GridBoss (midbox) code
+        coordinator._resolve_firmware_code("dongle-test")
+        coordinator._resolve_firmware_code("dongle-test")
+        await asyncio.sleep(0.01)
+
+    _run(code_arrives())
+    assert coordinator._subscription_plans["dongle-test"] == plan_topics("dongle-test", True, None)
+    subscribe.unsubscribers["dongle-test/inputbank1"].assert_called_once()
+    topics = _subscribed_topics(subscribe)
+    assert topics.count("dongle-test/gridboss_inputbank1") == 1
+
+
+def test_concurrent_replans_subscribe_each_topic_once(coordinator, monkeypatch):
+    # Subscribes yield to the loop, so a /status and a firmware-code re-plan
+    # that land while the first apply is still subscribing overlap with it.
+    subscribed = []
+
+    async def _subscribe(hass, topic, callback):
+        await asyncio.sleep(0)
+        subscribed.append(topic)
+        return MagicMock()
+
+    monkeypatch.setattr(coordinator_module.mqtt, "async_subscribe", _subscribe)
+    monkeypatch.setattr(coordinator, "request_snapshot", AsyncMock())
+    coordinator._dongle_boot_count = {}
+    coordinator.hass.async_create_task = asyncio.get_event_loop().create_task
+    gridboss = False
+    monkeypatch.setattr(coordinator, "is_gridboss_dongle", lambda dongle_id: gridboss)
+
+    async def scenario():
+        nonlocal gridboss
+        first = asyncio.ensure_future(coordinator._apply_subscription_plan("dongle-test"))
+        await asyncio.sleep(0)
+        gridboss = True
+        coordinator._replan_subscription("dongle-test")
+        await coordinator.process_status_message(
+            "dongle-test", json.dumps({"version": "4.3.0.111S3"}))
+        await first
+        await asyncio.sleep(0.01)
+
+    _run(scenario())
+    assert len(subscribed) == len(set(subscribed))
+    assert coordinator._subscription_plans["dongle-test"] == plan_topics("dongle-test", True, True)
+    assert set(coordinator._mqtt_unsubscribe_callbacks) >= plan_topics("dongle-test", True, True)
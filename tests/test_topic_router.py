@@ -0,0 +1,119 @@
+"""The precompiled topic router must classify exactly like the old endswith chain.
+
+_async_handle_mqtt_message used to classify each topic with a chain of
+endswith / `in` tests. The router compiles each dongle's concrete topics into a
+lookup table at subscription time; anything else is classified once with the
+same rules and cached (bounded).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from custom_components.monitormysolar.topic_router import (
+    LEGACY_BANKS,
+    ROUTE_AVAILABILITY,
+    ROUTE_BATTERIES,
+    ROUTE_DATA,
+    ROUTE_DEBUG,
+    ROUTE_FIRMWARE_CODE,
+    ROUTE_RESPONSE,
+    ROUTE_SETTING_UPDATED,
+    ROUTE_SNAPSHOT,
+    ROUTE_STATUS,
+    TopicRouter,
+    classify_topic,
+)
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture(autouse=True)
+def _new_event_loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+
+@pytest.mark.parametrize("suffix,kind", [
+    ("firmwarecode/response", ROUTE_FIRMWARE_CODE),
+    ("debug/bits", ROUTE_DEBUG),
+    ("batteries", ROUTE_BATTERIES),
+    ("status", ROUTE_STATUS),
+    ("availability", ROUTE_AVAILABILITY),
+    ("snap/input", ROUTE_SNAPSHOT),
+    ("snap/hold", ROUTE_SNAPSHOT),
+    ("response", ROUTE_RESPONSE),
+    ("setting/updated", ROUTE_SETTING_UPDATED),
+    ("input", ROUTE_DATA),
+    ("hold", ROUTE_DATA),
+    ("inputbank1", ROUTE_DATA),
+    ("gridboss_holdbank3", ROUTE_DATA),
+])
+def test_classification(suffix, kind):
+    route = classify_topic(f"dongle-12:34/{suffix}")
+    assert route.kind == kind
+    assert route.dongle_id == "dongle-12:34"
+    assert route.bank == suffix.rsplit("/", 1)[-1]
+
+
+def test_precompiled_topics_match_dynamic_classification():
+    router = TopicRouter()
+    router.add_dongle("dongle-AA")
+    for bank in LEGACY_BANKS:
+        topic = f"dongle-AA/{bank}"
+        assert router.route(topic) == classify_topic(topic)
+    assert router.route("dongle-AA/snap/input").kind == ROUTE_SNAPSHOT
+    # Precompiled lookups don't consume the dynamic-route budget.
+    assert router._dynamic_routes == 0
+
+
+def test_dynamic_routes_are_cached_but_bounded():
+    router = TopicRouter(max_dynamic_routes=2)
+    first = router.route("dongle-AA/debug/a")
+    assert router.route("dongle-AA/debug/a") is first
+    router.route("dongle-AA/debug/b")
+    router.route("dongle-AA/debug/c")  # over budget: classified, not cached
+    assert len(router) == 2
+    assert router.route("dongle-AA/debug/c").kind == ROUTE_DEBUG
+
+
+def test_handler_gating_during_startup(coordinator, monkeypatch):
+    """Data topics wait for startup; status/snapshot/firmware and the
+    /setting/updated write ack don't; debug and /response are dropped."""
+    coordinator._hass_startup_complete = False
+    coordinator._dongle_last_seen = {}
+    coordinator._dongle_stale_after = 90.0
+    process = AsyncMock()
+    status = AsyncMock()
+    monkeypatch.setattr(coordinator, "process_message", process)
+    monkeypatch.setattr(coordinator, "process_status_message", status)
+    coordinator._route_handlers = coordinator._build_route_handlers()
+
+    def deliver(suffix, payload="{}"):
+        msg = MagicMock()
+        msg.topic = f"dongle-test/{suffix}"
+        msg.payload = payload
+        _run(coordinator._async_handle_mqtt_message(msg))
+
+    deliver("input")
+    deliver("response")
+    deliver("debug/bits")
+    process.assert_not_called()
+
+    deliver("setting/updated")
+    deliver("snap/input")
+    deliver("availability", "online")
+    assert process.await_count == 3
+    deliver("status", json.dumps({"version": "4.3.0"}))
+    status.assert_awaited_once()
+
+    coordinator._hass_startup_complete = True
+    deliver("input")
+    assert process.await_count == 4
@@ -0,0 +1,116 @@
+"""The coordinator store survives a restart via the warm-start cache.
+
+Without it every entity sat at 'unknown' after a restart until the snapshot
+round-tripped; FW >= 4.3.0 units whose dongle was slow or offline stayed blank
+until each value changed.
+"""
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from custom_components.monitormysolar import warm_start as warm_start_module
+from custom_components.monitormysolar.warm_start import SAVE_DELAY, WarmStartCache
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture(autouse=True)
+def _new_event_loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+
+def _seed_state(coord):
+    coord._dongle_boot_count = {}
+    coord._dongle_unified = {}
+    coord._smart_soc_volt_bits = {}
+    coord._smartload_bits = {}
+    coord._port_modes = {}
+    coord._charge_control_settings = {}
+    coord._discharge_control_settings = {}
+    coord._charge_type_settings = {}
+    coord.current_fw_versions = {"dongle-test": ""}
+
+
+def test_round_trip_restores_without_overwriting_live_values(coordinator):
+    _seed_state(coordinator)
+    coordinator.entities = {
+        "sensor.dongle_test_soc": 87,
+        "sensor.dongle_test_vpv1": None,  # never reported: not saved
+        "number.dongle_test_chargepowerpercentcmd": 50,
+    }
+    coordinator._unconfirmed_keys = {"number.dongle_test_chargepowerpercentcmd"}
+    coordinator._dongle_boot_count["dongle-test"] = 12
+    coordinator._dongle_unified["dongle-test"] = True
+    coordinator.current_fw_versions["dongle-test"] = "4.3.0.111S3"
+    coordinator._port_modes["dongle-test"] = {"SmartLoad1_PortMode": 2}
+    saved = coordinator._warm_start_data()
+    assert saved["dongles"]["dongle-test"]["entities"] == {"sensor.dongle_test_soc": 87}
+
+    # Fresh session: one value has already arrived live, the rest is empty.
+    _seed_state(coordinator)
+    coordinator.entities = {"sensor.dongle_test_soc": 90}
+    coordinator._warm_start = MagicMock(async_load=AsyncMock(return_value=saved))
+    _run(coordinator.async_restore_warm_start())
+
+    assert coordinator.entities["sensor.dongle_test_soc"] == 90
+    assert coordinator._dongle_boot_count == {"dongle-test": 12}
+    assert coordinator._dongle_unified == {"dongle-test": True}
+    assert coordinator.current_fw_versions["dongle-test"] == "4.3.0.111S3"
+    assert coordinator.get_smartload_port_mode("dongle-test", 1) == 2
+    # Restoring is silent; entities read the store when they're added.
+    assert coordinator._changed_keys == set()
+
+
+def test_overlapping_prefixes_keep_their_own_keys(coordinator):
+    # "inverter" is a prefix of "inverter_b": its slice mustn't take
+    # "inverter_b_soc" too.
+    _seed_state(coordinator)
+    coordinator._dongle_ids = ["dongle-aa", "dongle-bb"]
+    coordinator._dongle_data = [
+        {"dongle_id": "dongle-aa", "entity_prefix": "inverter"},
+        {"dongle_id": "dongle-bb", "entity_prefix": "inverter_b"},
+    ]
+    coordinator.current_fw_versions = {"dongle-aa": "", "dongle-bb": ""}
+    coordinator.entities = {
+        coordinator.build_entity_id("sensor", "dongle-aa", "soc"): 40,
+        coordinator.build_entity_id("sensor", "dongle-bb", "soc"): 60,
+    }
+    saved = coordinator._warm_start_data()["dongles"]
+    assert saved["dongle-aa"]["entities"] == {"sensor.inverter_soc": 40}
+    assert saved["dongle-bb"]["entities"] == {"sensor.inverter_b_soc": 60}
+
+
+def test_unknown_dongles_are_ignored(coordinator):
+    _seed_state(coordinator)
+    coordinator.entities = {}
+    saved = {"dongles": {"dongle-gone": {"entities": {"sensor.dongle_gone_soc": 1},
+                                         "boot_count": 3}}}
+    coordinator._warm_start = MagicMock(async_load=AsyncMock(return_value=saved))
+    _run(coordinator.async_restore_warm_start())
+    assert coordinator.entities == {}
+    assert coordinator._dongle_boot_count == {}
+
+
+def test_save_is_scheduled_once_per_window(monkeypatch):
+    store = MagicMock()
+    monkeypatch.setattr(warm_start_module, "Store", MagicMock(return_value=store))
+    cache = WarmStartCache(MagicMock(), "entry")
+    data_func = MagicMock(return_value={"dongles": {}})
+
+    cache.async_schedule_save(data_func)
+    cache.async_schedule_save(data_func)
+    store.async_delay_save.assert_called_once()
+    assert store.async_delay_save.call_args.args[1] == SAVE_DELAY
+
+    # The write itself re-arms scheduling and snapshots the data at that moment.
+    assert store.async_delay_save.call_args.args[0]() == {"dongles": {}}
+    cache.async_schedule_save(data_func)
+    assert store.async_delay_save.call_count == 2
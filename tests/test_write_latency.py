@@ -0,0 +1,57 @@
+"""Write-ack timeouts follow each dongle's measured ack latency.
+
+Every write used to wait a flat 15 s for /response: a lost write on a healthy
+LAN dongle took 15 s to revert, and nothing adapted to a slow WiFi link.
+"""
+from __future__ import annotations
+
+from custom_components.monitormysolar.write_latency import (
+    MAX_TIMEOUT,
+    MIN_SAMPLES,
+    MIN_TIMEOUT,
+    TIMEOUT_FACTOR,
+    AckLatency,
+)
+
+
+def test_default_until_enough_samples():
+    latency = AckLatency()
+    for _ in range(MIN_SAMPLES - 1):
+        latency.record(0.1)
+    assert latency.timeout(15) == 15
+    latency.record(0.1)
+    assert latency.timeout(15) == MIN_TIMEOUT  # 0.3 s, clamped up
+
+
+def test_timeout_tracks_p99():
+    latency = AckLatency()
+    for ms in range(1, 101):
+        latency.record(ms / 100)  # 0.01 .. 1.00 s
+    assert latency.percentile(50) == 0.5
+    assert latency.percentile(99) == 0.99
+    assert latency.timeout(15) == 0.99 * TIMEOUT_FACTOR
+
+    stats = latency.stats(15)
+    assert (stats["p50"], stats["p95"], stats["p99"]) == (500.0, 950.0, 990.0)
+    assert stats["samples"] == 100
+
+
+def test_timeouts_widen_a_slow_link_up_to_the_cap():
+    latency = AckLatency(window=10)
+    for _ in range(10):
+        latency.record(0.1)
+    timeout = latency.timeout(15)
+    for _ in range(10):
+        latency.record_timeout(timeout)
+        timeout = latency.timeout(15)
+    assert timeout == MAX_TIMEOUT
+    assert latency.timeouts == 10
+
+
+def test_window_forgets_old_samples():
+    latency = AckLatency(window=MIN_SAMPLES)
+    for _ in range(MIN_SAMPLES):
+        latency.record(5.0)
+    for _ in range(MIN_SAMPLES):
+        latency.record(0.1)
+    assert latency.percentile(99) == 0.1